@@ -0,0 +1,295 @@
+"""Headless benchmarks for parsing, saving, rotations and map lookups, with JSON results and baselines.
+
+python bench.py                          # run every benchmark and print a table
+python bench.py --json results.json      # also save the results
+python bench.py --baseline results.json  # compare with earlier results; exit 1 on a regression
+
+Every benchmark runs on synthetic configs, catalogs and rotations built from a
+fixed seed, so results are comparable between runs and machines only differ
+by speed. Time is the best of several runs; peak memory is measured in a
+separate run with tracemalloc, since tracing slows everything down.
+"""
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from collections import namedtuple
+
+import cfgcore
+import cfgparse
+import cfgsave
+import rotationcodec
+import rotationgen
+from mapcatalog import MapCatalog
+
+RESULTS_VERSION = 1
+
+# Slower than the baseline by more than this share (and by at least MIN_DELTA seconds) is a regression
+TOLERANCE = 0.25
+MIN_DELTA = 0.001
+
+Benchmark = namedtuple("Benchmark", "name setup large")
+Result = namedtuple("Result", "seconds mean runs peak_bytes")
+
+GAMETYPES = ("war", "dom", "dm", "sd", "conf", "sab")
+
+BENCHMARKS = []
+
+
+def benchmark(name, large=False):
+    """Register setup() -> fn; only fn is timed. large benchmarks are skipped with --quick."""
+    def register(setup):
+        BENCHMARKS.append(Benchmark(name, setup, large))
+        return setup
+    return register
+
+
+def synthetic_config(lines, seed=0):
+    """A server.cfg of about this many lines: the template, then custom dvars with the odd comment and exec."""
+    rng = random.Random(seed)
+    out = cfgcore.DEFAULT_CONFIG.strip("\n").split("\n")
+    i = 0
+    while len(out) < lines:
+        roll = rng.random()
+        if roll < 0.02:
+            out.append(f"// section {i}")
+        elif roll < 0.03:
+            out.append(f"exec extra_{i}.cfg")
+        elif roll < 0.05:
+            out.append(f'seta sv_extra_{i} "{rng.randint(0, 999)}"; set sv_pair_{i} "{rng.randint(0, 9)}" // pair')
+        else:
+            out.append(f'set sv_custom_{i} "{rng.choice(("0", "1", "100", "mp_crash", "^1Name"))}"')
+        i += 1
+    return "\n".join(out[:lines]) + "\n"
+
+
+def synthetic_catalog(categories=8, maps_per_category=250):
+    lines = []
+    for c in range(categories):
+        lines.append(f"CAT{c} MAP SHORT NAMES ROTATION LIST")
+        lines.append("")
+        lines.extend(f"Map {c}-{m} - mp_c{c}_m{m}" for m in range(maps_per_category))
+        lines.append("")
+    return MapCatalog.from_text("\n".join(lines))
+
+
+def synthetic_rotation(length, catalog, seed=0):
+    """A rotation that changes gametype often, the worst case for the rotation string."""
+    rng = random.Random(seed)
+    codes = catalog.codes()
+    return [(rng.choice(GAMETYPES), rng.choice(codes)) for _ in range(length)]
+
+
+def _parse(lines):
+    def setup():
+        text = synthetic_config(lines)
+        return lambda: cfgcore.parse_config(text)
+    return setup
+
+
+benchmark("parse_1k")(_parse(1_000))
+benchmark("parse_100k")(_parse(100_000))
+benchmark("parse_1m", large=True)(_parse(1_000_000))
+
+
+@benchmark("tokenize_100k")
+def _tokenize():
+    lines = synthetic_config(100_000).split("\n")
+    return lambda: sum(1 for _ in cfgparse.tokenize(lines))
+
+
+@benchmark("save_plan_100k")
+def _save_plan():
+    # What save_config does before writing: apply a few edits to a large file with the smallest line changes
+    text = synthetic_config(100_000)
+    config, custom_dvars, rotation = cfgcore.parse_config(text)
+    config = dict(config, sv_hostname="Benchmark", scr_war_scorelimit="100")
+    custom_dvars = dict(custom_dvars)
+    for key in list(custom_dvars)[::1000]:
+        custom_dvars[key] = "changed"
+    return lambda: cfgsave.plan_save(text, config, custom_dvars, rotation)
+
+
+@benchmark("render_config_100k")
+def _render():
+    config, custom_dvars, rotation = cfgcore.parse_config(synthetic_config(100_000))
+    return lambda: cfgcore.render_config(config, custom_dvars, rotation)
+
+
+def _rotation_roundtrip(length):
+    def setup():
+        rotation = synthetic_rotation(length, synthetic_catalog())
+
+        def roundtrip():
+            decoded = cfgcore.parse_map_rotation(cfgcore.generate_map_rotation_string(rotation))
+            assert decoded == rotation
+        return roundtrip
+    return setup
+
+
+benchmark("rotation_roundtrip_10k")(_rotation_roundtrip(10_000))
+benchmark("rotation_roundtrip_1m", large=True)(_rotation_roundtrip(1_000_000))
+
+
+@benchmark("rotation_check_100k")
+def _rotation_check():
+    # What the editor does on every rotation edit to show the size against the budget
+    rotation = synthetic_rotation(100_000, synthetic_catalog())
+    return lambda: rotationcodec.encoded_size(rotationcodec.encode_rotation(rotation))
+
+
+@benchmark("catalog_load_2k")
+def _catalog_load():
+    catalog = synthetic_catalog()
+    text = "\n".join(f"{category} ROTATION LIST\n" + "\n".join(f"{name} - {code}" for name, code in maps)
+                     for category, maps in catalog.items())
+    return lambda: MapCatalog.from_text(text)
+
+
+@benchmark("name_lookup_1m")
+def _name_lookup():
+    catalog = synthetic_catalog()
+    codes = [code for _, code in synthetic_rotation(1_000_000, catalog)]
+    name_for = catalog.name_for
+    return lambda: [name_for(code) for code in codes]
+
+
+@benchmark("generate_rotation_10k")
+def _generate():
+    # The Randomize Maps dialog with every option in use
+    catalog = synthetic_catalog()
+    quotas = {category: 1 + i % 3 for i, category in enumerate(catalog)}
+    return lambda: rotationgen.generate_rotation(catalog, 10_000, {"war": 3, "dom": 1, "sd": 1}, no_repeat=50,
+                                                 quotas=quotas, pinned={0: ("war", "mp_c0_m0")}, seed=1)
+
+
+def measure(fn, repeat=5, min_time=0.5, memory=True):
+    times = []
+    started = time.perf_counter()
+    while len(times) < repeat or (time.perf_counter() - started < min_time and len(times) < 100):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    peak = None
+    if memory:
+        tracemalloc.start()
+        try:
+            fn()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return Result(min(times), sum(times) / len(times), len(times), peak)
+
+
+def run(benchmarks, repeat=5, memory=True, report=None):
+    results = {}
+    for bench in benchmarks:
+        fn = bench.setup()
+        results[bench.name] = measure(fn, repeat, memory=memory)
+        if report is not None:
+            report(bench.name, results[bench.name])
+    return results
+
+
+def to_json(results):
+    return {
+        "version": RESULTS_VERSION,
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "created": time.time(),
+        "results": {name: result._asdict() for name, result in results.items()},
+    }
+
+
+def load_baseline(path):
+    with open(path, "r") as f:
+        data = json.load(f)
+    if data.get("version") != RESULTS_VERSION:
+        raise ValueError(f"{path} was written by an incompatible version of bench.py")
+    return {name: Result(**result) for name, result in data["results"].items()}
+
+
+def compare(results, baseline, tolerance=TOLERANCE):
+    """Return {name: (time ratio, memory ratio or None, regressed)} for benchmarks in both sets."""
+    comparison = {}
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        ratio = result.seconds / base.seconds if base.seconds else 1.0
+        slower = ratio > 1 + tolerance and result.seconds - base.seconds > MIN_DELTA
+        memory_ratio = None
+        grew = False
+        if result.peak_bytes is not None and base.peak_bytes:
+            memory_ratio = result.peak_bytes / base.peak_bytes
+            grew = memory_ratio > 1 + tolerance
+        comparison[name] = (ratio, memory_ratio, slower or grew)
+    return comparison
+
+
+def format_bytes(size):
+    if size is None:
+        return "-"
+    for unit in ("B", "KiB", "MiB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GiB"
+
+
+def format_row(name, result, comparison=None):
+    line = f"{name:26} {result.seconds * 1000:10.2f} ms {result.runs:4} runs  {format_bytes(result.peak_bytes):>10}"
+    if comparison is not None:
+        ratio, memory_ratio, regressed = comparison
+        line += f"  {ratio:6.2f}x time"
+        if memory_ratio is not None:
+            line += f"  {memory_ratio:6.2f}x memory"
+        if regressed:
+            line += "  REGRESSION"
+    return line
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the config tools on synthetic data.")
+    parser.add_argument("-k", "--filter", action="append", help="only run benchmarks whose name contains this")
+    parser.add_argument("--quick", action="store_true", help="skip the 1M-sized benchmarks")
+    parser.add_argument("-r", "--repeat", type=int, default=5, help="minimum timed runs per benchmark")
+    parser.add_argument("--no-memory", action="store_true", help="skip the peak memory runs")
+    parser.add_argument("--json", metavar="PATH", help="write the results to this file")
+    parser.add_argument("--baseline", metavar="PATH", help="compare with results written by --json")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE,
+                        help="allowed slowdown or memory growth before it counts as a regression (default: %(default)s)")
+    parser.add_argument("--list", action="store_true", help="list the benchmarks and exit")
+    args = parser.parse_args(argv)
+
+    selected = [bench for bench in BENCHMARKS
+                if (not args.quick or not bench.large)
+                and (not args.filter or any(part in bench.name for part in args.filter))]
+    if args.list:
+        print("\n".join(bench.name + (" (large)" if bench.large else "") for bench in selected))
+        return 0
+
+    baseline = load_baseline(args.baseline) if args.baseline else {}
+
+    def report(name, result):
+        comparison = compare({name: result}, baseline, args.tolerance).get(name)
+        print(format_row(name, result, comparison), flush=True)
+
+    results = run(selected, args.repeat, memory=not args.no_memory, report=report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(to_json(results), f, indent=2)
+
+    regressions = [name for name, (_, _, regressed) in compare(results, baseline, args.tolerance).items() if regressed]
+    if regressions:
+        print(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
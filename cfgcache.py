@@ -0,0 +1,210 @@
+"""On-disk cache of parsed server.cfg and maps.txt files, keyed by file fingerprint.
+
+Each cached file gets one entry holding a small header (path, mtime, size and
+content hash) followed by the model as plain JSON data. Nothing in an entry is
+ever executed, so a cache directory on shared storage cannot be used to run
+code in the tools that read it; the model objects are rebuilt from the data. An unchanged file is served after
+a single stat() without reading or parsing it; a file that was only touched is
+recognised by its content hash. Entries are evicted least recently used first
+once the cache grows past max_entries or max_bytes.
+"""
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import time
+
+import cfgcore
+from mapcatalog import MapCatalog
+
+# Bump when the parsers or the cached model types change shape
+CACHE_VERSION = 2
+
+# Entry files; ".bin" entries were written by version 1 and are only ever deleted
+ENTRY_SUFFIXES = (".json", ".bin")
+
+# A file modified this close to being cached may change again without its
+# mtime moving, so its content is hashed instead of trusting the stat
+RACY_NS = 2_000_000_000
+
+
+def default_cache_dir():
+    """SERVCFG_CACHE_DIR if set (empty disables the cache), else the per-user cache directory."""
+    directory = os.environ.get("SERVCFG_CACHE_DIR")
+    if directory is not None:
+        return directory or None
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "servcfg")
+
+
+def content_hash(data):
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+class ParseCache:
+    def __init__(self, directory=None, max_entries=512, max_bytes=32 * 1024 * 1024):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def _entry_path(self, kind, path):
+        name = hashlib.blake2b(f"{kind}\0{path}".encode("utf-8", errors="surrogateescape"), digest_size=16)
+        return os.path.join(self.directory, f"{kind}-{name.hexdigest()}.json")
+
+    def load(self, path, kind, parse, to_data=None, from_data=None):
+        """Return parse(file bytes) for path, from the cache when the file has not changed.
+
+        The model is cached as to_data(model), which must be JSON-serializable,
+        and rebuilt with from_data(data); both default to storing the model as
+        is. Every call returns a fresh copy of the model, so callers may modify
+        it. Raises the same errors as reading path would (e.g. FileNotFoundError).
+        """
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        if self.directory is None:
+            with open(path, "rb") as f:
+                return parse(f.read())
+
+        from_data = from_data or (lambda data: data)
+        entry_path = self._entry_path(kind, path)
+        header = None
+        try:
+            with open(entry_path, "r", encoding="utf-8") as f:
+                header = json.loads(f.readline())
+                version, entry_kind, entry_path_key, mtime_ns, size, digest, cached_ns = header
+                if (version == CACHE_VERSION and entry_kind == kind and entry_path_key == path
+                        and mtime_ns == st.st_mtime_ns and size == st.st_size and mtime_ns < cached_ns - RACY_NS):
+                    model = from_data(json.loads(f.read()))
+                    self._touch(entry_path)
+                    self.hits += 1
+                    return model
+        except (OSError, ValueError, TypeError, KeyError, IndexError, AttributeError):
+            header = None
+
+        with open(path, "rb") as f:
+            data = f.read()
+        digest = content_hash(data)
+        model = None
+        if isinstance(header, list) and header[:1] == [CACHE_VERSION] and header[5:6] == [digest]:
+            # Touched or copied over with identical content: keep the parse, refresh the fingerprint
+            try:
+                with open(entry_path, "r", encoding="utf-8") as f:
+                    f.readline()
+                    model = from_data(json.loads(f.read()))
+                self.hits += 1
+            except (OSError, ValueError, TypeError, KeyError, IndexError, AttributeError):
+                model = None
+        if model is None:
+            model = parse(data)
+            self.misses += 1
+        header = [CACHE_VERSION, kind, path, st.st_mtime_ns, len(data), digest, time.time_ns()]
+        self._store(entry_path, header, to_data(model) if to_data else model)
+        return model
+
+    def _touch(self, entry_path):
+        try:
+            os.utime(entry_path)
+        except OSError:
+            pass
+
+    def _store(self, entry_path, header, data):
+        # The cache is an optimisation only; failing to write it never fails the load
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(prefix=".entry.", suffix=".tmp", dir=self.directory)
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    f.write(json.dumps(header) + "\n")
+                    json.dump(data, f, separators=(",", ":"))
+                os.replace(tmp_path, entry_path)
+            except BaseException:
+                try:
+                    os.unlink(tmp_path)
+                except OSError:
+                    pass
+                raise
+            self.evict()
+        except (OSError, TypeError, ValueError):
+            pass
+
+    def evict(self):
+        """Drop least recently used entries until the cache fits its limits."""
+        entries = []
+        try:
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    if entry.name.endswith(ENTRY_SUFFIXES):
+                        st = entry.stat()
+                        entries.append((st.st_mtime_ns, st.st_size, entry.path))
+        except OSError:
+            return
+        count = len(entries)
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+            count -= 1
+            total -= size
+
+    def clear(self):
+        if self.directory is None:
+            return
+        try:
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    if entry.name.endswith(ENTRY_SUFFIXES):
+                        os.unlink(entry.path)
+        except OSError:
+            pass
+
+
+_default_cache = None
+
+
+def default_cache():
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ParseCache(default_cache_dir())
+    return _default_cache
+
+
+def _parse_config(data):
+    return cfgcore.parse_config(data.decode("utf-8", errors="replace"))
+
+
+def _config_from_data(data):
+    config, custom_dvars, map_rotation = data
+    return config, custom_dvars, [tuple(entry) for entry in map_rotation]
+
+
+def _parse_maps(data):
+    return MapCatalog.from_text(data.decode("utf-8", errors="replace"))
+
+
+def load_config(path="server.cfg", config=None, custom_dvars=None, map_rotation=None, cache=None):
+    """Cached cfgcore.load_config, with the same merge-into-arguments behaviour."""
+    cached_config, cached_custom, cached_rotation = (cache or default_cache()).load(
+        path, "config", _parse_config, from_data=_config_from_data)
+    config = {} if config is None else config
+    custom_dvars = {} if custom_dvars is None else custom_dvars
+    map_rotation = [] if map_rotation is None else map_rotation
+    config.update(cached_config)
+    custom_dvars.update(cached_custom)
+    if "sv_maprotation" in cached_config:
+        map_rotation[:] = cached_rotation
+    return config, custom_dvars, map_rotation
+
+
+def load_maps(path="maps.txt", cache=None):
+    """Cached cfgcore.load_maps."""
+    return (cache or default_cache()).load(path, "maps", _parse_maps, MapCatalog.to_dict, MapCatalog)
@@ -0,0 +1,231 @@
+"""Headless server.cfg model shared by the GUI editor and the command-line tools."""
+import cfgparse
+from mapcatalog import MapCatalog
+
+CUSTOM_DVAR_MARKER = "// CUSTOM DVARS H2M CFG EDITOR //"
+
+DEFAULT_CONFIG = """
+/////////////////////////////////////////////////////////////////////////
+//  Call of duty: Modern Warfare Remastered MP Dedicated Server Config //
+//                              H1-MOD                                 //
+/////////////////////////////////////////////////////////////////////////
+
+set sv_hostname "CHANGE ME - COLORS --->"
+set g_password ""
+set sv_maxclients "18"
+set sv_timeout "20"
+set sv_reconnectlimit "3"
+set g_inactivity "420"
+set sv_kickBanTime "3600"
+seta g_allowVote "1"
+seta g_deadChat "0"
+
+seta sv_privateClients 0
+seta sv_privatePassword ""
+
+set logfile "2"
+set g_logSync "1"
+set g_log "logs\\games_mp.log"
+set rcon_password "CHANGEME"
+set sv_sayName "^7Server^7"
+
+set scr_dm_scorelimit "1500"
+set scr_dm_timelimit "10"
+set scr_dm_playerrespawndelay "0"
+set scr_dm_numlives "0"
+set scr_dm_roundlimit "1"
+set scr_dm_winlimit "1"
+
+set scr_war_scorelimit "7500"
+set scr_war_timelimit "10"
+set scr_war_playerrespawndelay "0"
+set scr_war_waverespawndelay "0"
+set scr_war_numlives "0"
+set scr_war_roundlimit "1"
+set scr_war_winlimit "1"
+
+set scr_conf_scorelimit "7500"
+set scr_conf_timelimit "10"
+set scr_conf_playerrespawndelay "0"
+set scr_conf_waverespawndelay "0"
+set scr_conf_numlives "0"
+set scr_conf_roundlimit "1"
+set scr_conf_winlimit "1"
+
+set scr_dom_scorelimit "200"
+set scr_dom_timelimit "0"
+set scr_dom_playerrespawndelay "0"
+set scr_dom_waverespawndelay "0"
+set scr_dom_numlives "0"
+set scr_dom_roundlimit "1"
+set scr_dom_winlimit "1"
+
+set scr_sd_scorelimit "1"
+set scr_sd_timelimit "2.5"
+set scr_sd_playerrespawndelay "0"
+set scr_sd_waverespawndelay "0"
+set scr_sd_numlives "1"
+set scr_sd_roundlimit "0"
+set scr_sd_winlimit "4"
+set scr_sd_roundswitch "3"
+set scr_sd_bombtimer "45"
+set scr_sd_defusetime "5"
+set scr_sd_multibomb "0"
+set scr_sd_planttime "5"
+
+set scr_sab_scorelimit "0"
+set scr_sab_timelimit "20"
+set scr_sab_bombtimer "30"
+set scr_sab_defusetime "5"
+set scr_sab_hotpotato "0"
+set scr_sab_numlives "0"
+set scr_sab_planttime "2.5"
+set scr_sab_playerrespawndelay "7.5"
+set scr_sab_roundlimit "1"
+set scr_sab_roundswitch "1"
+set scr_sab_waverespawndelay "0"
+
+set g_gametype "dom"
+set sv_maprotation "gametype dom map mp_farm map mp_bog map mp_crash map mp_vacant"
+
+// CUSTOM DVARS H2M CFG EDITOR //
+"""
+
+
+def load_maps(path="maps.txt"):
+    return MapCatalog.from_file(path)
+
+
+_default_items = None
+
+
+def default_config():
+    # The template never changes, so it is parsed once per process
+    global _default_items
+    if _default_items is None:
+        _default_items = tuple((record.key, record.value) for record in cfgparse.parse_text(DEFAULT_CONFIG)
+                               if record.kind == "dvar")
+    return dict(_default_items)
+
+
+def read_records(records, config=None, custom_dvars=None, map_rotation=None):
+    config = {} if config is None else config
+    custom_dvars = {} if custom_dvars is None else custom_dvars
+    map_rotation = [] if map_rotation is None else map_rotation
+
+    custom_section = False
+    for record in records:
+        if record.kind == "comment" and record.raw.strip() == CUSTOM_DVAR_MARKER:
+            custom_section = True
+        elif record.kind == "dvar":
+            if custom_section:
+                custom_dvars[record.key] = record.value
+            else:
+                config[record.key] = record.value
+                if record.key == "sv_maprotation":
+                    map_rotation[:] = parse_map_rotation(record.value)
+    return config, custom_dvars, map_rotation
+
+
+def parse_config(content, config=None, custom_dvars=None, map_rotation=None):
+    return read_records(cfgparse.parse_text(content), config, custom_dvars, map_rotation)
+
+
+def load_config(path="server.cfg", config=None, custom_dvars=None, map_rotation=None):
+    return read_records(cfgparse.parse_file(path), config, custom_dvars, map_rotation)
+
+
+def parse_map_rotation(rotation_string, gametype=None):
+    rotation = []
+    parts = rotation_string.split()
+    i = 0
+    while i < len(parts):
+        if parts[i] == "gametype" and i + 1 < len(parts):
+            gametype = parts[i+1]
+            i += 2
+        elif parts[i] == "map" and i + 1 < len(parts):
+            rotation.append((gametype, parts[i+1]))
+            i += 2
+        else:
+            i += 1
+    return rotation
+
+
+def generate_map_rotation_string(map_rotation):
+    rotation_parts = []
+    current_gametype = None
+    for gametype, map_code in map_rotation:
+        if gametype != current_gametype:
+            rotation_parts.extend(["gametype", gametype])
+            current_gametype = gametype
+        rotation_parts.extend(["map", map_code])
+    return " ".join(rotation_parts)
+
+
+def render_config(config, custom_dvars, map_rotation):
+    config = dict(config)
+    config["sv_maprotation"] = generate_map_rotation_string(map_rotation)
+
+    # Start with the default configuration and update it with the current settings
+    config_lines = []
+    template_keys = set()
+    for record in cfgparse.parse_text(DEFAULT_CONFIG):
+        if record.kind == "dvar" and record.key in config:
+            template_keys.add(record.key)
+            if config[record.key] != record.value:
+                config_lines.append(cfgparse.replace_value(record, config[record.key]))
+                continue
+        config_lines.append(record.raw)
+
+    # Keep dvars that are not part of the template
+    extra_lines = [f'set {key} {cfgparse.quote(value)}' for key, value in config.items()
+                   if key not in template_keys]
+
+    # Add custom DVars
+    custom_dvar_section = [CUSTOM_DVAR_MARKER]
+    for key, value in custom_dvars.items():
+        custom_dvar_section.append(f'set {key} {cfgparse.quote(value)}')
+
+    # Find the custom DVars section and replace it
+    custom_start = -1
+    for i, line in enumerate(config_lines):
+        if line.strip() == CUSTOM_DVAR_MARKER:
+            custom_start = i
+            break
+
+    if custom_start != -1:
+        config_lines = config_lines[:custom_start] + extra_lines + custom_dvar_section
+    else:
+        config_lines.extend(extra_lines + custom_dvar_section)
+
+    return '\n'.join(config_lines)
+
+
+def merge_dvars(base, mine, theirs):
+    """Three-way merge of dvar dicts (a missing key counts as None).
+
+    Returns (merged, applied, conflicts): merged starts from mine and takes
+    every change theirs made to base that mine did not also make; applied
+    lists those keys, and conflicts maps key -> (mine, theirs) where both
+    sides changed the same dvar differently. Conflicting keys keep mine.
+    """
+    merged = dict(mine)
+    applied = []
+    conflicts = {}
+    for key in list(base) + [key for key in theirs if key not in base]:
+        base_value = base.get(key)
+        their_value = theirs.get(key)
+        if base_value == their_value:
+            continue
+        my_value = mine.get(key)
+        if my_value == their_value:
+            continue
+        if my_value == base_value:
+            if their_value is None:
+                merged.pop(key, None)
+            else:
+                merged[key] = their_value
+            applied.append(key)
+        else:
+            conflicts[key] = (my_value, their_value)
+    return merged, applied, conflicts
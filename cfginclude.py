@@ -0,0 +1,344 @@
+"""Resolve the `exec` include chains of a server config into the dvars the engine ends up with.
+
+The root config and every file it execs, directly or through other includes,
+form an include graph. Files on the same level of the graph are read
+concurrently, and each file's parse is memoized by its mtime and size (and
+cached on disk like every other parse), so after one include changes only
+that file is parsed again. The effective dvars are evaluated in engine order,
+a later assignment replacing an earlier one, and each remembers the file and
+line it came from so edits can be written back where the value is defined.
+"""
+import argparse
+import os
+import sys
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import cfgcache
+import cfgcore
+import cfgparse
+import cfgsave
+import history
+
+Origin = namedtuple("Origin", "path lineno")
+# config, custom_dvars and map_rotation have the shape cfgcore.read_records returns; origins maps every
+# dvar to the Origin of the assignment in effect, graph maps each file to the files it execs in order,
+# cycles lists exec chains that lead back into themselves and reparsed the files parsed by this resolve
+Resolution = namedtuple("Resolution", "config custom_dvars map_rotation origins graph cycles missing reparsed")
+
+
+def parse_statements(data):
+    """Reduce a cfg file to its (kind, key, value, lineno) dvar, exec and custom marker statements."""
+    statements = []
+    for record in cfgparse.parse_text(data.decode("utf-8", errors="replace")):
+        if record.kind == "dvar":
+            statements.append(("dvar", record.key, record.value, record.lineno))
+        elif record.kind == "exec":
+            statements.append(("exec", record.key, None, record.lineno))
+        elif record.kind == "comment" and record.raw.strip() == cfgcore.CUSTOM_DVAR_MARKER:
+            statements.append(("marker", None, None, record.lineno))
+    return tuple(statements)
+
+
+def _statements_from_data(data):
+    return tuple(tuple(statement) for statement in data)
+
+
+def edit_lines(text, edits):
+    """Set {(lineno, key): value} in text, editing the last assignment of key on each line.
+
+    Returns (new text, [(key, old, new)] for the values changed, keys with no assignment on their line).
+    """
+    lines = text.split("\n")
+    changed = []
+    missing = []
+    by_line = {}
+    for (lineno, key), value in edits.items():
+        by_line.setdefault(lineno, {})[key] = value
+    for lineno, values in by_line.items():
+        if lineno > len(lines):
+            missing.extend(values)
+            continue
+        line = lines[lineno - 1]
+        ending = "\r" if line.endswith("\r") else ""
+        line = line[:len(line) - len(ending)]
+        last = {}
+        for record in cfgparse.tokenize([line], lineno):
+            if record.kind == "dvar" and record.key in values:
+                last[record.key] = record
+        missing.extend(key for key in values if key not in last)
+        for record in sorted(last.values(), key=lambda record: record.value_span, reverse=True):
+            value = values[record.key]
+            if value != record.value:
+                start, end = record.value_span
+                line = line[:start] + cfgparse.quote(value) + line[end:]
+                changed.append((record.key, record.value, value))
+        lines[lineno - 1] = line + ending
+    return "\n".join(lines), changed, missing
+
+
+class IncludeResolver:
+    """The include graph of one root config, re-resolved incrementally.
+
+    exec targets are looked up in search_paths (by default the root's own
+    directory, like the game's main folder), with ".cfg" added when the name
+    has no extension. Safe to use from several threads.
+    """
+
+    def __init__(self, root, search_paths=None, cache=None, max_workers=8):
+        self.root = os.path.abspath(root)
+        self.search_paths = [os.path.abspath(path) for path in search_paths or [os.path.dirname(self.root)]]
+        self.cache = cache
+        self.max_workers = max_workers
+        self.last = None
+        self._files = {}
+        self._lock = threading.RLock()
+
+    def locate(self, name):
+        name = name.replace("\\", "/")
+        if not os.path.splitext(name)[1]:
+            name += ".cfg"
+        for directory in self.search_paths:
+            path = os.path.normpath(os.path.join(directory, name))
+            if os.path.isfile(path):
+                return path
+        return os.path.normpath(os.path.join(self.search_paths[0], name))
+
+    def _load(self, path):
+        """Return (statements, whether they were parsed now), or None if path does not exist."""
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        fingerprint = (st.st_mtime_ns, st.st_size)
+        memo = self._files.get(path)
+        if memo is not None and memo[0] == fingerprint:
+            return memo[1], False
+        try:
+            statements = (self.cache or cfgcache.default_cache()).load(path, "statements", parse_statements,
+                                                                       from_data=_statements_from_data)
+        except FileNotFoundError:
+            return None
+        self._files[path] = (fingerprint, statements)
+        return statements, True
+
+    def invalidate(self, paths=None):
+        """Forget the memoized parse of paths (every file if None), e.g. when a watcher reports them."""
+        with self._lock:
+            if paths is None:
+                self._files.clear()
+            for path in paths or ():
+                self._files.pop(os.path.abspath(path), None)
+
+    @property
+    def paths(self):
+        """Every file of the last resolved include graph, the root first."""
+        return list(self.last.graph) if self.last is not None else [self.root]
+
+    def resolve(self):
+        """Load the include graph and evaluate it; raises FileNotFoundError if the root is missing."""
+        with self._lock:
+            statements = {}
+            graph = {}
+            missing = []
+            reparsed = []
+            seen = {self.root}
+            level = [self.root]
+            while level:
+                if len(level) > 1 and self.max_workers > 1:
+                    with ThreadPoolExecutor(max_workers=min(self.max_workers, len(level))) as pool:
+                        loaded = list(pool.map(self._load, level))
+                else:
+                    loaded = [self._load(path) for path in level]
+                next_level = []
+                for path, result in zip(level, loaded):
+                    if result is None:
+                        if path == self.root:
+                            raise FileNotFoundError(f"No such file: {path}")
+                        missing.append(path)
+                        graph[path] = []
+                        continue
+                    statements[path], fresh = result
+                    if fresh:
+                        reparsed.append(path)
+                    children = [self.locate(key) for kind, key, _, _ in statements[path] if kind == "exec"]
+                    graph[path] = children
+                    for child in children:
+                        if child not in seen:
+                            seen.add(child)
+                            next_level.append(child)
+                level = next_level
+
+            config = {}
+            custom_dvars = {}
+            map_rotation = []
+            origins = {}
+            cycles = []
+            stack = []
+
+            def walk(path):
+                stack.append(path)
+                # The editor's custom section only exists in the root config
+                custom_section = False
+                children = iter(graph[path])
+                for kind, key, value, lineno in statements[path]:
+                    if kind == "dvar":
+                        if custom_section:
+                            custom_dvars[key] = value
+                        else:
+                            config[key] = value
+                            if key == "sv_maprotation":
+                                map_rotation[:] = cfgcore.parse_map_rotation(value)
+                        origins[key] = Origin(path, lineno)
+                    elif kind == "marker":
+                        custom_section = path == self.root
+                    else:
+                        child = next(children)
+                        if child in stack:
+                            cycle = tuple(stack[stack.index(child):]) + (child,)
+                            if cycle not in cycles:
+                                cycles.append(cycle)
+                        elif child in statements:
+                            walk(child)
+                stack.pop()
+
+            walk(self.root)
+            self.last = Resolution(config, custom_dvars, map_rotation, origins, graph, cycles, missing, reparsed)
+            return self.last
+
+    def load(self):
+        """cfgcache.load_config for the whole include tree: (config, custom_dvars, map_rotation)."""
+        resolution = self.resolve()
+        return dict(resolution.config), dict(resolution.custom_dvars), list(resolution.map_rotation)
+
+    def write_values(self, values, record_history=True):
+        """Write {key: value} into the file whose assignment of key is in effect.
+
+        Returns (the paths written, the keys not written). Keys that no file of
+        the last resolution defines, or whose assignment is no longer on the
+        line it was resolved at, are left to the caller.
+        """
+        with self._lock:
+            origins = self.last.origins if self.last is not None else {}
+            by_path = {}
+            missing = []
+            for key, value in values.items():
+                origin = origins.get(key)
+                if origin is not None:
+                    by_path.setdefault(origin.path, {})[origin.lineno, key] = value
+                else:
+                    missing.append(key)
+            written = []
+            for path, edits in by_path.items():
+                try:
+                    with open(path, "rb") as f:
+                        data = f.read()
+                except FileNotFoundError:
+                    missing.extend(key for _, key in edits)
+                    continue
+                text, changed, moved = edit_lines(data.decode("utf-8", errors="surrogateescape"), edits)
+                missing.extend(moved)
+                if not changed:
+                    continue
+                new_data = text.encode("utf-8", errors="surrogateescape")
+                cfgsave.atomic_write(path, new_data)
+                if record_history:
+                    history.record_save_quietly(path, data, new_data)
+                written.append(path)
+            self.invalidate(written)
+            return written, missing
+
+    def save(self, config, custom_dvars, map_rotation, record_history=True, server=None):
+        """Save the editor's model: values in effect from an include go back to that include, the rest to the root.
+
+        Returns (the root's cfgsave.SaveResult, the include files written).
+        """
+        with self._lock:
+            # Includes may have changed since the last resolve; unchanged files cost one stat
+            try:
+                self.resolve()
+            except FileNotFoundError:
+                return cfgsave.save_config(self.root, config, custom_dvars, map_rotation, record_history,
+                                           server), []
+            included = {key for key, origin in self.last.origins.items()
+                        if origin.path != self.root and key not in self.last.custom_dvars}
+            values = {key: config[key] for key in included if key in config and key != "sv_maprotation"}
+            if "sv_maprotation" in included:
+                values["sv_maprotation"] = cfgcore.generate_map_rotation_string(map_rotation)
+            written, missing = self.write_values(values, record_history)
+            # Whatever could not be written where it is defined goes into the root instead of being lost
+            included.difference_update(missing)
+            if "sv_maprotation" in included:
+                map_rotation = []
+            root_config = {key: value for key, value in config.items() if key not in included}
+            result = cfgsave.save_config(self.root, root_config, custom_dvars, map_rotation, record_history, server)
+            self.invalidate([self.root])
+            return result, written
+
+
+def format_tree(resolution, root):
+    lines = []
+    base = os.path.dirname(root)
+
+    def name(path):
+        return os.path.relpath(path, base)
+
+    def visit(path, depth, stack):
+        note = " (missing)" if path in resolution.missing else ""
+        lines.append(f"{'  ' * depth}{name(path)}{note}")
+        for child in resolution.graph.get(path, ()):
+            if child in stack:
+                lines.append(f"{'  ' * (depth + 1)}{name(child)} (cycle, skipped)")
+            else:
+                visit(child, depth + 1, stack + (child,))
+
+    visit(root, 0, (root,))
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Show the exec include tree of a config and where each DVar comes from.")
+    parser.add_argument("config", nargs="?", default="server.cfg")
+    parser.add_argument("--search", action="append", help="extra directory to look up exec targets in")
+    parser.add_argument("--origins", action="store_true", help="list every effective DVar with its file and line")
+    parser.add_argument("--set", action="append", default=[], metavar="KEY=VALUE",
+                        help="change a DVar in the file that defines it")
+    args = parser.parse_args(argv)
+
+    search = [os.path.dirname(os.path.abspath(args.config))] + (args.search or [])
+    resolver = IncludeResolver(args.config, search)
+    try:
+        resolution = resolver.resolve()
+    except FileNotFoundError as e:
+        print(e, file=sys.stderr)
+        return 1
+
+    if args.set:
+        values = dict(pair.partition("=")[::2] for pair in args.set)
+        undefined = sorted(key for key in values if key not in resolution.origins)
+        if undefined:
+            print(f"Not defined in any file: {', '.join(undefined)}", file=sys.stderr)
+            return 1
+        written, missing = resolver.write_values(values)
+        for path in written:
+            print(f"updated {os.path.relpath(path)}")
+        if missing:
+            print(f"Could not find the assignment of: {', '.join(missing)}", file=sys.stderr)
+            return 1
+        return 0
+
+    print(format_tree(resolution, resolver.root))
+    if args.origins:
+        effective = {**resolution.config, **resolution.custom_dvars}
+        for key, origin in resolution.origins.items():
+            print(f"{key} = {effective[key]!r}  ({os.path.relpath(origin.path)}:{origin.lineno})")
+    for cycle in resolution.cycles:
+        print("cycle: " + " -> ".join(os.path.relpath(path) for path in cycle), file=sys.stderr)
+    for path in resolution.missing:
+        print(f"missing: {os.path.relpath(path)}", file=sys.stderr)
+    return 1 if resolution.cycles or resolution.missing else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,134 @@
+"""Compact, Tk-free in-memory model of a server config, for holding many configs at once.
+
+Every config shares one KeyTable that gives each dvar name a slot number, so a
+ServerConfig stores its values in a plain list instead of a dict of its own.
+Names, short values and rotation entries are interned, so thousands of configs
+made from the same template share the strings they have in common.
+"""
+import sys
+from collections.abc import MutableMapping
+
+import cfgcore
+
+# Longer values (hostnames, rotation strings) are rarely shared between configs
+INTERN_MAX_LENGTH = 64
+
+
+def intern_value(value):
+    return sys.intern(value) if type(value) is str and len(value) <= INTERN_MAX_LENGTH else value
+
+
+_entries = {}
+
+
+def rotation_entry(gametype, map_code):
+    """The one shared (gametype, map_code) tuple for this pair."""
+    entry = (gametype, map_code)
+    return _entries.setdefault(entry, entry)
+
+
+class KeyTable:
+    """Interned dvar names, each with a fixed slot number."""
+
+    __slots__ = ("keys", "slots")
+
+    def __init__(self, keys=()):
+        self.keys = []
+        self.slots = {}
+        for key in keys:
+            self.slot(key)
+
+    def slot(self, key):
+        slot = self.slots.get(key)
+        if slot is None:
+            key = sys.intern(key)
+            slot = self.slots[key] = len(self.keys)
+            self.keys.append(key)
+        return slot
+
+    def __len__(self):
+        return len(self.keys)
+
+
+# Shared by every ServerConfig unless one is given; the template's dvars come first
+SHARED_KEYS = KeyTable(cfgcore.default_config())
+
+
+class ServerConfig(MutableMapping):
+    """The dvars of one config as a mapping, plus its custom dvars and map rotation.
+
+    Iterates in key table order, which for the template's dvars is the
+    template's order. Unset dvars cost one list entry.
+    """
+
+    __slots__ = ("table", "values", "custom_dvars", "map_rotation")
+
+    def __init__(self, config=(), custom_dvars=(), map_rotation=(), table=None):
+        self.table = table if table is not None else SHARED_KEYS
+        self.values = []
+        self.custom_dvars = {sys.intern(key): intern_value(value) for key, value in dict(custom_dvars).items()}
+        self.map_rotation = [rotation_entry(gametype, map_code) for gametype, map_code in map_rotation]
+        self.update(config)
+
+    @classmethod
+    def load(cls, path="server.cfg", table=None):
+        import cfgcache
+
+        config, custom_dvars, map_rotation = cfgcache.load_config(path)
+        return cls(config, custom_dvars, map_rotation, table)
+
+    def __getitem__(self, key):
+        slot = self.table.slots.get(key)
+        value = self.values[slot] if slot is not None and slot < len(self.values) else None
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        slot = self.table.slot(key)
+        values = self.values
+        if slot >= len(values):
+            values.extend([None] * (slot + 1 - len(values)))
+        values[slot] = intern_value(value)
+
+    def __delitem__(self, key):
+        slot = self.table.slots.get(key)
+        if slot is None or slot >= len(self.values) or self.values[slot] is None:
+            raise KeyError(key)
+        self.values[slot] = None
+        while self.values and self.values[-1] is None:
+            self.values.pop()
+
+    def __contains__(self, key):
+        slot = self.table.slots.get(key)
+        return slot is not None and slot < len(self.values) and self.values[slot] is not None
+
+    def __iter__(self):
+        keys = self.table.keys
+        for slot, value in enumerate(self.values):
+            if value is not None:
+                yield keys[slot]
+
+    def __len__(self):
+        return len(self.values) - self.values.count(None)
+
+    def items(self):
+        keys = self.table.keys
+        return [(keys[slot], value) for slot, value in enumerate(self.values) if value is not None]
+
+    def to_dict(self):
+        return dict(self.items())
+
+    def dvars(self):
+        """Every dvar including the custom ones, as the server sees them."""
+        dvars = self.to_dict()
+        if self.map_rotation or "sv_maprotation" in dvars:
+            dvars["sv_maprotation"] = cfgcore.generate_map_rotation_string(self.map_rotation)
+        dvars.update(self.custom_dvars)
+        return dvars
+
+    def render(self):
+        return cfgcore.render_config(self.to_dict(), self.custom_dvars, self.map_rotation)
+
+    def __repr__(self):
+        return f"<ServerConfig {len(self)} dvars, {len(self.custom_dvars)} custom, {len(self.map_rotation)} maps>"
@@ -0,0 +1,136 @@
+"""Streaming tokenizer for Quake-style cfg files (set/seta/sets/setu, exec, comments)."""
+import re
+from collections import namedtuple
+
+# kind is one of "dvar", "exec", "command", "comment", "blank" or "unknown".
+# lineno is 1-based, span and value_span are column ranges within raw.
+Record = namedtuple("Record", "kind command key value lineno span value_span comment raw")
+
+SET_COMMANDS = frozenset(("set", "seta", "sets", "setu"))
+
+# Fast path for the overwhelmingly common `set key "value"` line
+_SIMPLE_SET = re.compile(r'[ \t]*(set[asu]?)[ \t]+([^\s";]+)[ \t]+("[^"\\]*"|[^\s";/]+)[ \t]*(?://(.*))?$')
+
+
+def _scan(line, start):
+    """Split one statement starting at column start into words.
+
+    Returns (words, word spans, quoted flags, statement end, comment) where the
+    statement ends at an unquoted ';', a '//' comment or the end of the line.
+    """
+    words = []
+    spans = []
+    quoted = []
+    comment = None
+    i = start
+    n = len(line)
+    while i < n:
+        c = line[i]
+        if c == " " or c == "\t":
+            i += 1
+        elif c == ";":
+            return words, spans, quoted, i, None
+        elif c == "/" and line.startswith("//", i):
+            comment = line[i + 2:]
+            return words, spans, quoted, i, comment
+        elif c == '"':
+            j = i + 1
+            chunks = []
+            while j < n and line[j] != '"':
+                if line[j] == "\\" and j + 1 < n and line[j + 1] == '"':
+                    chunks.append('"')
+                    j += 2
+                else:
+                    chunks.append(line[j])
+                    j += 1
+            words.append("".join(chunks))
+            spans.append((i, min(j + 1, n)))
+            quoted.append(True)
+            i = j + 1
+        else:
+            j = i
+            while j < n and line[j] not in ' \t";' and not line.startswith("//", j):
+                j += 1
+            words.append(line[i:j])
+            spans.append((i, j))
+            quoted.append(False)
+            i = j
+    return words, spans, quoted, n, comment
+
+
+def _statement_records(line, lineno):
+    start = 0
+    n = len(line)
+    while True:
+        words, spans, quoted, end, comment = _scan(line, start)
+        span = (spans[0][0], spans[-1][1]) if spans else (start, end)
+        if not words:
+            if comment is not None:
+                yield Record("comment", None, None, None, lineno, (end, n), None, comment, line)
+            elif start == 0:
+                yield Record("blank", None, None, None, lineno, (0, n), None, None, line)
+        else:
+            command = words[0].lower()
+            if command in SET_COMMANDS and len(words) >= 3:
+                if len(words) == 3 or quoted[2]:
+                    value = words[2]
+                    value_span = spans[2]
+                else:
+                    # Unquoted multi-word values are joined by the engine
+                    value_span = (spans[2][0], spans[-1][1])
+                    value = line[value_span[0]:value_span[1]]
+                yield Record("dvar", command, words[1], value, lineno, span, value_span, comment, line)
+            elif command == "exec" and len(words) >= 2:
+                yield Record("exec", command, words[1], None, lineno, span, spans[1], comment, line)
+            elif command in SET_COMMANDS:
+                yield Record("unknown", command, None, None, lineno, span, None, comment, line)
+            else:
+                value = " ".join(words[1:])
+                yield Record("command", command, None, value, lineno, span, None, comment, line)
+        if end >= n or comment is not None:
+            return
+        start = end + 1
+
+
+def tokenize(lines, first_lineno=1):
+    """Yield Records for an iterable of lines (e.g. an open file)."""
+    simple_match = _SIMPLE_SET.match
+    make = Record._make
+    for lineno, line in enumerate(lines, first_lineno):
+        line = line.rstrip("\r\n")
+        m = simple_match(line)
+        if m is not None:
+            command, key, value, comment = m.groups()
+            value_span = m.span(3)
+            if value[0] == '"':
+                value = value[1:-1]
+            yield make(("dvar", command, key, value, lineno, (m.start(1), value_span[1]),
+                        value_span, comment, line))
+            continue
+        stripped = line.strip()
+        if not stripped:
+            yield Record("blank", None, None, None, lineno, (0, len(line)), None, None, line)
+        elif stripped.startswith("//"):
+            start = line.index("//")
+            yield Record("comment", None, None, None, lineno, (start, len(line)), None, line[start + 2:], line)
+        else:
+            yield from _statement_records(line, lineno)
+
+
+def parse_text(text):
+    return tokenize(text.split("\n"))
+
+
+def parse_file(path, encoding="utf-8"):
+    with open(path, "r", encoding=encoding, errors="replace", newline="") as f:
+        yield from tokenize(f)
+
+
+def quote(value):
+    return '"' + value.replace('"', '\\"') + '"'
+
+
+def replace_value(record, value):
+    """Return record.raw with the dvar value swapped, keeping everything else on the line."""
+    start, end = record.value_span
+    return record.raw[:start] + quote(value) + record.raw[end:]
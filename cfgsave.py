@@ -0,0 +1,214 @@
+"""Format-preserving, change-detecting and atomic server.cfg writer."""
+import os
+import tempfile
+from collections import namedtuple
+
+import cfgcore
+import cfgparse
+import history
+import profiling
+
+# changed is a list of (key, old value, new value); added and removed list keys.
+# snapshot is the history.Snapshot recorded for the save, if any.
+SaveResult = namedtuple("SaveResult", "path written changed added removed bytes_written snapshot")
+
+# The process umask, for files that do not exist yet. Reading it means setting it, which
+# affects every thread, so it is read once at import and never while the editor saves in
+# the background; the placeholder is restrictive in case anything is created meanwhile.
+_UMASK = os.umask(0o077)
+os.umask(_UMASK)
+
+
+def _decode(data):
+    return data.decode("utf-8", errors="surrogateescape")
+
+
+def _encode(text):
+    return text.encode("utf-8", errors="surrogateescape")
+
+
+def plan_save(original, config, custom_dvars, map_rotation, remove=()):
+    """Apply the model to the original cfg text with the smallest set of line edits.
+
+    Returns (new text, changed, added, removed). Lines the model does not own
+    (comments, exec lines, unknown commands) are kept byte for byte. Every
+    assignment of a key in remove is dropped from outside the custom section.
+    """
+    rotation = list(map_rotation)
+    remove = set(remove)
+    desired = dict(config)
+    if "sv_maprotation" in config or rotation:
+        desired["sv_maprotation"] = cfgcore.generate_map_rotation_string(rotation)
+
+    lines = original.split("\n")
+    records = list(cfgparse.tokenize(lines))
+    newline = "\r\n" if "\r\n" in original else "\n"
+
+    # The engine applies the last assignment, so that is the one we edit
+    custom_section = False
+    last_config = {}
+    marker_line = None
+    last_custom_line = None
+    for i, record in enumerate(records):
+        if record.kind == "comment" and record.raw.strip() == cfgcore.CUSTOM_DVAR_MARKER:
+            custom_section = True
+            marker_line = last_custom_line = record.lineno
+        elif record.kind == "dvar":
+            if custom_section:
+                last_custom_line = record.lineno
+            else:
+                last_config[record.key] = i
+
+    edits = {}
+    changed = []
+    removed = []
+    seen_custom = set()
+    custom_section = False
+    for i, record in enumerate(records):
+        if record.kind == "comment" and record.raw.strip() == cfgcore.CUSTOM_DVAR_MARKER:
+            custom_section = True
+            continue
+        if record.kind != "dvar":
+            continue
+        key = record.key
+        if custom_section:
+            if key not in custom_dvars:
+                edits.setdefault(record.lineno, []).append((record.span, None))
+                removed.append(key)
+                continue
+            seen_custom.add(key)
+            value = custom_dvars[key]
+        else:
+            if key in remove:
+                edits.setdefault(record.lineno, []).append((record.span, None))
+                if last_config[key] == i:
+                    removed.append(key)
+                continue
+            if key not in desired or last_config[key] != i:
+                continue
+            value = desired[key]
+            if key == "sv_maprotation" and cfgcore.parse_map_rotation(record.value) == rotation:
+                continue
+        if value != record.value:
+            edits.setdefault(record.lineno, []).append((record.value_span, cfgparse.quote(value)))
+            changed.append((key, record.value, value))
+
+    for lineno, line_edits in edits.items():
+        line = lines[lineno - 1]
+        ending = "\r" if line.endswith("\r") else ""
+        line = line[:len(line) - len(ending)]
+        for (start, end), replacement in sorted(line_edits, reverse=True):
+            if replacement is None:
+                # Drop the statement together with a ';' separator next to it
+                rest = line[end:].lstrip(" \t")
+                if rest.startswith(";"):
+                    end = len(line) - len(rest) + 1
+                line = line[:start] + line[end:]
+            else:
+                line = line[:start] + replacement + line[end:]
+        if any(replacement is None for _, replacement in line_edits) and not line.strip(" \t;"):
+            lines[lineno - 1] = None
+        else:
+            lines[lineno - 1] = line + ending
+
+    # New dvars go before the custom section, new custom dvars at its end
+    added = []
+    config_lines = []
+    for key, value in desired.items():
+        if key not in last_config and key not in remove:
+            config_lines.append(f'set {key} {cfgparse.quote(value)}')
+            added.append(key)
+    custom_lines = []
+    for key, value in custom_dvars.items():
+        if key not in seen_custom:
+            custom_lines.append(f'set {key} {cfgparse.quote(value)}')
+            added.append(key)
+
+    ending = "\r" if newline == "\r\n" else ""
+    if marker_line is not None:
+        # Insert from the bottom up so the earlier position stays valid
+        lines[last_custom_line:last_custom_line] = [line + ending for line in custom_lines]
+        lines[marker_line - 1:marker_line - 1] = [line + ending for line in config_lines]
+    elif config_lines or custom_lines:
+        if custom_lines:
+            custom_lines.insert(0, cfgcore.CUSTOM_DVAR_MARKER)
+        insert_at = len(lines) - 1 if lines[-1] == "" else len(lines)
+        lines[insert_at:insert_at] = [line + ending for line in config_lines + custom_lines]
+
+    text = "\n".join(line for line in lines if line is not None)
+    return text, changed, added, removed
+
+
+def atomic_write(path, data):
+    """Write data through a temp file in the same directory, fsync it and rename it over path."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        try:
+            mode = os.stat(path).st_mode & 0o7777
+        except FileNotFoundError:
+            mode = 0o666 & ~_UMASK
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+        profiling.count("bytes written", len(data))
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+    # Make the rename itself durable where the platform allows it
+    if hasattr(os, "O_DIRECTORY"):
+        dir_fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+
+def save_config(path, config, custom_dvars, map_rotation, record_history=True, server=None):
+    try:
+        with open(path, "rb") as f:
+            original_data = f.read()
+    except FileNotFoundError:
+        original_data = None
+
+    if original_data is None:
+        text = cfgcore.render_config(config, custom_dvars, map_rotation).replace("\n", os.linesep)
+        changed = []
+        added = list(config) + list(custom_dvars)
+        removed = []
+    else:
+        text, changed, added, removed = plan_save(_decode(original_data), config, custom_dvars, map_rotation)
+
+    data = _encode(text)
+    if data == original_data:
+        return SaveResult(path, False, [], [], [], 0, None)
+
+    atomic_write(path, data)
+    snapshot = None
+    if record_history:
+        snapshot = history.record_save_quietly(path, original_data, data, server)
+    return SaveResult(path, True, changed, added, removed, len(data), snapshot)
+
+
+def describe(result):
+    if not result.written:
+        return "No changes to save."
+    parts = []
+    if result.changed:
+        parts.append(f"{len(result.changed)} changed")
+    if result.added:
+        parts.append(f"{len(result.added)} added")
+    if result.removed:
+        parts.append(f"{len(result.removed)} removed")
+    summary = ", ".join(parts) or "formatting only"
+    message = f"Configuration saved successfully! DVars: {summary}. {result.bytes_written} bytes written."
+    if result.snapshot is not None:
+        message += f" Saved as version #{result.snapshot.id}."
+    return message
@@ -0,0 +1,147 @@
+"""Incremental search index over a dvar dict, kept in sync with an ObservableDict."""
+
+
+def _trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class DvarIndex:
+    """Finds dvars by substring of their name or value, by category and by whether they differ from default.
+
+    Every name and value is indexed by its trigrams, so a query only looks at
+    dvars that contain all of the query's trigrams. A query that extends the
+    previous one (the usual case while typing) only re-checks the previous
+    hits. The index follows the model's change events one dvar at a time.
+    Trigrams are added by index_some() in bounded steps, meant for idle
+    callbacks; dvars that are not indexed yet are simply scanned, so searches
+    are correct at any point.
+    """
+
+    def __init__(self, model, category_for=None, default_for=None):
+        self.model = model
+        self.category_for = category_for or (lambda key: "")
+        self.default_for = default_for or (lambda key: None)
+        self._built = False
+        self._texts = {}
+        self._grams = {}
+        self._unindexed = set()
+        self._categories = {}
+        self._last = None
+        model.subscribe(self._on_change)
+
+    def _build(self):
+        self._texts.clear()
+        self._grams.clear()
+        self._unindexed.clear()
+        self._categories.clear()
+        for key, value in self.model.items():
+            self._add(key, value)
+        self._built = True
+
+    def index_some(self, limit=2000):
+        """Index up to limit pending dvars; returns True while more are left."""
+        if not self._built:
+            self._build()
+        grams = self._grams
+        texts = self._texts
+        for _ in range(min(limit, len(self._unindexed))):
+            key = self._unindexed.pop()
+            for gram in _trigrams(texts[key]):
+                keys = grams.get(gram)
+                if keys is None:
+                    grams[gram] = {key}
+                else:
+                    keys.add(key)
+        return bool(self._unindexed)
+
+    def _add(self, key, value):
+        self._texts[key] = f"{key}\0{value}".lower()
+        self._unindexed.add(key)
+        self._categories[key] = self.category_for(key)
+
+    def _remove(self, key):
+        text = self._texts.pop(key, None)
+        if text is None:
+            return
+        del self._categories[key]
+        if key in self._unindexed:
+            self._unindexed.discard(key)
+            return
+        for gram in _trigrams(text):
+            keys = self._grams[gram]
+            keys.discard(key)
+            if not keys:
+                del self._grams[gram]
+
+    def _on_change(self, op, *args):
+        self._last = None
+        if not self._built:
+            return
+        if op == "set":
+            key = args[0]
+            self._remove(key)
+            self._add(key, self.model[key])
+        elif op == "delete":
+            self._remove(args[0])
+        elif op == "rename":
+            old_key, new_key = args
+            self._remove(old_key)
+            self._remove(new_key)
+            self._add(new_key, self.model[new_key])
+        elif op == "reset":
+            self._built = False
+
+    def categories(self):
+        if not self._built:
+            self._build()
+        return sorted(set(self._categories.values()))
+
+    def differs(self, key):
+        """True unless the dvar has a known default and is set to it."""
+        default = self.default_for(key)
+        return default is None or self.model[key] != default
+
+    def _matching(self, query):
+        """Return the set of keys whose name or value contains query (None means every key)."""
+        if not query:
+            return None
+        last = self._last
+        if last is not None and query.startswith(last[0]):
+            candidates = last[1]
+        elif len(query) >= 3:
+            postings = sorted((self._grams.get(gram, ()) for gram in _trigrams(query)), key=len)
+            candidates = set(postings[0])
+            for keys in postings[1:]:
+                if not candidates:
+                    break
+                candidates &= keys
+            candidates |= self._unindexed
+        else:
+            candidates = self._texts.keys()
+        texts = self._texts
+        hits = {key for key in candidates if query in texts[key]}
+        self._last = (query, hits)
+        return hits
+
+    def search(self, query="", category=None, changed_only=False):
+        """Return matching keys in model order, dvars whose name starts with query first."""
+        if not self._built:
+            self._build()
+        query = query.strip().lower()
+        hits = self._matching(query)
+        texts = self._texts
+        categories = self._categories
+        prefixed = []
+        others = []
+        for key in self.model:
+            if hits is not None and key not in hits:
+                continue
+            if category is not None and categories[key] != category:
+                continue
+            if changed_only and not self.differs(key):
+                continue
+            if query and texts[key].startswith(query):
+                prefixed.append(key)
+            else:
+                others.append(key)
+        return prefixed + others
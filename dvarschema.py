@@ -0,0 +1,277 @@
+"""Typed schema for server dvars, with a compiled validator for single configs and whole fleets."""
+import argparse
+import json
+import math
+import re
+import sys
+from collections import namedtuple
+
+import cfgcore
+
+DvarSpec = namedtuple("DvarSpec", "name type default minimum maximum choices category")
+Issue = namedtuple("Issue", "key value message")
+
+TYPES = ("int", "float", "bool", "enum", "string")
+
+# Dvar names are identifiers; the engine truncates anything longer than this
+DVAR_NAME = re.compile(r"[A-Za-z_][A-Za-z0-9_]*\Z")
+MAX_NAME_LENGTH = 64
+
+SERVER_DVARS = [
+    # name, type, minimum, maximum, choices, category
+    ("sv_hostname", "string", None, None, None, "Server"),
+    ("g_password", "string", None, None, None, "Server"),
+    ("sv_maxclients", "int", 1, 64, None, "Server"),
+    ("sv_timeout", "int", 0, None, None, "Server"),
+    ("sv_reconnectlimit", "int", 0, None, None, "Server"),
+    ("g_inactivity", "int", 0, None, None, "Server"),
+    ("sv_kickBanTime", "int", 0, None, None, "Server"),
+    ("g_allowVote", "bool", None, None, None, "Server"),
+    ("g_deadChat", "bool", None, None, None, "Server"),
+    ("sv_privateClients", "int", 0, 64, None, "Server"),
+    ("sv_privatePassword", "string", None, None, None, "Server"),
+    ("logfile", "enum", None, None, ("0", "1", "2", "3"), "Logging"),
+    ("g_logSync", "bool", None, None, None, "Logging"),
+    ("g_log", "string", None, None, None, "Logging"),
+    ("rcon_password", "string", None, None, None, "Server"),
+    ("sv_sayName", "string", None, None, None, "Server"),
+    # Not an enum: mods add gametypes of their own, and an unknown one must not block saving
+    ("g_gametype", "string", None, None, None, "Server"),
+    ("sv_maprotation", "string", None, None, None, "Map Rotation"),
+    ("net_port", "int", 1, 65535, None, "Server"),
+]
+
+# scr_<gametype>_<setting>, shared by every gametype
+GAMETYPE_SETTINGS = {
+    "scorelimit": ("int", 0, None),
+    "timelimit": ("float", 0, None),
+    "playerrespawndelay": ("float", 0, None),
+    "waverespawndelay": ("float", 0, None),
+    "numlives": ("int", 0, None),
+    "roundlimit": ("int", 0, None),
+    "winlimit": ("int", 0, None),
+    "roundswitch": ("int", 0, None),
+    "bombtimer": ("float", 0, None),
+    "defusetime": ("float", 0, None),
+    "planttime": ("float", 0, None),
+    "multibomb": ("bool", None, None),
+    "hotpotato": ("bool", None, None),
+}
+GAMETYPE_DVAR = re.compile(r"scr_([a-z0-9]+)_([a-z]+)\Z")
+
+
+def validate_name(name):
+    """Return why name cannot be used as a dvar name, or None if it can."""
+    if not name:
+        return "A DVar name cannot be empty."
+    if len(name) > MAX_NAME_LENGTH:
+        return f"A DVar name cannot be longer than {MAX_NAME_LENGTH} characters."
+    if not DVAR_NAME.match(name):
+        return "A DVar name may only contain letters, digits and underscores, and cannot start with a digit."
+    return None
+
+
+def _number(value, convert):
+    try:
+        number = convert(value.strip())
+    except ValueError:
+        return None
+    return number if convert is int or math.isfinite(number) else None
+
+
+def _checker(spec):
+    """Build a function value -> error message (or None) for one spec."""
+    def in_range(number):
+        if spec.minimum is not None and number < spec.minimum:
+            return f"must be at least {spec.minimum}"
+        if spec.maximum is not None and number > spec.maximum:
+            return f"must be at most {spec.maximum}"
+        return None
+
+    if spec.type == "int":
+        def check(value):
+            number = _number(value, int)
+            return "must be a whole number" if number is None else in_range(number)
+    elif spec.type == "float":
+        def check(value):
+            number = _number(value, float)
+            return "must be a number" if number is None else in_range(number)
+    elif spec.type == "bool":
+        def check(value):
+            return None if value in ("0", "1") else "must be 0 or 1"
+    elif spec.type == "enum":
+        choices = frozenset(spec.choices)
+        message = "must be one of " + ", ".join(spec.choices)
+
+        def check(value):
+            return None if value in choices else message
+    else:
+        def check(value):
+            return "cannot contain line breaks" if "\n" in value or "\r" in value else None
+    return check
+
+
+class SchemaRegistry:
+    """Known dvars by name, plus the scr_<gametype>_* families matched by pattern.
+
+    Checkers are compiled once per dvar name and memoized, so validating a
+    batch of configs costs one dict lookup and one check per dvar.
+    """
+
+    def __init__(self):
+        self.specs = {}
+        self.custom = {}
+        self._checks = {}
+
+    def register(self, name, type="string", default=None, minimum=None, maximum=None, choices=None,
+                 category="Custom", custom=True):
+        if type not in TYPES:
+            raise ValueError(f"Unknown dvar type: {type}")
+        if type == "enum" and not choices:
+            raise ValueError(f"Enum dvar {name} needs a list of choices")
+        error = validate_name(name)
+        if error:
+            raise ValueError(error)
+        spec = DvarSpec(name, type, default, minimum, maximum, tuple(choices) if choices else None, category)
+        self.specs[name] = spec
+        if custom:
+            self.custom[name] = spec
+        self._checks.pop(name, None)
+        return spec
+
+    def unregister(self, name):
+        self.specs.pop(name, None)
+        self.custom.pop(name, None)
+        self._checks.pop(name, None)
+
+    def spec_for(self, name):
+        spec = self.specs.get(name)
+        if spec is not None:
+            return spec
+        match = GAMETYPE_DVAR.match(name)
+        if match and match.group(2) in GAMETYPE_SETTINGS:
+            type, minimum, maximum = GAMETYPE_SETTINGS[match.group(2)]
+            return DvarSpec(name, type, None, minimum, maximum, None, "Gametype")
+        return None
+
+    def category_for(self, name):
+        spec = self.spec_for(name)
+        return spec.category if spec is not None else "Unknown"
+
+    def default_for(self, name):
+        spec = self.spec_for(name)
+        return spec.default if spec is not None else None
+
+    def _check_for(self, name):
+        try:
+            return self._checks[name]
+        except KeyError:
+            spec = self.spec_for(name)
+            check = self._checks[name] = _checker(spec) if spec is not None else None
+            return check
+
+    def check(self, name, value):
+        """Return the Issue for one dvar value, or None if it is valid."""
+        check = self._check_for(name)
+        message = check(value) if check is not None else None
+        return Issue(name, value, f"{name} {message}") if message else None
+
+    def validate(self, dvars):
+        """Return a list of Issues for every invalid value in a dvar dict."""
+        issues = []
+        checks = self._checks
+        for name, value in dvars.items():
+            check = checks.get(name, False)
+            if check is False:
+                check = self._check_for(name)
+            if check is not None:
+                message = check(value)
+                if message:
+                    issues.append(Issue(name, value, f"{name} {message}"))
+        return issues
+
+    def validate_many(self, configs):
+        """Validate {config name: dvar dict} in one pass; returns {config name: Issues} for invalid configs."""
+        results = {}
+        for config_name, dvars in configs.items():
+            issues = self.validate(dvars)
+            if issues:
+                results[config_name] = issues
+        return results
+
+    def load(self, path):
+        """Register the custom dvars listed in a JSON schema file: {name: {"type": ..., "min": ...}}."""
+        with open(path, "r") as f:
+            entries = json.load(f)
+        for name, entry in entries.items():
+            self.register(name, entry.get("type", "string"), entry.get("default"), entry.get("min"),
+                          entry.get("max"), entry.get("choices"), entry.get("category", "Custom"))
+
+    def save(self, path):
+        entries = {}
+        for spec in self.custom.values():
+            entry = {"type": spec.type, "category": spec.category}
+            for key, value in (("default", spec.default), ("min", spec.minimum), ("max", spec.maximum),
+                               ("choices", list(spec.choices) if spec.choices else None)):
+                if value is not None:
+                    entry[key] = value
+            entries[spec.name] = entry
+        with open(path, "w") as f:
+            json.dump(entries, f, indent=2)
+
+
+def default_registry():
+    """A registry of the template dvars, with the template values as defaults."""
+    registry = SchemaRegistry()
+    defaults = cfgcore.default_config()
+    for name, type, minimum, maximum, choices, category in SERVER_DVARS:
+        registry.register(name, type, defaults.get(name), minimum, maximum, choices, category, custom=False)
+    for name, value in defaults.items():
+        if name in registry.specs:
+            continue
+        spec = registry.spec_for(name)
+        if spec is not None:
+            registry.register(name, spec.type, value, spec.minimum, spec.maximum, spec.choices, spec.category,
+                              custom=False)
+        else:
+            registry.register(name, "string", value, category="Server", custom=False)
+    return registry
+
+
+def format_issues(issues):
+    return "\n".join(issue.message for issue in issues)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check server.cfg files against the dvar schema.")
+    parser.add_argument("configs", nargs="*", help="cfg files to check")
+    parser.add_argument("--fleet", metavar="MANIFEST", help="check every server in a fleet manifest")
+    parser.add_argument("--schema", help="JSON file with custom dvar definitions")
+    args = parser.parse_args(argv)
+
+    registry = default_registry()
+    if args.schema:
+        registry.load(args.schema)
+
+    configs = {}
+    for path in args.configs:
+        config, custom_dvars, _ = cfgcore.load_config(path)
+        configs[path] = {**config, **custom_dvars}
+    if args.fleet:
+        import fleet
+        manifest = fleet.load_manifest(args.fleet)
+        if manifest.get("schema"):
+            registry.load(manifest["schema"])
+        for server, config, custom_dvars, _ in fleet.server_configs(manifest):
+            configs[server["name"]] = {**config, **custom_dvars}
+
+    results = registry.validate_many(configs)
+    for name, issues in results.items():
+        for issue in issues:
+            print(f"{name}: {issue.message}")
+    print(f"{len(configs) - len(results)}/{len(configs)} configs valid")
+    return 1 if results else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,225 @@
+"""Headless fleet compiler: render one server.cfg per instance from a fleet manifest."""
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import cfgcache
+import cfgcore
+import cfgsave
+import dvarschema
+import history
+import rotationcodec
+import rotationgen
+
+# Manifest keys that map straight onto a dvar
+SERVER_DVARS = {
+    "hostname": "sv_hostname",
+    "port": "net_port",
+    "maxclients": "sv_maxclients",
+    "password": "g_password",
+    "rcon_password": "rcon_password",
+    "gametype": "g_gametype",
+}
+
+
+def load_manifest(path):
+    with open(path, "r") as f:
+        manifest = json.load(f)
+
+    base_dir = os.path.dirname(os.path.abspath(path))
+    manifest.setdefault("servers", [])
+    manifest["output"] = os.path.join(base_dir, manifest.get("output", "fleet"))
+    if manifest.get("base"):
+        manifest["base"] = os.path.join(base_dir, manifest["base"])
+    manifest["maps"] = os.path.join(base_dir, manifest.get("maps", "maps.txt"))
+    if manifest.get("schema"):
+        manifest["schema"] = os.path.join(base_dir, manifest["schema"])
+    manifest.setdefault("rotation_budget", rotationcodec.ROTATION_BYTE_BUDGET)
+    return manifest
+
+
+def load_base(manifest):
+    config = cfgcore.default_config()
+    custom_dvars = {}
+    # Without a base the template's rotation is the default, not an empty one
+    map_rotation = cfgcore.parse_map_rotation(config.get("sv_maprotation", ""))
+    if manifest.get("base"):
+        cfgcache.load_config(manifest["base"], config, custom_dvars, map_rotation)
+
+    try:
+        catalog = cfgcache.load_maps(manifest["maps"])
+    except FileNotFoundError:
+        catalog = None
+
+    defaults = manifest.get("defaults", {})
+    apply_overrides(defaults, config, custom_dvars, map_rotation, catalog)
+    return config, custom_dvars, map_rotation, catalog
+
+
+def parse_rotation(rotation, gametype=None, catalog=None, maxclients=None):
+    if isinstance(rotation, str):
+        return cfgcore.parse_map_rotation(rotation, gametype)
+    if isinstance(rotation, dict):
+        # {"length": 500, "gametypes": {"war": 3, "dom": 1}, "no_repeat": 10, ...}
+        if catalog is None:
+            raise ValueError("Generating a rotation needs the map list (manifest 'maps')")
+        options = dict(rotation)
+        if options.pop("match_maxclients", False):
+            options.setdefault("maxclients", maxclients)
+        return rotationgen.generate_rotation(catalog, **options)
+    return [tuple(entry) for entry in rotation]
+
+
+def apply_overrides(overrides, config, custom_dvars, map_rotation, catalog=None):
+    for field, key in SERVER_DVARS.items():
+        if field in overrides:
+            config[key] = str(overrides[field])
+    for key, value in overrides.get("dvars", {}).items():
+        config[key] = str(value)
+    for key, value in overrides.get("custom_dvars", {}).items():
+        custom_dvars[key] = str(value)
+    if "rotation" in overrides:
+        map_rotation[:] = parse_rotation(overrides["rotation"], config.get("g_gametype"),
+                                         catalog, config.get("sv_maxclients"))
+
+
+def output_path(manifest, server):
+    if server.get("output"):
+        return os.path.join(manifest["output"], server["output"])
+    return os.path.join(manifest["output"], f"{server['name']}.cfg")
+
+
+# Worker state, set once per process by init_worker
+_base = None
+
+
+def init_worker(base):
+    global _base
+    _base = base
+
+
+def server_config(base, server):
+    config, custom_dvars, map_rotation, catalog = base
+    config = dict(config)
+    custom_dvars = dict(custom_dvars)
+    map_rotation = list(map_rotation)
+    apply_overrides(server, config, custom_dvars, map_rotation, catalog)
+    return config, custom_dvars, map_rotation
+
+
+def server_configs(manifest):
+    """Yield (server, config, custom_dvars, map_rotation) for every server in the manifest."""
+    base = load_base(manifest)
+    for server in manifest["servers"]:
+        yield (server,) + server_config(base, server)
+
+
+def compile_server(job):
+    server, path, check, record_history, rotation_budget = job
+    config, custom_dvars, map_rotation = server_config(_base, server)
+    if rotationcodec.encoded_size(cfgcore.generate_map_rotation_string(map_rotation)) > rotation_budget:
+        # The server would silently drop the rest of the rotation, so the config is not written at all
+        return server["name"], path, "too long"
+    content = cfgcore.render_config(config, custom_dvars, map_rotation)
+
+    try:
+        with open(path, "rb") as f:
+            current_data = f.read()
+        current = current_data.decode("utf-8", errors="replace").replace("\r\n", "\n")
+    except FileNotFoundError:
+        current_data = current = None
+
+    if current == content:
+        return server["name"], path, "unchanged"
+    if check:
+        return server["name"], path, "stale" if current is not None else "missing"
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    data = content.replace("\n", os.linesep).encode("utf-8")
+    cfgsave.atomic_write(path, data)
+    if record_history:
+        history.record_save_quietly(path, current_data, data, server["name"])
+    return server["name"], path, "written"
+
+
+def compile_fleet(manifest, check=False, jobs=None, record_history=True):
+    base = load_base(manifest)
+    servers = manifest["servers"]
+    names = [server.get("name") for server in servers]
+    if None in names or len(set(names)) != len(names):
+        raise ValueError("Every server in the manifest needs a unique name")
+
+    work = [(server, output_path(manifest, server), check, record_history, manifest["rotation_budget"])
+            for server in servers]
+    if not work:
+        return []
+
+    jobs = jobs or os.cpu_count() or 1
+    if jobs == 1 or len(work) == 1:
+        init_worker(base)
+        return [compile_server(job) for job in work]
+
+    chunksize = max(1, len(work) // (jobs * 4))
+    with ProcessPoolExecutor(max_workers=jobs, initializer=init_worker, initargs=(base,)) as pool:
+        return list(pool.map(compile_server, work, chunksize=chunksize))
+
+
+def validate_fleet(manifest):
+    """Check every server's dvars against the schema and its rotation against the length limit.
+
+    Returns {server name: Issues} for invalid servers.
+    """
+    registry = dvarschema.default_registry()
+    if manifest.get("schema"):
+        registry.load(manifest["schema"])
+    configs = {}
+    rotations = {}
+    for server, config, custom_dvars, map_rotation in server_configs(manifest):
+        configs[server["name"]] = {**config, **custom_dvars}
+        rotations[server["name"]] = cfgcore.generate_map_rotation_string(map_rotation)
+    results = registry.validate_many(configs)
+    for name, rotation_string in rotations.items():
+        try:
+            rotationcodec.check_budget(rotation_string, manifest["rotation_budget"])
+        except rotationcodec.RotationBudgetError as e:
+            results.setdefault(name, []).append(dvarschema.Issue("sv_maprotation", rotation_string, str(e)))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compile server.cfg files for a fleet of servers.")
+    parser.add_argument("manifest", help="fleet manifest (JSON)")
+    parser.add_argument("--check", action="store_true", help="report stale configs without writing anything")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="number of worker processes")
+    parser.add_argument("-q", "--quiet", action="store_true", help="only print configs that changed")
+    parser.add_argument("--no-validate", action="store_true", help="compile even if some dvars fail the schema")
+    parser.add_argument("--no-history", action="store_true", help="do not record written configs in the history")
+    args = parser.parse_args(argv)
+
+    manifest = load_manifest(args.manifest)
+    if not args.no_validate:
+        invalid = validate_fleet(manifest)
+        if invalid:
+            for name, issues in invalid.items():
+                for issue in issues:
+                    print(f"invalid    {name}: {issue.message}")
+            print(f"{len(invalid)} server(s) have invalid dvars; nothing was compiled")
+            return 2
+    results = compile_fleet(manifest, check=args.check, jobs=args.jobs, record_history=not args.no_history)
+
+    counts = {}
+    for name, path, status in results:
+        counts[status] = counts.get(status, 0) + 1
+        if not args.quiet or status != "unchanged":
+            print(f"{status:10} {name} -> {path}")
+    print(", ".join(f"{count} {status}" for status, count in sorted(counts.items())) or "No servers in manifest")
+
+    if counts.get("too long") or (args.check and (counts.get("stale") or counts.get("missing"))):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
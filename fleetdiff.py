@@ -0,0 +1,315 @@
+"""Compare, merge and patch many server.cfg files at once over the parsed dvar model.
+
+Files are grouped by content hash and each distinct content is parsed, compared
+and patched once, so a fleet of configs that were copied from the same
+template costs little more than reading them. Writes go through the same
+format-preserving planner as the editor, so comments and exec lines survive.
+"""
+import argparse
+import csv
+import os
+import sys
+from collections import namedtuple
+
+import cfgcache
+import cfgcore
+import cfgsave
+import dvarschema
+import history
+
+# dvars is shared by every file with the same hash and must not be modified
+ConfigFile = namedtuple("ConfigFile", "name path hash dvars")
+# status is "unchanged", "written", "would write" (dry run) or "modified" (changed on disk while planning);
+# applied lists the dvars that were set or removed and conflicts maps key -> (server value, template value)
+PatchResult = namedtuple("PatchResult", "name path status applied conflicts")
+
+
+def _decode(data):
+    return data.decode("utf-8", errors="surrogateescape")
+
+
+def _encode(text):
+    return text.encode("utf-8", errors="surrogateescape")
+
+
+def parse_dvars(text):
+    """All dvars of a cfg file, custom dvars included, as one dict."""
+    config, custom_dvars, _ = cfgcore.parse_config(text)
+    return {**config, **custom_dvars}
+
+
+def collect_paths(paths, pattern=".cfg"):
+    """Expand directories to the cfg files directly inside them."""
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            found.extend(sorted(os.path.join(path, name) for name in os.listdir(path) if name.endswith(pattern)))
+        else:
+            found.append(path)
+    return found
+
+
+def _names(paths):
+    stems = [os.path.splitext(os.path.basename(path))[0] for path in paths]
+    counts = {}
+    for stem in stems:
+        counts[stem] = counts.get(stem, 0) + 1
+    return [stem if counts[stem] == 1 else path for stem, path in zip(stems, paths)]
+
+
+def load_files(paths):
+    """Read every cfg file, parsing each distinct content only once."""
+    paths = collect_paths(paths)
+    parsed = {}
+    files = []
+    for name, path in zip(_names(paths), paths):
+        with open(path, "rb") as f:
+            data = f.read()
+        digest = cfgcache.content_hash(data)
+        dvars = parsed.get(digest)
+        if dvars is None:
+            dvars = parsed[digest] = parse_dvars(_decode(data))
+        files.append(ConfigFile(name, path, digest, dvars))
+    return files
+
+
+def load_dvars(spec, db=None):
+    """dvars of a cfg file, of history snapshot "#ID", or of the built-in template when spec is None."""
+    if spec is None:
+        return cfgcore.default_config()
+    if spec.startswith("#"):
+        with history.HistoryStore(db or history.history_path("server.cfg")) as store:
+            return parse_dvars(_decode(store.content(int(spec[1:]))))
+    with open(spec, "rb") as f:
+        return parse_dvars(_decode(f.read()))
+
+
+def select(files, where):
+    """Keep the files whose dvars match every key=value in where (None matches an unset dvar)."""
+    return [file for file in files if all(file.dvars.get(key) == value for key, value in where.items())]
+
+
+def groups(files):
+    """Group files by content: {hash: [files]} in first-seen order."""
+    grouped = {}
+    for file in files:
+        grouped.setdefault(file.hash, []).append(file)
+    return grouped
+
+
+def dvar_matrix(files, reference=None, all_dvars=False):
+    """Return (keys, rows) where rows maps file name -> values aligned with keys (None = not set).
+
+    Unless all_dvars, only dvars whose value is not the same in every file
+    (and in reference, if given) are included.
+    """
+    distinct = [members[0].dvars for members in groups(files).values()]
+    compared = distinct + ([reference] if reference is not None else [])
+    keys = []
+    seen = set()
+    for dvars in compared:
+        for key in dvars:
+            if key not in seen:
+                seen.add(key)
+                keys.append(key)
+    if not all_dvars:
+        keys = [key for key in keys if len({dvars.get(key) for dvars in compared}) > 1]
+    rows_by_hash = {}
+    rows = {}
+    for file in files:
+        row = rows_by_hash.get(file.hash)
+        if row is None:
+            row = rows_by_hash[file.hash] = [file.dvars.get(key) for key in keys]
+        rows[file.name] = row
+    return keys, rows
+
+
+def drift(dvars, reference):
+    """Map key -> (reference value, value) for every dvar that differs from reference."""
+    return {key: (reference.get(key), dvars.get(key))
+            for key in list(reference) + [key for key in dvars if key not in reference]
+            if reference.get(key) != dvars.get(key)}
+
+
+def patch_text(text, changes):
+    """Apply {key: value, or None to remove} to cfg text, keeping everything else byte for byte."""
+    config, custom_dvars, rotation = cfgcore.parse_config(text)
+    remove = []
+    for key, value in changes.items():
+        if value is None:
+            if custom_dvars.pop(key, None) is None and config.pop(key, None) is not None:
+                remove.append(key)
+        elif key in custom_dvars:
+            custom_dvars[key] = value
+        else:
+            config[key] = value
+            if key == "sv_maprotation":
+                rotation = cfgcore.parse_map_rotation(value)
+    return cfgsave.plan_save(text, config, custom_dvars, rotation, remove)[0]
+
+
+def _write(file, data, new_data, dry_run, record_history):
+    if new_data == data:
+        return "unchanged"
+    if dry_run:
+        return "would write"
+    with open(file.path, "rb") as f:
+        if cfgcache.content_hash(f.read()) != file.hash:
+            return "modified"
+    cfgsave.atomic_write(file.path, new_data)
+    if record_history:
+        history.record_save_quietly(file.path, data, new_data, file.name)
+    return "written"
+
+
+def apply_plans(files, plan, dry_run=False, record_history=True):
+    """Write plan(dvars) -> (changes, conflicts) to every file; each distinct content is planned once."""
+    planned = {}
+    results = []
+    for file in files:
+        entry = planned.get(file.hash)
+        if entry is None:
+            with open(file.path, "rb") as f:
+                data = f.read()
+            if cfgcache.content_hash(data) != file.hash:
+                results.append(PatchResult(file.name, file.path, "modified", [], {}))
+                continue
+            changes, conflicts = plan(file.dvars)
+            new_data = _encode(patch_text(_decode(data), changes)) if changes else data
+            entry = planned[file.hash] = (data, new_data, sorted(changes), conflicts)
+        data, new_data, applied, conflicts = entry
+        status = _write(file, data, new_data, dry_run, record_history)
+        results.append(PatchResult(file.name, file.path, status, applied if status != "unchanged" else [], conflicts))
+    return results
+
+
+def patch_files(files, changes, dry_run=False, record_history=True):
+    """Set (or, for None, remove) the same dvars in every file."""
+    def plan(dvars):
+        return {key: value for key, value in changes.items() if dvars.get(key) != value}, {}
+    return apply_plans(files, plan, dry_run, record_history)
+
+
+def merge_files(files, template, base, dry_run=False, record_history=True):
+    """Three-way merge: bring every change from base to template into each file.
+
+    A dvar the server changed itself is kept; if the template changed it
+    differently too, it is reported as a conflict and left as the server has it.
+    """
+    def plan(dvars):
+        merged, applied, conflicts = cfgcore.merge_dvars(base, dvars, template)
+        return {key: merged.get(key) for key in applied}, conflicts
+    return apply_plans(files, plan, dry_run, record_history)
+
+
+def write_matrix(keys, rows, out):
+    writer = csv.writer(out)
+    writer.writerow(["server"] + keys)
+    for name, row in rows.items():
+        writer.writerow([name] + ["" if value is None else value for value in row])
+
+
+def format_drift(files, reference):
+    lines = []
+    for members in groups(files).values():
+        differences = drift(members[0].dvars, reference)
+        names = ", ".join(file.name for file in members)
+        if not differences:
+            lines.append(f"{names}: matches the template")
+            continue
+        lines.append(f"{names}: {len(differences)} dvar(s) differ")
+        for key, (expected, value) in differences.items():
+            lines.append(f"    {key}: {'(unset)' if value is None else value!r} "
+                         f"(template: {'(unset)' if expected is None else expected!r})")
+    return "\n".join(lines)
+
+
+def format_results(results):
+    lines = []
+    for result in results:
+        line = f"{result.status:12} {result.name}"
+        if result.applied:
+            line += f"  {', '.join(result.applied)}"
+        lines.append(line)
+        for key, (mine, theirs) in result.conflicts.items():
+            lines.append(f"{'conflict':12} {result.name}  {key}: server {mine!r}, template {theirs!r}")
+    return "\n".join(lines)
+
+
+def _assignments(pairs, parser):
+    assignments = {}
+    for pair in pairs or []:
+        key, sep, value = pair.partition("=")
+        if not sep or not key:
+            parser.error(f"expected KEY=VALUE, got {pair!r}")
+        assignments[key] = value
+    return assignments
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare, merge and patch many server.cfg files at once.")
+    parser.add_argument("--db", help="history database for #ID snapshots (default: next to ./server.cfg)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    diff_parser = sub.add_parser("diff", help="show how each config differs from the template")
+    diff_parser.add_argument("paths", nargs="+", help="cfg files or directories of them")
+    diff_parser.add_argument("--template", help="cfg file or #ID to compare against (default: built-in template)")
+    diff_parser.add_argument("--csv", action="store_true", help="print a server x dvar matrix as CSV")
+    diff_parser.add_argument("--all", action="store_true", help="include dvars that are the same everywhere")
+
+    merge_parser = sub.add_parser("merge", help="bring template changes into every config")
+    merge_parser.add_argument("paths", nargs="+")
+    merge_parser.add_argument("--base", required=True, help="cfg file or #ID the configs were created from")
+    merge_parser.add_argument("--template", help="cfg file or #ID with the new values (default: built-in template)")
+
+    patch_parser = sub.add_parser("patch", help="set or remove dvars in every config")
+    patch_parser.add_argument("paths", nargs="+")
+    patch_parser.add_argument("--set", action="append", metavar="KEY=VALUE")
+    patch_parser.add_argument("--unset", action="append", default=[], metavar="KEY")
+    patch_parser.add_argument("--no-validate", action="store_true", help="apply values that fail the schema")
+
+    for command_parser in (merge_parser, patch_parser):
+        command_parser.add_argument("--where", action="append", metavar="KEY=VALUE",
+                                    help="only touch configs where KEY is VALUE (repeatable)")
+        command_parser.add_argument("-n", "--dry-run", action="store_true", help="report without writing")
+        command_parser.add_argument("--no-history", action="store_true",
+                                    help="do not record written configs in the history")
+    args = parser.parse_args(argv)
+
+    files = load_files(args.paths)
+    if args.command == "diff":
+        reference = load_dvars(args.template, args.db)
+        if args.csv:
+            keys, rows = dvar_matrix(files, reference, args.all)
+            write_matrix(keys, rows, sys.stdout)
+        else:
+            print(format_drift(files, reference) or "No configs found")
+            print(f"{len(files)} config(s), {len(groups(files))} distinct")
+        return 0
+
+    files = select(files, _assignments(args.where, parser))
+    if args.command == "merge":
+        results = merge_files(files, load_dvars(args.template, args.db), load_dvars(args.base, args.db),
+                              args.dry_run, not args.no_history)
+    else:
+        changes = _assignments(args.set, parser)
+        if not args.no_validate:
+            issues = dvarschema.default_registry().validate(changes)
+            if issues:
+                print(dvarschema.format_issues(issues))
+                return 2
+        changes.update(dict.fromkeys(args.unset))
+        results = patch_files(files, changes, args.dry_run, not args.no_history)
+
+    print(format_results(results) or "No configs matched")
+    counts = {}
+    for result in results:
+        counts[result.status] = counts.get(result.status, 0) + 1
+    conflicts = sum(len(result.conflicts) for result in results)
+    summary = ", ".join(f"{count} {status}" for status, count in sorted(counts.items()))
+    print(summary + (f", {conflicts} conflict(s)" if conflicts else ""))
+    return 1 if conflicts or counts.get("modified") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
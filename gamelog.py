@@ -0,0 +1,273 @@
+"""Per-map and per-gametype statistics from the server's games_mp.log.
+
+The log is memory-mapped and scanned in chunks, so multi-gigabyte logs are
+processed without reading them into memory, and only the lines that matter
+here (InitGame, joins, quits, ExitLevel and ShutdownGame) are parsed. Totals
+are saved with the byte offset they cover, so the next run only reads what
+the server appended since; a log that was truncated or replaced is read again
+from the start.
+"""
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import re
+import sys
+import tempfile
+from collections import namedtuple
+
+import cfgcache
+
+STATE_VERSION = 1
+CHUNK_SIZE = 16 * 1024 * 1024
+
+# Players who join within this many seconds of InitGame count as being there when the map starts
+START_WINDOW = 60
+
+# A restart of the same map this soon after ShutdownGame is the next round of the same match
+ROUND_GAP = 5
+
+# Searching for the event (which starts with a literal space) and checking the timestamp in front of
+# it afterwards is several times faster than matching every line from its start
+_EVENT = re.compile(rb" (?:InitGame: ([^\r\n]*)|([JQ]);[^;\r\n]*;(\d+);|(ExitLevel): executed|(ShutdownGame):)")
+_TIMESTAMP = re.compile(rb" *(\d+):(\d\d)")
+
+# Per (gametype, map): matches, completed, total seconds, players at start, players joined, early quits
+MATCHES, COMPLETED, SECONDS, START_PLAYERS, JOINED, QUITS = range(6)
+
+StatRow = namedtuple("StatRow", "name matches completed avg_duration avg_players early_quit_rate")
+
+
+def default_log_path(config, base_dir="."):
+    """Where the server writes the log named by g_log, relative to the config directory."""
+    return os.path.join(base_dir, config.get("g_log", "logs\\games_mp.log").replace("\\", os.sep))
+
+
+def _info(infostring):
+    parts = infostring.split("\\")
+    return dict(zip(parts[1::2], parts[2::2]))
+
+
+class LogAnalyzer:
+    """Incrementally accumulated statistics of one log file.
+
+    totals maps "gametype map" to the counters above; a match still being
+    played when the log ends is kept open and finished by a later update().
+    """
+
+    def __init__(self, path, state_dir=None, start_window=START_WINDOW):
+        self.path = os.path.abspath(path)
+        self.state_dir = state_dir if state_dir is not None else cfgcache.default_cache_dir()
+        self.start_window = start_window
+        self.reset()
+        self._load_state()
+
+    def reset(self):
+        self.offset = 0
+        self.head = None
+        self.totals = {}
+        self.match = None
+
+    @property
+    def state_path(self):
+        if not self.state_dir:
+            return None
+        name = hashlib.blake2b(self.path.encode("utf-8", errors="surrogateescape"), digest_size=16).hexdigest()
+        return os.path.join(self.state_dir, f"gamelog-{name}.json")
+
+    def _load_state(self):
+        try:
+            with open(self.state_path, "r") as f:
+                state = json.load(f)
+        except (TypeError, OSError, ValueError):
+            return
+        if state.get("version") == STATE_VERSION and state.get("path") == self.path:
+            self.offset = state["offset"]
+            self.head = state["head"]
+            self.totals = state["totals"]
+            self.match = state["match"]
+
+    def save_state(self):
+        path = self.state_path
+        if path is None:
+            return
+        state = {"version": STATE_VERSION, "path": self.path, "offset": self.offset, "head": self.head,
+                 "totals": self.totals, "match": self.match}
+        # Like the parse cache, failing to save only means the next run starts over
+        try:
+            os.makedirs(self.state_dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(prefix=".gamelog.", suffix=".tmp", dir=self.state_dir)
+            with os.fdopen(fd, "w") as f:
+                json.dump(state, f)
+            os.replace(tmp_path, path)
+        except OSError:
+            pass
+
+    def update(self, progress=None, chunk_size=CHUNK_SIZE):
+        """Read everything appended since the last update; progress(fraction) is called after each chunk."""
+        with open(self.path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            head = f.read(256).hex()
+            if size < self.offset or (self.head is not None and not head.startswith(self.head[:len(head)])):
+                # Rotated or truncated: what we counted is not in this file any more
+                self.reset()
+            self.head = head
+            if size == self.offset or size == 0:
+                return self.totals
+            try:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                    start = self.offset
+                    while start < size:
+                        end = min(start + chunk_size, size)
+                        if end < size:
+                            # Stop after the last complete line; the rest is read with the next chunk
+                            end = data.rfind(b"\n", start, end) + 1 or end
+                        elif data[end - 1:end] != b"\n":
+                            # The server is still writing this line
+                            end = data.rfind(b"\n", start, end) + 1
+                            if end == 0:
+                                break
+                        self._scan(data, start, end)
+                        start = self.offset = end
+                        if progress is not None:
+                            progress(start / size)
+            finally:
+                self.save_state()
+        return self.totals
+
+    def _scan(self, data, start, end):
+        window = self.start_window
+        match = self.match
+        timestamp = _TIMESTAMP.fullmatch
+        for m in _EVENT.finditer(data, start, end):
+            line_start = data.rfind(b"\n", start, m.start()) + 1 or start
+            stamp = timestamp(data, line_start, m.start())
+            if stamp is None:
+                # The event text appeared somewhere else in a line, e.g. in chat
+                continue
+            init, kind, slot, exit_level, shutdown = m.groups()
+            time = int(stamp.group(1)) * 60 + int(stamp.group(2))
+            if kind is not None:
+                if match is None or match["ended"] is not None:
+                    continue
+                slot = slot.decode()
+                if kind == b"J":
+                    if slot not in match["joined"]:
+                        match["joined"].append(slot)
+                        if time - match["start"] <= window:
+                            match["start_players"] += 1
+                    if slot in match["quit"]:
+                        match["quit"].remove(slot)
+                elif slot in match["joined"] and slot not in match["quit"]:
+                    match["quit"].append(slot)
+            elif init is not None:
+                info = _info(init.decode("utf-8", errors="replace"))
+                key = f"{info.get('g_gametype', '?')} {info.get('mapname', '?')}"
+                if (match is not None and match["ended"] is not None and match["key"] == key
+                        and not match["completed"] and 0 <= time - match["ended"] <= ROUND_GAP):
+                    # Next round of a round-based match
+                    match["ended"] = None
+                    continue
+                if match is not None:
+                    self._finish(match)
+                match = {"key": key, "start": time, "last": time, "ended": None, "completed": False,
+                         "start_players": 0, "joined": [], "quit": []}
+            elif match is not None:
+                if exit_level is not None:
+                    match["completed"] = True
+                    match["last"] = time
+                elif match["ended"] is None:
+                    match["ended"] = match["last"] = time
+                    if match["completed"]:
+                        self._finish(match)
+                        match = None
+                continue
+            if match is not None and time >= match["start"]:
+                match["last"] = time
+        self.match = match
+
+    def _finish(self, match):
+        totals = self.totals.setdefault(match["key"], [0, 0, 0, 0, 0, 0])
+        totals[MATCHES] += 1
+        totals[COMPLETED] += match["completed"]
+        totals[SECONDS] += max(0, match["last"] - match["start"])
+        totals[START_PLAYERS] += match["start_players"]
+        totals[JOINED] += len(match["joined"])
+        # Leaving a match that was cut short is not quitting early
+        totals[QUITS] += len(match["quit"]) if match["completed"] else 0
+
+
+def summarize(totals, by="map"):
+    """Return StatRows grouped by "map", "gametype" or "both", most played first."""
+    grouped = {}
+    for key, counts in totals.items():
+        gametype, _, map_code = key.partition(" ")
+        name = {"map": map_code, "gametype": gametype}.get(by, key)
+        row = grouped.setdefault(name, [0] * 6)
+        for i, count in enumerate(counts):
+            row[i] += count
+    rows = []
+    for name, (matches, completed, seconds, start_players, joined, quits) in grouped.items():
+        rows.append(StatRow(name, matches, completed, seconds / matches if matches else 0.0,
+                            start_players / matches if matches else 0.0,
+                            quits / joined if joined else 0.0))
+    rows.sort(key=lambda row: (-row.matches, row.name))
+    return rows
+
+
+def map_weights(totals, min_matches=3):
+    """Relative weights for rotationgen.generate_rotation: busy maps that players stay on come up more.
+
+    A map's weight is its average player count at start times the share of
+    players who stay to the end, scaled so the average map weighs 1. Maps
+    with fewer than min_matches recorded matches are left out (weight 1).
+    """
+    scores = {}
+    for row in summarize(totals, "map"):
+        if row.matches >= min_matches:
+            scores[row.name] = (row.avg_players + 1) * (1 - row.early_quit_rate)
+    if not scores:
+        return {}
+    mean = sum(scores.values()) / len(scores)
+    return {name: max(score / mean, 0.05) if mean else 1.0 for name, score in scores.items()}
+
+
+def format_duration(seconds):
+    return f"{int(seconds) // 60}:{int(seconds) % 60:02d}"
+
+
+def format_rows(rows):
+    lines = [f"{'':24} {'matches':>8} {'done':>6} {'avg time':>9} {'players':>8} {'quit early':>10}"]
+    for row in rows:
+        lines.append(f"{row.name:24} {row.matches:8} {row.completed:6} {format_duration(row.avg_duration):>9} "
+                     f"{row.avg_players:8.1f} {row.early_quit_rate:10.0%}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarize matches per map and gametype from games_mp.log.")
+    parser.add_argument("log", nargs="?", default=os.path.join("logs", "games_mp.log"))
+    parser.add_argument("--by", choices=("map", "gametype", "both"), default="map")
+    parser.add_argument("--rescan", action="store_true", help="forget saved totals and read the whole log again")
+    parser.add_argument("--weights", action="store_true", help="print map weights for the rotation generator")
+    args = parser.parse_args(argv)
+
+    analyzer = LogAnalyzer(args.log)
+    if args.rescan:
+        analyzer.reset()
+    try:
+        totals = analyzer.update()
+    except FileNotFoundError as e:
+        print(e, file=sys.stderr)
+        return 1
+    if args.weights:
+        for name, weight in sorted(map_weights(totals).items(), key=lambda item: -item[1]):
+            print(f"{name}={weight:.2f}")
+    else:
+        print(format_rows(summarize(totals, args.by)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
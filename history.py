@@ -0,0 +1,324 @@
+"""Content-addressed history of saved configs in a local SQLite database.
+
+Every distinct file content is stored once, keyed by its SHA-256. A new
+version is stored as a line-level delta against the previous version of the
+same file, with a full copy every KEYFRAME_INTERVAL versions (or whenever the
+delta would not be smaller), so restoring any version replays only a short
+chain. Snapshots record when a file was saved, for which server, and which
+dvars changed.
+"""
+import argparse
+import difflib
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import time
+import zlib
+from collections import namedtuple
+
+import cfgcore
+
+HISTORY_FILE = ".servcfg-history.db"
+KEYFRAME_INTERVAL = 32
+
+Snapshot = namedtuple("Snapshot", "id path server hash created size changes")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    hash TEXT PRIMARY KEY,
+    base TEXT,
+    depth INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    data BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL,
+    server TEXT,
+    hash TEXT NOT NULL REFERENCES blobs(hash),
+    created REAL NOT NULL,
+    changes TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS snapshots_by_path ON snapshots(path, id);
+"""
+
+
+def history_path(path):
+    """The history database shared by every config in path's directory."""
+    return os.path.join(os.path.dirname(os.path.abspath(path)), HISTORY_FILE)
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def _lines(data):
+    return data.split(b"\n")
+
+
+def make_delta(base, data):
+    """Encode data as [start, end] copies of base lines and lists of new lines."""
+    base_lines = _lines(base)
+    lines = _lines(data)
+    ops = []
+    matcher = difflib.SequenceMatcher(None, base_lines, lines, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            ops.append([i1, i2])
+        elif j2 > j1:
+            ops.append([line.decode("utf-8", errors="surrogateescape") for line in lines[j1:j2]])
+    return json.dumps(ops, separators=(",", ":")).encode("utf-8")
+
+
+def apply_delta(base, delta):
+    base_lines = _lines(base)
+    lines = []
+    for op in json.loads(delta):
+        if op and isinstance(op[0], int):
+            lines.extend(base_lines[op[0]:op[1]])
+        else:
+            lines.extend(line.encode("utf-8", errors="surrogateescape") for line in op)
+    return b"\n".join(lines)
+
+
+def dvar_changes(old, new):
+    """Summarise which dvars differ between two versions of a cfg file."""
+    if old is None:
+        return {"created": True}
+    old_config, old_custom, _ = cfgcore.parse_config(old.decode("utf-8", errors="replace"))
+    new_config, new_custom, _ = cfgcore.parse_config(new.decode("utf-8", errors="replace"))
+    before = {**old_config, **old_custom}
+    after = {**new_config, **new_custom}
+    return {
+        "changed": sorted(key for key in before.keys() & after.keys() if before[key] != after[key]),
+        "added": sorted(after.keys() - before.keys()),
+        "removed": sorted(before.keys() - after.keys()),
+    }
+
+
+def describe_changes(changes):
+    if changes.get("restored") is not None:
+        return f"restored #{changes['restored']}"
+    if changes.get("created"):
+        return "first version"
+    parts = []
+    for kind in ("changed", "added", "removed"):
+        keys = changes.get(kind) or []
+        if keys:
+            shown = ", ".join(keys[:3]) + (f" +{len(keys) - 3}" if len(keys) > 3 else "")
+            parts.append(f"{kind} {shown}")
+    return "; ".join(parts) or "formatting only"
+
+
+def _diff_lines(text):
+    lines = text.splitlines(keepends=True)
+    if lines and not lines[-1].endswith("\n"):
+        lines[-1] += "\n"
+    return lines
+
+
+class HistoryStore:
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.db = sqlite3.connect(db_path, timeout=30)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(SCHEMA)
+
+    @classmethod
+    def for_path(cls, path):
+        return cls(history_path(path))
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _blob(self, digest):
+        return self.db.execute("SELECT base, depth, data FROM blobs WHERE hash = ?", (digest,)).fetchone()
+
+    def content_of(self, digest):
+        """Rebuild a blob's content by replaying its delta chain from the nearest full copy."""
+        chain = []
+        while True:
+            row = self._blob(digest)
+            if row is None:
+                raise KeyError(f"Unknown content {digest}")
+            base, _, data = row
+            chain.append(zlib.decompress(data))
+            if base is None:
+                break
+            digest = base
+        content = chain.pop()
+        while chain:
+            content = apply_delta(content, chain.pop())
+        return content
+
+    def _store_blob(self, data, previous):
+        digest = content_hash(data)
+        if self._blob(digest) is not None:
+            return digest
+        full = zlib.compress(data, 9)
+        base, depth, stored = None, 0, full
+        if previous is not None:
+            _, previous_depth, _ = self._blob(previous)
+            if previous_depth + 1 < KEYFRAME_INTERVAL:
+                delta = zlib.compress(make_delta(self.content_of(previous), data), 9)
+                if len(delta) < len(full):
+                    base, depth, stored = previous, previous_depth + 1, delta
+        self.db.execute("INSERT INTO blobs (hash, base, depth, size, data) VALUES (?, ?, ?, ?, ?)",
+                        (digest, base, depth, len(data), stored))
+        return digest
+
+    def latest(self, path):
+        row = self.db.execute("SELECT id, path, server, hash, created, 0, changes FROM snapshots "
+                              "WHERE path = ? ORDER BY id DESC LIMIT 1", (os.path.abspath(path),)).fetchone()
+        return self._snapshot(row) if row else None
+
+    def record(self, path, data, server=None, changes=None, created=None):
+        """Record data as the current version of path; returns the Snapshot, or None if it is unchanged."""
+        path = os.path.abspath(path)
+        with self.db:
+            previous = self.latest(path)
+            if previous is not None and previous.hash == content_hash(data):
+                return None
+            old = self.content_of(previous.hash) if previous is not None else None
+            digest = self._store_blob(data, previous.hash if previous is not None else None)
+            if changes is None:
+                changes = dvar_changes(old, data)
+            created = created or time.time()
+            cursor = self.db.execute(
+                "INSERT INTO snapshots (path, server, hash, created, changes) VALUES (?, ?, ?, ?, ?)",
+                (path, server, digest, created, json.dumps(changes)))
+            return Snapshot(cursor.lastrowid, path, server, digest, created, len(data), changes)
+
+    def _snapshot(self, row):
+        snapshot_id, path, server, digest, created, size, changes = row
+        return Snapshot(snapshot_id, path, server, digest, created, size, json.loads(changes))
+
+    def snapshots(self, path=None, server=None, limit=None):
+        """List snapshots, newest first."""
+        query = ("SELECT s.id, s.path, s.server, s.hash, s.created, b.size, s.changes "
+                 "FROM snapshots s JOIN blobs b ON b.hash = s.hash")
+        conditions, params = [], []
+        if path is not None:
+            conditions.append("s.path = ?")
+            params.append(os.path.abspath(path))
+        if server is not None:
+            conditions.append("s.server = ?")
+            params.append(server)
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY s.id DESC"
+        if limit:
+            query += f" LIMIT {int(limit)}"
+        return [self._snapshot(row) for row in self.db.execute(query, params)]
+
+    def get(self, snapshot_id):
+        row = self.db.execute("SELECT s.id, s.path, s.server, s.hash, s.created, b.size, s.changes "
+                              "FROM snapshots s JOIN blobs b ON b.hash = s.hash WHERE s.id = ?",
+                              (snapshot_id,)).fetchone()
+        if row is None:
+            raise KeyError(f"No snapshot #{snapshot_id}")
+        return self._snapshot(row)
+
+    def content(self, snapshot_id):
+        return self.content_of(self.get(snapshot_id).hash)
+
+    def diff(self, old_id, new_id=None, context=3):
+        """Unified diff between two snapshots; new_id None compares against the file on disk."""
+        old = self.get(old_id)
+        old_text = self.content_of(old.hash).decode("utf-8", errors="replace")
+        if new_id is None:
+            try:
+                with open(old.path, "rb") as f:
+                    new_text = f.read().decode("utf-8", errors="replace")
+            except FileNotFoundError:
+                new_text = ""
+            new_label = f"{old.path} (current)"
+        else:
+            new_text = self.content(new_id).decode("utf-8", errors="replace")
+            new_label = f"#{new_id}"
+        return "".join(difflib.unified_diff(_diff_lines(old_text), _diff_lines(new_text), f"#{old_id}", new_label,
+                                            n=context))
+
+    def restore(self, snapshot_id, path=None):
+        """Write a snapshot back to disk (atomically) and record the restore as a new version."""
+        import cfgsave
+
+        snapshot = self.get(snapshot_id)
+        path = path or snapshot.path
+        data = self.content_of(snapshot.hash)
+        cfgsave.atomic_write(path, data)
+        self.record(path, data, snapshot.server, {"restored": snapshot_id})
+        return path
+
+
+def record_save(path, old_data, new_data, server=None):
+    """Record a save in path's history, including the version it replaced if that was never recorded."""
+    with HistoryStore.for_path(path) as store:
+        if old_data is not None and store.latest(path) is None:
+            store.record(path, old_data, server)
+        return store.record(path, new_data, server)
+
+
+def record_save_quietly(path, old_data, new_data, server=None):
+    """Like record_save, but return None instead of raising when the history cannot be written.
+
+    The file itself is already saved by then, and a broken history must not
+    fail or undo that save.
+    """
+    try:
+        return record_save(path, old_data, new_data, server)
+    except (sqlite3.Error, OSError):
+        return None
+
+
+def format_snapshots(snapshots):
+    lines = []
+    for snapshot in snapshots:
+        when = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(snapshot.created))
+        server = f" [{snapshot.server}]" if snapshot.server else ""
+        lines.append(f"#{snapshot.id:<6} {when} {snapshot.size:>8} B  {os.path.basename(snapshot.path)}{server}  "
+                     f"{describe_changes(snapshot.changes)}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Browse and restore saved versions of server configs.")
+    parser.add_argument("--db", help=f"history database (default: {HISTORY_FILE} next to the config)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    list_parser = sub.add_parser("list", help="list saved versions")
+    list_parser.add_argument("path", nargs="?", default="server.cfg")
+    list_parser.add_argument("--server")
+    list_parser.add_argument("-n", "--limit", type=int, default=50)
+    show_parser = sub.add_parser("show", help="print a saved version")
+    show_parser.add_argument("id", type=int)
+    diff_parser = sub.add_parser("diff", help="diff two versions, or a version against the current file")
+    diff_parser.add_argument("old", type=int)
+    diff_parser.add_argument("new", type=int, nargs="?")
+    restore_parser = sub.add_parser("restore", help="write a saved version back to its file")
+    restore_parser.add_argument("id", type=int)
+    args = parser.parse_args(argv)
+
+    db = args.db or history_path(getattr(args, "path", "server.cfg"))
+    with HistoryStore(db) as store:
+        if args.command == "list":
+            path = None if os.path.isdir(args.path) else args.path
+            print(format_snapshots(store.snapshots(path, args.server, args.limit)) or "No saved versions")
+        elif args.command == "show":
+            sys.stdout.write(store.content(args.id).decode("utf-8", errors="replace"))
+        elif args.command == "diff":
+            sys.stdout.write(store.diff(args.old, args.new))
+        elif args.command == "restore":
+            print(f"Restored #{args.id} to {store.restore(args.id)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,84 @@
+"""Indexed map catalog loaded from maps.txt."""
+from collections.abc import Mapping
+
+
+class MapCatalog(Mapping):
+    """Read-only mapping of category -> ((name, code), ...) with lookup indexes.
+
+    When a code is listed more than once (e.g. mp_quarry for both Quarry and
+    Rundown) the first entry wins for code -> name lookups.
+    """
+
+    def __init__(self, categories=None):
+        self._categories = {}
+        self._name_by_code = {}
+        self._category_by_code = {}
+        self._code_by_name = {}
+        self._codes_by_category = {}
+        for category, maps in (categories or {}).items():
+            maps = tuple((name, code) for name, code in maps)
+            self._categories[category] = maps
+            self._codes_by_category[category] = {name: code for name, code in reversed(maps)}
+            for name, code in maps:
+                self._name_by_code.setdefault(code, name)
+                self._category_by_code.setdefault(code, category)
+                self._code_by_name.setdefault(name, code)
+
+    @classmethod
+    def from_file(cls, path="maps.txt"):
+        with open(path, "r") as f:
+            return cls.from_text(f.read())
+
+    @classmethod
+    def from_text(cls, text):
+        maps = {}
+        current_category = ""
+        for line in text.splitlines():
+            line = line.strip()
+            if line.endswith("ROTATION LIST"):
+                current_category = line.split(" ")[0]
+                maps[current_category] = []
+            elif " - " in line:
+                map_name, map_code = line.split(" - ", 1)
+                maps.setdefault(current_category, []).append((map_name.strip(), map_code.strip()))
+        return cls(maps)
+
+    def __getitem__(self, category):
+        return self._categories[category]
+
+    def __iter__(self):
+        return iter(self._categories)
+
+    def __len__(self):
+        return len(self._categories)
+
+    def __repr__(self):
+        return f"MapCatalog({len(self._name_by_code)} maps in {len(self._categories)} categories)"
+
+    def has_code(self, code):
+        return code in self._name_by_code
+
+    def name_for(self, code, default=None):
+        return self._name_by_code.get(code, code if default is None else default)
+
+    def category_for(self, code):
+        return self._category_by_code.get(code)
+
+    def code_for(self, name, category=None):
+        if category is not None:
+            return self._codes_by_category.get(category, {}).get(name)
+        return self._code_by_name.get(name)
+
+    def names(self, category):
+        return [name for name, _ in self._categories.get(category, ())]
+
+    def codes(self, category=None):
+        if category is None:
+            return list(self._name_by_code)
+        return list(dict.fromkeys(code for _, code in self._categories.get(category, ())))
+
+    def all_maps(self):
+        return [entry for maps in self._categories.values() for entry in maps]
+
+    def to_dict(self):
+        return {category: list(maps) for category, maps in self._categories.items()}
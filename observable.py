@@ -0,0 +1,195 @@
+"""List and dict models that report their changes to listeners.
+
+Listeners are called as listener(op, *args) after the change is applied:
+
+ObservableList: ("insert", index, count), ("delete", indices),
+                ("move", old_indices, new_indices), ("update", index), ("reset",)
+ObservableDict: ("set", key, is_new), ("delete", key), ("rename", old_key, new_key), ("reset",)
+"""
+
+
+class _Observable:
+    def _listeners(self):
+        try:
+            return self.__dict__["listeners"]
+        except KeyError:
+            return self.__dict__.setdefault("listeners", [])
+
+    def subscribe(self, listener):
+        self._listeners().append(listener)
+
+    def unsubscribe(self, listener):
+        self._listeners().remove(listener)
+
+    def _notify(self, op, *args):
+        for listener in list(self._listeners()):
+            listener(op, *args)
+
+
+class ObservableList(_Observable, list):
+    def __reduce__(self):
+        # Listeners are usually bound to widgets, so only the data is pickled
+        return list, (list(self),)
+
+    def __setitem__(self, index, value):
+        list.__setitem__(self, index, value)
+        if isinstance(index, slice):
+            self._notify("reset")
+        else:
+            self._notify("update", index % len(self))
+
+    def __delitem__(self, index):
+        if isinstance(index, slice):
+            indices = list(range(*index.indices(len(self))))
+            list.__delitem__(self, index)
+            self._notify("delete", indices)
+        else:
+            index %= len(self)
+            list.__delitem__(self, index)
+            self._notify("delete", [index])
+
+    def __iadd__(self, items):
+        self.extend(items)
+        return self
+
+    def append(self, item):
+        list.append(self, item)
+        self._notify("insert", len(self) - 1, 1)
+
+    def extend(self, items):
+        start = len(self)
+        list.extend(self, items)
+        if len(self) > start:
+            self._notify("insert", start, len(self) - start)
+
+    def insert(self, index, item):
+        index = max(0, min(len(self), index if index >= 0 else len(self) + index))
+        list.insert(self, index, item)
+        self._notify("insert", index, 1)
+
+    def pop(self, index=-1):
+        index %= len(self)
+        item = list.pop(self, index)
+        self._notify("delete", [index])
+        return item
+
+    def remove(self, item):
+        del self[self.index(item)]
+
+    def clear(self):
+        list.clear(self)
+        self._notify("reset")
+
+    def sort(self, *args, **kwargs):
+        list.sort(self, *args, **kwargs)
+        self._notify("reset")
+
+    def reverse(self):
+        list.reverse(self)
+        self._notify("reset")
+
+    def delete_many(self, indices):
+        indices = sorted(set(indices))
+        if not indices:
+            return
+        doomed = set(indices)
+        list.__setitem__(self, slice(None), [item for i, item in enumerate(self) if i not in doomed])
+        self._notify("delete", indices)
+
+    def move(self, indices, dest):
+        """Move the items at indices as one block so it starts before dest (an index into the current list)."""
+        indices = sorted(set(indices))
+        if not indices:
+            return []
+        selected = set(indices)
+        block = [self[i] for i in indices]
+        rest = [item for i, item in enumerate(self) if i not in selected]
+        dest = max(0, min(len(rest), dest - sum(1 for i in indices if i < dest)))
+        new_indices = list(range(dest, dest + len(block)))
+        if new_indices != indices:
+            list.__setitem__(self, slice(None), rest[:dest] + block + rest[dest:])
+            self._notify("move", indices, new_indices)
+        return new_indices
+
+    def shift(self, indices, delta):
+        """Move each selected item one step up (delta=-1) or down (delta=1), keeping gaps between them."""
+        indices = sorted(set(indices), reverse=delta > 0)
+        if not indices:
+            return []
+        moved = []
+        blocked = -1 if delta < 0 else len(self)
+        for i in indices:
+            target = i + delta
+            if target == blocked:
+                # Stuck against the edge or against an item that could not move
+                blocked = i
+                moved.append(i)
+                continue
+            self_i = self[i]
+            list.__setitem__(self, i, self[target])
+            list.__setitem__(self, target, self_i)
+            moved.append(target)
+        old = sorted(indices)
+        new = sorted(moved)
+        if old != new:
+            self._notify("move", old, new)
+        return new
+
+
+class ObservableDict(_Observable, dict):
+    def __reduce__(self):
+        return dict, (dict(self),)
+
+    def __setitem__(self, key, value):
+        is_new = key not in self
+        dict.__setitem__(self, key, value)
+        self._notify("set", key, is_new)
+
+    def __delitem__(self, key):
+        dict.__delitem__(self, key)
+        self._notify("delete", key)
+
+    def pop(self, key, *default):
+        if key not in self:
+            return dict.pop(self, key, *default)
+        value = dict.pop(self, key)
+        self._notify("delete", key)
+        return value
+
+    def popitem(self):
+        key, value = dict.popitem(self)
+        self._notify("delete", key)
+        return key, value
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def clear(self):
+        dict.clear(self)
+        self._notify("reset")
+
+    def reset(self, *args, **kwargs):
+        """Replace the whole content with a single reset notification."""
+        dict.clear(self)
+        dict.update(self, *args, **kwargs)
+        self._notify("reset")
+
+    def rename(self, old_key, new_key, value):
+        """Replace old_key with new_key in place, keeping its position."""
+        if old_key == new_key:
+            self[new_key] = value
+            return
+        replaced = new_key in self
+        items = [(new_key if key == old_key else key, value if key == old_key else current)
+                 for key, current in self.items() if key != new_key]
+        dict.clear(self)
+        dict.update(self, items)
+        if replaced:
+            self._notify("delete", new_key)
+        self._notify("rename", old_key, new_key)
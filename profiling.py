@@ -0,0 +1,225 @@
+"""Opt-in timing spans and counters for the editor, exported as a Chrome trace and a summary table.
+
+Launch the editor with `servcfg.py --profile [TRACE]`, or set SERVCFG_PROFILE
+to the trace file to write (or to 1 for servcfg-trace.json). The trace opens in
+chrome://tracing or https://ui.perfetto.dev, and a table of the slowest spans
+is printed to stderr when the program exits.
+
+While profiling is off span() hands back one shared do-nothing context
+manager and count() returns at once, so instrumented code pays a function
+call and nothing else.
+"""
+import argparse
+import atexit
+import functools
+import json
+import os
+import sys
+import threading
+from contextlib import nullcontext
+from time import perf_counter
+
+ENV_VAR = "SERVCFG_PROFILE"
+DEFAULT_TRACE_PATH = "servcfg-trace.json"
+
+# Counter samples closer together than this (in microseconds) are merged in the trace
+COUNTER_SAMPLE_US = 1000
+
+_NULL_SPAN = nullcontext()
+_profiler = None
+
+
+class Profiler:
+    """Collects complete spans and counter samples from any thread."""
+
+    def __init__(self, path=None):
+        self.path = path
+        self.pid = os.getpid()
+        self.events = []
+        self.spans = {}
+        self.counters = {}
+        self._samples = {}
+        self._threads = {}
+        self._lock = threading.Lock()
+
+    def record(self, name, start, end, category="editor", args=None):
+        """Add a span from start to end, both perf_counter() seconds."""
+        thread = threading.current_thread()
+        event = {"name": name, "cat": category, "ph": "X", "ts": start * 1e6, "dur": (end - start) * 1e6,
+                 "pid": self.pid, "tid": thread.ident}
+        if args:
+            event["args"] = args
+        with self._lock:
+            self._threads.setdefault(thread.ident, thread.name)
+            self.events.append(event)
+            stats = self.spans.get(name)
+            if stats is None:
+                stats = self.spans[name] = [0, 0.0, 0.0]
+            stats[0] += 1
+            stats[1] += end - start
+            stats[2] = max(stats[2], end - start)
+
+    def count(self, name, n=1):
+        ts = perf_counter() * 1e6
+        with self._lock:
+            total = self.counters[name] = self.counters.get(name, 0) + n
+            last = self._samples.get(name)
+            if last is not None and ts - last["ts"] < COUNTER_SAMPLE_US:
+                last["args"][name] = total
+                return
+            sample = self._samples[name] = {"name": name, "ph": "C", "ts": ts, "pid": self.pid, "args": {name: total}}
+            self.events.append(sample)
+
+    def trace(self):
+        """The Chrome trace-event JSON object."""
+        with self._lock:
+            metadata = [{"name": "thread_name", "ph": "M", "pid": self.pid, "tid": tid, "args": {"name": name}}
+                        for tid, name in self._threads.items()]
+            return {"traceEvents": metadata + list(self.events), "displayTimeUnit": "ms"}
+
+    def write_trace(self, path):
+        with open(path, "w") as f:
+            json.dump(self.trace(), f)
+
+    def summary(self):
+        """Return ([(name, calls, total, mean, max)] slowest first, {counter: total}) in seconds."""
+        with self._lock:
+            rows = [(name, calls, total, total / calls, longest) for name, (calls, total, longest) in self.spans.items()]
+            counters = dict(self.counters)
+        rows.sort(key=lambda row: -row[2])
+        return rows, counters
+
+
+class _Span:
+    __slots__ = ("profiler", "name", "category", "args", "start")
+
+    def __init__(self, profiler, name, category, args):
+        self.profiler = profiler
+        self.name = name
+        self.category = category
+        self.args = args
+
+    def __enter__(self):
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.profiler.record(self.name, self.start, perf_counter(), self.category, self.args)
+
+
+def enable(path=DEFAULT_TRACE_PATH):
+    """Start profiling; on exit the trace is written to path (if given) and the summary printed."""
+    global _profiler
+    if _profiler is None:
+        _profiler = Profiler(path)
+        atexit.register(report)
+    else:
+        _profiler.path = path
+    return _profiler
+
+
+def disable():
+    global _profiler
+    _profiler = None
+
+
+def active():
+    """The running Profiler, or None when profiling is off."""
+    return _profiler
+
+
+def span(name, category="editor", **args):
+    """Time a with-block."""
+    profiler = _profiler
+    if profiler is None:
+        return _NULL_SPAN
+    return _Span(profiler, name, category, args)
+
+
+def traced(name=None, category="editor"):
+    """Decorator timing every call of a function, named after it unless name is given."""
+    def decorate(fn):
+        label = name or fn.__qualname__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            profiler = _profiler
+            if profiler is None:
+                return fn(*args, **kwargs)
+            start = perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                profiler.record(label, start, perf_counter(), category)
+        return wrapper
+    return decorate
+
+
+def record(name, start, end=None, category="editor"):
+    """Add a span measured by the caller, e.g. one that started before profiling was enabled."""
+    profiler = _profiler
+    if profiler is not None:
+        profiler.record(name, start, perf_counter() if end is None else end, category)
+
+
+def count(name, n=1):
+    profiler = _profiler
+    if profiler is not None:
+        profiler.count(name, n)
+
+
+def format_summary(rows, counters):
+    lines = [f"{'span':40} {'calls':>7} {'total ms':>10} {'mean ms':>9} {'max ms':>9}"]
+    for name, calls, total, mean, longest in rows:
+        lines.append(f"{name[:40]:40} {calls:7} {total * 1000:10.1f} {mean * 1000:9.2f} {longest * 1000:9.2f}")
+    for name, total in sorted(counters.items()):
+        lines.append(f"{name:40} {total:7}")
+    return "\n".join(lines)
+
+
+def report():
+    """Write the trace and print the summary of the running profiler; called at exit."""
+    profiler = _profiler
+    if profiler is None:
+        return
+    if profiler.path:
+        try:
+            profiler.write_trace(profiler.path)
+            print(f"servcfg: trace written to {profiler.path}", file=sys.stderr)
+        except OSError as e:
+            print(f"servcfg: could not write trace: {e}", file=sys.stderr)
+    print(format_summary(*profiler.summary()), file=sys.stderr)
+
+
+def enable_from_env(environ=os.environ):
+    """Enable profiling if SERVCFG_PROFILE is set; only the editor calls this, never the command-line tools."""
+    value = environ.get(ENV_VAR, "").strip()
+    if value and value.lower() not in ("0", "false", "no", "off"):
+        enable(DEFAULT_TRACE_PATH if value.lower() in ("1", "true", "yes", "on") else value)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarize a trace written with SERVCFG_PROFILE or --profile.")
+    parser.add_argument("trace", nargs="?", default=DEFAULT_TRACE_PATH)
+    args = parser.parse_args(argv)
+
+    try:
+        with open(args.trace, "r") as f:
+            events = json.load(f)["traceEvents"]
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Could not read {args.trace}: {e}", file=sys.stderr)
+        return 1
+    profiler = Profiler()
+    for event in events:
+        if event.get("ph") == "X":
+            start = event["ts"] / 1e6
+            profiler.record(event["name"], start, start + event["dur"] / 1e6, event.get("cat", "editor"))
+        elif event.get("ph") == "C":
+            for name, total in event.get("args", {}).items():
+                profiler.counters[name] = max(profiler.counters.get(name, 0), total)
+    print(format_summary(*profiler.summary()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,316 @@
+"""Asyncio RCON client for pushing dvar changes to running servers over UDP."""
+import argparse
+import asyncio
+import sys
+import time
+from collections import namedtuple
+
+import cfgcore
+import cfgparse
+import fleet
+
+# Quake-style connectionless packets start with four 0xff bytes
+OOB = b"\xff\xff\xff\xff"
+
+Target = namedtuple("Target", "name host port password")
+CommandResult = namedtuple("CommandResult", "command ok response error attempts elapsed")
+ServerReport = namedtuple("ServerReport", "target results elapsed")
+
+
+class RconError(Exception):
+    pass
+
+
+def diff_dvars(running, saved):
+    """Return the dvars whose saved value differs from (or is missing in) the running config."""
+    return {key: value for key, value in saved.items() if running.get(key) != value}
+
+
+def password_last(changes):
+    """Return changes with rcon_password moved to the end.
+
+    The server checks every later command against the new password, so setting
+    it mid-batch would make the rest of the batch fail authentication.
+    """
+    if "rcon_password" not in changes:
+        return changes
+    ordered = {key: value for key, value in changes.items() if key != "rcon_password"}
+    ordered["rcon_password"] = changes["rcon_password"]
+    return ordered
+
+
+def set_commands(changes):
+    return [f"set {key} {cfgparse.quote(value)}" for key, value in password_last(changes).items()]
+
+
+def parse_response(data):
+    if not data.startswith(OOB):
+        raise RconError("Malformed response")
+    text = data[len(OOB):].decode("utf-8", errors="replace")
+    kind, _, body = text.partition("\n")
+    return kind, body
+
+
+class _DatagramQueue(asyncio.DatagramProtocol):
+    def __init__(self):
+        self.queue = asyncio.Queue()
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        self.queue.put_nowait(data)
+
+    def error_received(self, exc):
+        self.queue.put_nowait(exc)
+
+
+class RateLimiter:
+    """Spaces packets to one server at least interval seconds apart."""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.next_time = 0.0
+
+    async def wait(self):
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        if now < self.next_time:
+            await asyncio.sleep(self.next_time - now)
+            now = self.next_time
+        self.next_time = now + self.interval
+
+
+class UdpClient:
+    """One UDP endpoint per server, so replies are matched to that server."""
+
+    def __init__(self, host, port, timeout=1.0, retries=2, interval=0.05):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.retries = retries
+        self.limiter = RateLimiter(interval)
+        self.protocol = None
+
+    async def __aenter__(self):
+        loop = asyncio.get_running_loop()
+        _, self.protocol = await loop.create_datagram_endpoint(_DatagramQueue, remote_addr=(self.host, self.port))
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if self.protocol and self.protocol.transport:
+            self.protocol.transport.close()
+
+    async def request(self, payload):
+        """Send payload and return (response bytes, attempts), retrying on timeout."""
+        queue = self.protocol.queue
+        error = None
+        for attempt in range(1, self.retries + 2):
+            # Drop late replies to an earlier attempt
+            while not queue.empty():
+                queue.get_nowait()
+            await self.limiter.wait()
+            self.protocol.transport.sendto(payload)
+            try:
+                data = await asyncio.wait_for(queue.get(), self.timeout)
+            except asyncio.TimeoutError:
+                error = RconError(f"No response after {attempt} attempt(s)")
+                continue
+            if isinstance(data, Exception):
+                error = RconError(str(data))
+                continue
+            return data, attempt
+        raise error
+
+
+class RconClient(UdpClient):
+    def __init__(self, host, port, password, **kwargs):
+        super().__init__(host, port, **kwargs)
+        self.password = password
+
+    async def command(self, command):
+        payload = OOB + f"rcon {self.password} {command}\n".encode("utf-8")
+        data, attempts = await self.request(payload)
+        kind, body = parse_response(data)
+        if kind != "print":
+            raise RconError(f"Unexpected response: {kind}")
+        if "bad rcon" in body.lower():
+            raise RconError(body.strip())
+        return body, attempts
+
+
+async def apply_to_server(target, commands, timeout=1.0, retries=2, interval=0.05):
+    results = []
+    start = time.perf_counter()
+    try:
+        async with RconClient(target.host, target.port, target.password, timeout=timeout, retries=retries,
+                              interval=interval) as client:
+            for command in commands:
+                command_start = time.perf_counter()
+                try:
+                    body, attempts = await client.command(command)
+                    results.append(CommandResult(command, True, body, None, attempts, time.perf_counter() - command_start))
+                except RconError as e:
+                    results.append(CommandResult(command, False, None, str(e), client.retries + 1,
+                                                 time.perf_counter() - command_start))
+                    if "bad rcon" in str(e).lower():
+                        # Every other command would fail the same way
+                        break
+    except OSError as e:
+        results.append(CommandResult(None, False, None, str(e), 0, 0.0))
+    return ServerReport(target, results, time.perf_counter() - start)
+
+
+async def apply_changes(targets, changes, timeout=1.0, retries=2, interval=0.05, concurrency=256):
+    """Push the changed dvars to every target concurrently and return one ServerReport per target.
+
+    changes is either a dvar dict (applied to every target) or a callable
+    target -> dvar dict for per-server changes.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(target):
+        dvars = changes(target) if callable(changes) else changes
+        async with semaphore:
+            return await apply_to_server(target, set_commands(dvars), timeout, retries, interval)
+
+    return await asyncio.gather(*(run(target) for target in targets))
+
+
+def apply_changes_sync(targets, changes, **kwargs):
+    return asyncio.run(apply_changes(targets, changes, **kwargs))
+
+
+def format_report(reports):
+    lines = []
+    failed_servers = 0
+    for report in reports:
+        failures = [result for result in report.results if not result.ok]
+        status = "ok" if not failures else "FAILED"
+        if failures:
+            failed_servers += 1
+        lines.append(f"{status:6} {report.target.name} ({report.target.host}:{report.target.port}) "
+                     f"{len(report.results) - len(failures)}/{len(report.results)} commands in {report.elapsed * 1000:.0f} ms")
+        for result in failures:
+            lines.append(f"       {result.command or 'connect'}: {result.error}")
+    lines.append(f"{len(reports) - failed_servers}/{len(reports)} servers updated")
+    return "\n".join(lines)
+
+
+class FakeServer(asyncio.DatagramProtocol):
+    """Local stand-in for a game server's RCON port, for tests and dry runs.
+
+    Applies set commands to self.dvars and records every command it accepted,
+    and answers getstatus/getinfo from self.dvars and self.players (a list of
+    (score, ping, name)). drop_first makes it ignore that many packets to
+    exercise retries.
+    """
+
+    def __init__(self, password="CHANGEME", dvars=None, players=None, drop_first=0, delay=0.0):
+        self.password = password
+        self.dvars = dict(dvars or {})
+        self.players = list(players or [])
+        self.commands = []
+        self.drop_first = drop_first
+        self.delay = delay
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    @property
+    def address(self):
+        return self.transport.get_extra_info("sockname")[:2]
+
+    def datagram_received(self, data, addr):
+        if self.drop_first > 0:
+            self.drop_first -= 1
+            return
+        reply = self.handle(data)
+        if reply is None:
+            return
+        if self.delay:
+            asyncio.get_running_loop().call_later(self.delay, self.transport.sendto, reply, addr)
+        else:
+            self.transport.sendto(reply, addr)
+
+    def handle(self, data):
+        if not data.startswith(OOB):
+            return None
+        text = data[len(OOB):].decode("utf-8", errors="replace").rstrip("\n")
+        if text.startswith("rcon "):
+            _, password, command = (text.split(" ", 2) + [""])[:3]
+            if password != self.password:
+                return OOB + b"print\nBad rconpassword.\n"
+            self.commands.append(command)
+            for record in cfgparse.parse_text(command):
+                if record.kind == "dvar":
+                    self.dvars[record.key] = record.value
+            return OOB + b"print\n"
+        if text.startswith("getstatus"):
+            infostring = "".join(f"\\{key}\\{value}" for key, value in self.dvars.items())
+            players = "".join(f'{score} {ping} "{name}"\n' for score, ping, name in self.players)
+            return OOB + f"statusResponse\n{infostring}\n{players}".encode("utf-8")
+        if text.startswith("getinfo"):
+            info = {"challenge": text[len("getinfo"):].strip(), "clients": len(self.players),
+                    "hostname": self.dvars.get("sv_hostname", ""), "mapname": self.dvars.get("mapname", ""),
+                    "gametype": self.dvars.get("g_gametype", ""), "sv_maxclients": self.dvars.get("sv_maxclients", "")}
+            infostring = "".join(f"\\{key}\\{value}" for key, value in info.items())
+            return OOB + f"infoResponse\n{infostring}".encode("utf-8")
+        return None
+
+
+async def start_fake_server(host="127.0.0.1", port=0, factory=FakeServer, **kwargs):
+    loop = asyncio.get_running_loop()
+    transport, protocol = await loop.create_datagram_endpoint(lambda: factory(**kwargs), local_addr=(host, port))
+    return protocol
+
+
+def targets_from_manifest(manifest, names=None):
+    targets = []
+    for server, config, _, _ in fleet.server_configs(manifest):
+        if names and server["name"] not in names:
+            continue
+        targets.append(Target(server["name"], server.get("host", "127.0.0.1"),
+                              int(config.get("net_port") or 27016), config.get("rcon_password", "")))
+    return targets
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Push dvar changes to running servers over RCON.")
+    parser.add_argument("manifest", help="fleet manifest (JSON) listing the servers")
+    parser.add_argument("--set", action="append", default=[], metavar="DVAR=VALUE", help="dvar to set (repeatable)")
+    parser.add_argument("--diff", nargs=2, metavar=("RUNNING_CFG", "SAVED_CFG"),
+                        help="push every dvar that differs between two cfg files")
+    parser.add_argument("--servers", default="", help="comma-separated server names (default: all)")
+    parser.add_argument("--timeout", type=float, default=1.0)
+    parser.add_argument("--retries", type=int, default=2)
+    parser.add_argument("--interval", type=float, default=0.05, help="minimum seconds between packets to one server")
+    args = parser.parse_args(argv)
+
+    changes = {}
+    if args.diff:
+        running = cfgcore.load_config(args.diff[0])
+        saved = cfgcore.load_config(args.diff[1])
+        changes.update(diff_dvars({**running[0], **running[1]}, {**saved[0], **saved[1]}))
+    for assignment in args.set:
+        key, _, value = assignment.partition("=")
+        changes[key] = value
+    if not changes:
+        print("Nothing to apply")
+        return 0
+
+    manifest = fleet.load_manifest(args.manifest)
+    names = {name for name in args.servers.split(",") if name}
+    targets = targets_from_manifest(manifest, names)
+    reports = apply_changes_sync(targets, changes, timeout=args.timeout, retries=args.retries, interval=args.interval)
+    print(format_report(reports))
+    return 0 if all(result.ok for report in reports for result in report.results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
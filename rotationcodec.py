@@ -0,0 +1,81 @@
+"""Encode map rotations into sv_maprotation strings that fit the engine's length limit.
+
+A rotation string is a sequence of `gametype <gametype>` and `map <map>`
+tokens; a gametype applies to every map after it until the next one, and maps
+before the first gametype are played in g_gametype. Every encoding here
+decodes back to exactly the same (gametype, map) list with
+cfgcore.parse_map_rotation.
+"""
+import argparse
+import sys
+
+import cfgcore
+
+# Longest sv_maprotation value the engine keeps; anything past it is cut off without a warning.
+# A longer rotation cannot be split across files either: the engine only ever plays
+# sv_maprotation and has no way to move on to another one when it runs out.
+ROTATION_BYTE_BUDGET = 1024
+
+
+class RotationBudgetError(ValueError):
+    pass
+
+
+def encode_rotation(rotation, gametype=None, compact=False):
+    """Encode [(gametype, map)] as a rotation string.
+
+    gametype is the server's g_gametype; entries whose gametype is None are
+    played in it. In compact mode the leading `gametype` token is left out
+    when the rotation starts in that gametype, since the server would play
+    those maps in it anyway.
+    """
+    parts = []
+    current = gametype if compact else None
+    for entry_gametype, map_code in rotation:
+        if entry_gametype != current and entry_gametype is not None:
+            parts.append("gametype")
+            parts.append(entry_gametype)
+            current = entry_gametype
+        parts.append("map")
+        parts.append(map_code)
+    return " ".join(parts)
+
+
+def decode_rotation(string, gametype=None):
+    """Decode a rotation string into [(gametype, map)]."""
+    return cfgcore.parse_map_rotation(string, gametype)
+
+
+def encoded_size(string):
+    return len(string.encode("utf-8"))
+
+
+def check_budget(string, budget=ROTATION_BYTE_BUDGET):
+    """Raise RotationBudgetError if string is longer than budget bytes."""
+    size = encoded_size(string)
+    if size > budget:
+        raise RotationBudgetError(f"sv_maprotation is {size} bytes, {size - budget} over the {budget} byte limit; "
+                                  f"the server would silently drop the rest of the rotation")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check a config's map rotation against the sv_maprotation length limit.")
+    parser.add_argument("config", nargs="?", default="server.cfg")
+    parser.add_argument("--budget", type=int, default=ROTATION_BYTE_BUDGET, help="byte limit (default: %(default)s)")
+    parser.add_argument("--compact", action="store_true", help="leave out a leading gametype equal to g_gametype")
+    args = parser.parse_args(argv)
+
+    config, _, rotation = cfgcore.load_config(args.config)
+    gametype = config.get("g_gametype")
+    string = encode_rotation(rotation, gametype, args.compact)
+    print(f"{len(rotation)} maps, {encoded_size(string)}/{args.budget} bytes")
+    try:
+        check_budget(string, args.budget)
+    except RotationBudgetError as e:
+        print(e)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,205 @@
+"""Constraint-based map rotation generator, usable from the editor and the command line."""
+import argparse
+import random
+import sys
+
+import cfgcache
+import cfgcore
+
+# Rough playable size of the stock maps; anything not listed counts as medium
+MAP_SIZES = {
+    "mp_shipment": "small", "mp_killhouse": "small", "mp_vacant": "small", "mp_bog": "small",
+    "mp_bog_summer": "small", "mp_crash": "small", "mp_crash_snow": "small", "mp_rust": "small",
+    "mp_nightshift": "small", "mp_compact": "small", "mp_cargoship": "small", "mp_trailerpark": "small",
+    "mp_strike": "medium", "mp_backlot": "medium", "mp_citystreets": "medium", "mp_convoy": "medium",
+    "mp_countdown": "large", "mp_bloc": "large", "mp_pipeline": "medium", "mp_creek": "large",
+    "mp_overgrown": "large", "mp_farm": "medium", "mp_farm_spring": "medium", "mp_crossfire": "medium",
+    "mp_showdown": "small", "mp_carentan": "medium", "mp_boardcast": "medium",
+    "mp_afghan": "large", "mp_derail": "large", "mp_estate": "large", "mp_favela": "medium",
+    "mp_highrise": "medium", "mp_invasion": "medium", "mp_checkpoint": "medium", "mp_quarry": "large",
+    "mp_boneyard": "medium", "mp_subbase": "large", "mp_terminal": "medium", "mp_underpass": "medium",
+    "mp_brecourt": "large", "mp_complex": "medium", "mp_storm": "medium", "mp_abandon": "large",
+    "mp_fuel2": "large",
+}
+
+
+def sizes_for_players(maxclients):
+    maxclients = int(maxclients)
+    if maxclients <= 8:
+        return {"small", "medium"}
+    if maxclients <= 14:
+        return {"small", "medium", "large"}
+    return {"medium", "large"}
+
+
+def parse_weights(text):
+    """Parse "war=3, dom=1" (or just "war dom") into a dict of weights."""
+    weights = {}
+    for part in text.replace(",", " ").split():
+        key, _, weight = part.partition("=")
+        weights[key.strip()] = float(weight) if weight else 1.0
+    return weights
+
+
+class _Pool:
+    """Maps that are currently allowed, with O(1) pick, block and unblock."""
+
+    def __init__(self, codes):
+        self.codes = list(codes)
+        self.available = list(self.codes)
+        self.position = {code: i for i, code in enumerate(self.available)}
+
+    def block(self, code):
+        i = self.position.pop(code, None)
+        if i is None:
+            return
+        last = self.available.pop()
+        if last != code:
+            self.available[i] = last
+            self.position[last] = i
+
+    def unblock(self, code):
+        if code not in self.position:
+            self.position[code] = len(self.available)
+            self.available.append(code)
+
+    def pick(self, rng, weights, max_weight):
+        if not self.available:
+            return None
+        if weights is None:
+            return self.available[int(rng.random() * len(self.available))]
+        # Rejection sampling keeps weighted picks O(1) on average
+        for _ in range(64):
+            code = self.available[int(rng.random() * len(self.available))]
+            if rng.random() * max_weight < weights.get(code, 1.0):
+                return code
+        return max(self.available, key=lambda code: weights.get(code, 1.0))
+
+
+def generate_rotation(catalog, length, gametypes, no_repeat=0, quotas=None, maxclients=None,
+                      pinned=None, seed=None, map_weights=None):
+    """Generate a list of (gametype, map_code) entries.
+
+    gametypes   gametype -> weight (or a list of gametypes with equal weight)
+    no_repeat   a map is not used again within this many slots
+    quotas      category -> share of the generated slots
+    maxclients  only use maps sized for this many players
+    pinned      slot index -> (gametype, map_code) kept as given
+    seed        makes the result reproducible
+    map_weights map_code -> relative weight when picking maps
+    """
+    rng = random.Random(seed)
+    if isinstance(gametypes, str):
+        gametypes = parse_weights(gametypes)
+    elif not isinstance(gametypes, dict):
+        gametypes = {gametype: 1.0 for gametype in gametypes}
+    gametypes = {gametype: weight for gametype, weight in gametypes.items() if weight > 0}
+    if not gametypes:
+        raise ValueError("At least one gametype with a positive weight is required")
+    pinned = {int(slot): tuple(entry) for slot, entry in (pinned or {}).items() if 0 <= int(slot) < length}
+
+    # Every code belongs to the first category that lists it
+    codes = catalog.codes()
+    if maxclients:
+        allowed = sizes_for_players(maxclients)
+        sized = [code for code in codes if MAP_SIZES.get(code, "medium") in allowed]
+        codes = sized or codes
+    if not codes:
+        raise ValueError("The map catalog is empty")
+
+    if quotas:
+        shares = {category: float(share) for category, share in quotas.items() if float(share) > 0}
+        pools = {category: _Pool(code for code in codes if catalog.category_for(code) == category)
+                 for category in shares}
+        pools = {category: pool for category, pool in pools.items() if pool.codes}
+        if not pools:
+            raise ValueError("None of the quota categories has any maps")
+        total_share = sum(shares[category] for category in pools)
+        shares = {category: shares[category] / total_share for category in pools}
+    else:
+        pools = {None: _Pool(codes)}
+        shares = {None: 1.0}
+    pool_of = {code: pool for pool in pools.values() for code in pool.codes}
+    counts = dict.fromkeys(pools, 0)
+
+    # Largest pool bounds how far apart repeats can be pushed
+    no_repeat = max(0, min(int(no_repeat), max(len(pool.codes) for pool in pools.values()) - 1))
+    max_weight = max(map_weights.values(), default=1.0) if map_weights else 1.0
+
+    # Scheduled (un)blocking: slot -> list of (code, delta)
+    schedule = {}
+    blocked = {}
+
+    def update(code, delta):
+        count = blocked.get(code, 0) + delta
+        blocked[code] = count
+        pool = pool_of.get(code)
+        if pool is not None:
+            if count > 0:
+                pool.block(code)
+            else:
+                pool.unblock(code)
+
+    # Pinned maps are kept out of the way on both sides of their slot
+    for slot, (_, code) in pinned.items():
+        schedule.setdefault(max(0, slot - no_repeat), []).append((code, 1))
+        schedule.setdefault(slot + no_repeat + 1, []).append((code, -1))
+
+    gametype_names = list(gametypes)
+    picks = rng.choices(gametype_names, weights=[gametypes[g] for g in gametype_names], k=length)
+
+    rotation = []
+    generated = 0
+    for slot in range(length):
+        for code, delta in schedule.pop(slot, ()):
+            update(code, delta)
+
+        if slot in pinned:
+            rotation.append(pinned[slot])
+            continue
+
+        # Pick the category furthest behind its quota that still has a map available
+        generated += 1
+        candidates = [category for category, pool in pools.items() if pool.available]
+        if candidates:
+            category = max(candidates, key=lambda category: (shares[category] * generated - counts[category], rng.random()))
+            code = pools[category].pick(rng, map_weights, max_weight)
+        else:
+            # Every map is cooling down; relax the repeat rule rather than fail
+            category = max(pools, key=lambda category: shares[category] * generated - counts[category])
+            code = rng.choice(pools[category].codes)
+        counts[category] += 1
+        rotation.append((picks[slot], code))
+        if no_repeat:
+            update(code, 1)
+            schedule.setdefault(slot + no_repeat + 1, []).append((code, -1))
+
+    return rotation
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a map rotation.")
+    parser.add_argument("length", type=int, help="number of maps in the rotation")
+    parser.add_argument("-g", "--gametypes", default="war", help='gametype weights, e.g. "war=3,dom=1"')
+    parser.add_argument("-n", "--no-repeat", type=int, default=0, help="do not repeat a map within N slots")
+    parser.add_argument("-q", "--quotas", default="", help='category shares, e.g. "MWR=2,MW2=1"')
+    parser.add_argument("-c", "--maxclients", type=int, default=None, help="only use maps sized for this many players")
+    parser.add_argument("-s", "--seed", default=None, help="random seed for a reproducible rotation")
+    parser.add_argument("-m", "--maps", default="maps.txt", help="map list (default: maps.txt)")
+    parser.add_argument("-l", "--log", help="games_mp.log; maps players stay on are picked more often")
+    args = parser.parse_args(argv)
+
+    catalog = cfgcache.load_maps(args.maps)
+    map_weights = None
+    if args.log:
+        import gamelog
+        map_weights = gamelog.map_weights(gamelog.LogAnalyzer(args.log).update()) or None
+    rotation = generate_rotation(catalog, args.length, parse_weights(args.gametypes), no_repeat=args.no_repeat,
+                                 quotas=parse_weights(args.quotas) or None, maxclients=args.maxclients,
+                                 seed=args.seed, map_weights=map_weights)
+    print(cfgcore.generate_map_rotation_string(rotation))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,109 +1,343 @@
+import time
+
+# Taken before the heavy imports so the startup budget covers them too
+_STARTED = time.perf_counter()
+
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
 from tkinter import filedialog, messagebox, simpledialog
+import argparse
 import configparser
+import os
 import re
-import random
+import sys
+from functools import partial
+
+# fleet, rcon, status and rotationgen pull in asyncio and multiprocessing, so
+# they are imported where they are first used rather than before the window shows
+import cfgcache
+import cfgcore
+import cfginclude
+import cfgmodel
+import cfgsave
+import dvarschema
+import profiling
+import rotationcodec
+from dvarindex import DvarIndex
+from mapcatalog import MapCatalog
+from observable import ObservableDict, ObservableList
+from tasks import TaskRunner
+from watcher import Watcher
+from widgets import TreeviewDictBinding, VirtualTreeview
+
+# Time from process start until the window is drawn
+STARTUP_BUDGET_MS = 200
+
+GAMETYPES = [
+    ("dm", "FFA"),
+    ("war", "TDM"),
+    ("conf", "KC"),
+    ("dom", "DOM"),
+    ("sd", "S&D"),
+    ("sab", "SAB")
+]
+
+@profiling.traced("load_config")
+def read_config_file(resolver):
+    """Load the config with everything it execs, or None if it does not exist."""
+    try:
+        return resolver.load()
+    except FileNotFoundError:
+        return None
+
+
+@profiling.traced("load_maps")
+def read_maps_file(path):
+    return cfgcache.load_maps(path)
+
 
 class ConfigEditor:
-    def __init__(self, master):
+    def __init__(self, master, fleet_manifest=None):
         self.master = master
+        self.fleet_manifest = fleet_manifest
+        # Started when the Fleet Status tab is first opened
+        self.status_poller = None
         self.master.title("COD:MWR Server Config Editor")
         self.master.geometry("800x800")
 
-        self.config = {}
-        self.custom_dvars = {}
-        self.maps = self.load_maps()
-        self.map_rotation = []
-        
+        # Plain strings only; entries edit it through the Tk variables in config_vars
+        self.config = cfgmodel.ServerConfig()
+        self.config_vars = {}
+        self.config_entries = {}
+        self.custom_dvars = ObservableDict()
+        self.maps = MapCatalog()
+        self.map_rotation = ObservableList()
+
         # Load default config
-        default_config = self.generate_default_config()
-        for line in default_config.split('\n'):
-            if line.strip().startswith('set '):
-                key, value = re.match(r'set\s+(\S+)\s+"?([^"]*)"?', line).groups()
-                self.config[key] = value
-    
+        self.config.update(cfgcore.default_config())
+
+        # Types and ranges of the known DVars, plus any defined in dvarschema.json
+        self.schema = dvarschema.default_registry()
+        try:
+            self.schema.load("dvarschema.json")
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Error", f"Could not read dvarschema.json: {e}")
+
+        # What the running server is assumed to have; updated by live applies
+        self.live_address = "127.0.0.1:27016"
+        self.applied_dvars = self.effective_dvars(self.config)
+
+        # Match statistics from games_mp.log, once the log has been analyzed
+        self.log_totals = None
+
+        # File I/O and other slow work runs in the background, results come back through after()
+        self.tasks = TaskRunner(self.master, on_change=self.update_task_status)
+        self.master.protocol("WM_DELETE_WINDOW", self.close)
+
+        self.create_widgets()
+
+        # What server.cfg held when it was last loaded or saved, the base for merging external edits
+        self.disk_state = self.snapshot()
+
+        # server.cfg plus the files it execs; values are saved back to the file that sets them
+        self.includes = cfginclude.IncludeResolver("server.cfg")
+
+        # Pick up edits made by other tools while the editor is open, including to exec'd files
+        self.watcher = Watcher([os.getcwd()], patterns=("*.cfg", "maps.txt"))
+        self.watcher.start()
+        self.master.after(500, self.check_external_changes)
+
         # Then load from file, overwriting defaults if file exists
+        self.load_maps()
         self.load_config()
 
-        self.create_widgets()
-        self.update_map_count()
+        self.startup_ms = None
+        self.master.after_idle(self.report_startup)
+
+    def report_startup(self):
+        self.master.update_idletasks()
+        self.startup_ms = (time.perf_counter() - _STARTED) * 1000
+        profiling.record("startup", _STARTED)
+        if self.startup_ms > STARTUP_BUDGET_MS:
+            print(f"servcfg: window took {self.startup_ms:.0f} ms to appear "
+                  f"(budget {STARTUP_BUDGET_MS} ms)", file=sys.stderr)
+
+    def close(self):
+        self.watcher.stop()
+        if self.status_poller is not None:
+            self.status_poller.stop()
+        self.tasks.shutdown()
+        self.master.destroy()
 
     def load_maps(self):
-        try:
-            with open("maps.txt", "r") as f:
-                lines = f.readlines()
-            
-            maps = {}
-            current_category = ""
-            for line in lines:
-                line = line.strip()
-                if line.endswith("ROTATION LIST"):
-                    current_category = line.split(" ")[0]
-                    maps[current_category] = []
-                elif " - " in line:
-                    map_name, map_code = line.split(" - ")
-                    maps[current_category].append((map_name.strip(), map_code.strip()))
-            return maps
-        except FileNotFoundError:
+        self.tasks.submit(read_maps_file, "maps.txt", label="Loading maps.txt",
+                          on_done=self.set_maps, on_error=self.on_maps_error)
+
+    def set_maps(self, catalog):
+        self.maps = catalog
+        if self.map_category_dropdown is not None:
+            self.map_category_dropdown['values'] = list(self.maps.keys())
+        self.refresh_rotation_list()
+
+    def on_maps_error(self, error):
+        if isinstance(error, FileNotFoundError):
             messagebox.showerror("Error", "maps.txt file not found!")
-            return {}
+        else:
+            messagebox.showerror("Error", f"Could not read maps.txt: {error}")
 
     def load_config(self):
-        try:
-            with open("server.cfg", "r") as f:
-                content = f.read()
-                
-            custom_section = False
-            for line in content.split('\n'):
-                if line.strip() == "// CUSTOM DVARS H2M CFG EDITOR //":
-                    custom_section = True
-                    continue
-                if line.strip().startswith('set '):
-                    key, value = re.match(r'set\s+(\S+)\s+"?([^"]*)"?', line).groups()
-                    if custom_section:
-                        self.custom_dvars[key] = value
-                    else:
-                        self.config[key] = value
-                        if key == "sv_maprotation":
-                            self.parse_map_rotation(value)
-        except FileNotFoundError:
+        self.tasks.submit(read_config_file, self.includes, label="Loading server.cfg",
+                          on_done=self.apply_loaded_config,
+                          on_error=lambda error: messagebox.showerror("Error", f"Could not read server.cfg: {error}"))
+
+    def apply_loaded_config(self, loaded):
+        if loaded is None:
             # If file doesn't exist, we'll generate the config
-            pass
+            return
+        config, custom_dvars, map_rotation = loaded
+        for key, value in config.items():
+            self.set_config_value(key, value)
+        # One reset instead of a change event per DVar; the list refills in idle-time chunks
+        self.custom_dvars.reset({**self.custom_dvars, **custom_dvars})
+        self.map_rotation[:] = map_rotation
+        self.applied_dvars = self.effective_dvars(self.collect_config())
+        self.disk_state = self.snapshot()
+        self.watch_includes()
+        self.report_includes()
+
+    def watch_includes(self):
+        # exec'd files can live in other directories, e.g. `exec configs/tdm.cfg`
+        self.watcher.add(self.includes.paths)
+
+    def report_includes(self):
+        resolution = self.includes.last
+        problems = [f"Missing: {os.path.relpath(path)}" for path in resolution.missing]
+        problems += ["Exec loop (skipped): " + " -> ".join(os.path.relpath(path) for path in cycle)
+                     for cycle in resolution.cycles]
+        if problems:
+            messagebox.showwarning("Includes", "server.cfg execs files that cannot be loaded:\n\n" + "\n".join(problems))
+
+    def snapshot(self):
+        config = self.collect_config()
+        # The rotation list, not the dvar string, is the source of truth while editing
+        config.pop("sv_maprotation", None)
+        return config, dict(self.custom_dvars), list(self.map_rotation)
+
+    def check_external_changes(self):
+        changed = self.watcher.changes()
+        if os.path.abspath("maps.txt") in changed:
+            self.load_maps()
+        included = changed.intersection(self.includes.paths)
+        if included:
+            # Only the files that changed are parsed again
+            self.includes.invalidate(included)
+            self.tasks.submit(read_config_file, self.includes, label="Reloading server.cfg",
+                              on_done=self.merge_external_config,
+                              on_error=lambda error: messagebox.showerror("Error", f"Could not read server.cfg: {error}"))
+        self.master.after(500, self.check_external_changes)
+
+    def merge_external_config(self, loaded):
+        if loaded is None:
+            # Deleted on disk; the next save writes it again
+            return
+        self.watch_includes()
+        config, custom_dvars, map_rotation = loaded
+        their_config = cfgcore.default_config()
+        their_config.update(config)
+        their_config.pop("sv_maprotation", None)
+        base_config, base_custom, base_rotation = self.disk_state
+        my_config, my_custom, my_rotation = self.snapshot()
+
+        # Take every external edit to a value we have not touched ourselves
+        merged, applied, conflicts = cfgcore.merge_dvars(base_config, my_config, their_config)
+        for key in applied:
+            if key in merged:
+                self.set_config_value(key, merged[key])
+            elif key in self.config_vars:
+                self.set_config_value(key, "")
+            else:
+                self.config.pop(key, None)
 
-    def parse_map_rotation(self, rotation_string):
-        parts = rotation_string.split()
-        i = 0
-        while i < len(parts):
-            if parts[i] == "gametype":
-                gametype = parts[i+1]
-                i += 2
-            elif parts[i] == "map":
-                self.map_rotation.append((gametype, parts[i+1]))
-                i += 2
+        merged_custom, applied_custom, custom_conflicts = cfgcore.merge_dvars(base_custom, my_custom, custom_dvars)
+        conflicts.update(custom_conflicts)
+        if len(applied_custom) > 50:
+            self.custom_dvars.reset(merged_custom)
+        else:
+            for key in applied_custom:
+                if key in merged_custom:
+                    self.custom_dvars[key] = merged_custom[key]
+                else:
+                    del self.custom_dvars[key]
+
+        if map_rotation != base_rotation and my_rotation != map_rotation:
+            if my_rotation == base_rotation:
+                self.map_rotation[:] = map_rotation
             else:
-                i += 1
+                conflicts["sv_maprotation"] = (cfgcore.generate_map_rotation_string(my_rotation),
+                                               cfgcore.generate_map_rotation_string(map_rotation))
+
+        self.disk_state = (their_config, dict(custom_dvars), list(map_rotation))
+        if conflicts:
+            lines = [f"{key}: yours {mine!r}, on disk {theirs!r}" for key, (mine, theirs) in list(conflicts.items())[:20]]
+            if len(conflicts) > 20:
+                lines.append(f"... and {len(conflicts) - 20} more")
+            messagebox.showwarning("server.cfg changed on disk",
+                                   "server.cfg was edited outside the editor. These DVars were also changed here, "
+                                   "so your values were kept and will overwrite the file on the next save:\n\n"
+                                   + "\n".join(lines))
+
+    def set_config_value(self, key, value):
+        var = self.config_vars.get(key)
+        if var is not None:
+            # The variable's trace stores the value in the model
+            var.set(value)
+        else:
+            self.config[key] = value
+
+    def parse_map_rotation(self, rotation_string):
+        self.map_rotation.extend(cfgcore.parse_map_rotation(rotation_string))
 
+    @profiling.traced()
     def create_widgets(self):
         self.notebook = ttk.Notebook(self.master)
         self.notebook.pack(fill=BOTH, expand=True, padx=10, pady=10)
 
-        self.create_general_tab()
-        self.create_gametype_tabs()
-        self.create_custom_dvar_tab()
-        self.create_map_rotation_tab()
-
-        save_button = ttk.Button(self.master, text="Save Config", command=self.save_config, style='success.TButton')
-        save_button.pack(pady=10)
-
-    def create_general_tab(self):
-        general_frame = ttk.Frame(self.notebook)
-        self.notebook.add(general_frame, text="General")
+        # Widgets of tabs that have not been opened yet
+        self.dvar_binding = None
+        self.rotation_listbox = None
+        self.map_count_label = None
+        self.stats_tree = None
+        self.map_category_dropdown = None
+
+        # Each tab is built the first time it is selected
+        self.tab_builders = {}
+        self.add_tab("General", self.create_general_tab)
+        for gametype, label in GAMETYPES:
+            self.add_tab(label, partial(self.create_gametype_tab, gametype=gametype))
+        self.add_tab("Custom DVars", self.create_custom_dvar_tab)
+        self.add_tab("Map Rotation", self.create_map_rotation_tab)
+        if self.fleet_manifest:
+            self.add_tab("Fleet Status", self.create_fleet_status_tab)
+        self.notebook.bind("<<NotebookTabChanged>>", lambda event: self.build_tab(self.notebook.select()))
+        self.build_tab(self.notebook.select())
+
+        action_frame = ttk.Frame(self.master)
+        action_frame.pack(pady=10)
+
+        save_button = ttk.Button(action_frame, text="Save Config", command=self.save_config, style='success.TButton')
+        save_button.pack(side=LEFT, padx=5)
+
+        apply_button = ttk.Button(action_frame, text="Apply Live...", command=self.apply_live, style='info.TButton')
+        apply_button.pack(side=LEFT, padx=5)
+
+        history_button = ttk.Button(action_frame, text="History...", command=self.show_history, style='secondary.TButton')
+        history_button.pack(side=LEFT, padx=5)
+
+        # Progress for background work, only shown while something is running
+        self.task_frame = ttk.Frame(self.master)
+        self.task_label = ttk.Label(self.task_frame, text="")
+        self.task_label.pack(side=LEFT, padx=5)
+        self.task_progress = ttk.Progressbar(self.task_frame, mode="indeterminate", length=200)
+        self.task_progress.pack(side=LEFT, padx=5)
+        cancel_button = ttk.Button(self.task_frame, text="Cancel", command=self.tasks.cancel_all, style='danger.TButton')
+        cancel_button.pack(side=LEFT, padx=5)
+
+    def add_tab(self, text, builder):
+        frame = ttk.Frame(self.notebook)
+        self.notebook.add(frame, text=text)
+        self.tab_builders[str(frame)] = (text, builder, frame)
+
+    def build_tab(self, tab_id):
+        entry = self.tab_builders.pop(str(tab_id), None)
+        if entry is not None:
+            text, builder, frame = entry
+            with profiling.span(f"create_widgets: {text}"):
+                builder(frame)
+
+    def update_task_status(self, tasks):
+        if not tasks:
+            self.task_progress.stop()
+            self.task_frame.pack_forget()
+            return
+        task = tasks[-1]
+        label = task.message or task.label or "Working"
+        self.task_label.config(text=label if len(tasks) == 1 else f"{label} (+{len(tasks) - 1} more)")
+        if task.fraction is None:
+            if self.task_progress.cget("mode") != "indeterminate":
+                self.task_progress.config(mode="indeterminate")
+            self.task_progress.start(20)
+        else:
+            self.task_progress.stop()
+            self.task_progress.config(mode="determinate", value=task.fraction * 100)
+        if not self.task_frame.winfo_ismapped():
+            self.task_frame.pack(fill=X, padx=10, pady=(0, 10))
 
+    def create_general_tab(self, general_frame):
         # Server name with color selection
         ttk.Label(general_frame, text="Server Name").grid(row=0, column=0, sticky="e", padx=5, pady=5)
         self.server_name_entry = ttk.Entry(general_frame, width=40)
-        self.server_name_entry.insert(0, self.config.get("sv_hostname", ""))
         self.server_name_entry.grid(row=0, column=1, padx=5, pady=5)
 
         self.color_var = ttk.StringVar()
@@ -113,7 +347,7 @@ class ConfigEditor:
         color_dropdown.grid(row=0, column=2, padx=5, pady=5)
         color_dropdown.bind('<<ComboboxSelected>>', self.add_color_to_name)
 
-        self.config["sv_hostname"] = self.server_name_entry
+        self.bind_entry(self.server_name_entry, "sv_hostname")
 
         other_settings = [
             ("Password", "g_password"),
@@ -126,9 +360,40 @@ class ConfigEditor:
         for i, (label, key) in enumerate(other_settings, start=1):
             ttk.Label(general_frame, text=label).grid(row=i, column=0, sticky="e", padx=5, pady=5)
             entry = ttk.Entry(general_frame, width=40)
-            entry.insert(0, self.config.get(key, ""))
             entry.grid(row=i, column=1, columnspan=2, padx=5, pady=5)
-            self.config[key] = entry
+            self.bind_entry(entry, key)
+
+    def bind_entry(self, entry, key):
+        """Show self.config[key] in entry and store every edit back into the model."""
+        var = self.config_vars.get(key)
+        if var is None:
+            var = self.config_vars[key] = ttk.StringVar(value=self.config.get(key, ""))
+            var.trace_add("write", lambda *args: self.on_entry_change(key))
+        entry.configure(textvariable=var)
+        self.config_entries[key] = entry
+        self.check_entry(key)
+
+    def on_entry_change(self, key):
+        self.config[key] = self.config_vars[key].get()
+        self.check_entry(key)
+
+    def check_entry(self, key):
+        """Outline the entry for key in red while its value fails the schema."""
+        entry = self.config_entries.get(key)
+        if entry is not None:
+            issue = self.schema.check(key, self.config.get(key, ""))
+            entry.configure(bootstyle="danger" if issue else "default")
+            return issue
+        return None
+
+    def show_validation_issues(self, issues):
+        """Outline the invalid entries and list the issues found by schema.validate in a background task."""
+        for key in self.config_entries:
+            self.check_entry(key)
+        lines = [issue.message for issue in issues[:20]]
+        if len(issues) > 20:
+            lines.append(f"... and {len(issues) - 20} more")
+        messagebox.showwarning("Invalid DVars", "Please fix these values first:\n\n" + "\n".join(lines))
 
     def add_color_to_name(self, event):
         color_codes = {
@@ -147,46 +412,53 @@ class ConfigEditor:
         self.server_name_entry.delete(0, END)
         self.server_name_entry.insert(0, new_name)
 
-    def create_gametype_tabs(self):
-        gametypes = [
-            ("dm", "FFA"),
-            ("war", "TDM"),
-            ("conf", "KC"),
-            ("dom", "DOM"),
-            ("sd", "S&D"),
-            ("sab", "SAB")
+    def create_gametype_tab(self, frame, gametype):
+        settings = [
+            ("Score Limit", f"scr_{gametype}_scorelimit"),
+            ("Time Limit", f"scr_{gametype}_timelimit"),
+            ("Player Respawn Delay", f"scr_{gametype}_playerrespawndelay"),
+            ("Number of Lives", f"scr_{gametype}_numlives"),
+            ("Round Limit", f"scr_{gametype}_roundlimit"),
+            ("Win Limit", f"scr_{gametype}_winlimit"),
         ]
-        
-        for gametype, label in gametypes:
-            frame = ttk.Frame(self.notebook)
-            self.notebook.add(frame, text=label)
-
-            settings = [
-                ("Score Limit", f"scr_{gametype}_scorelimit"),
-                ("Time Limit", f"scr_{gametype}_timelimit"),
-                ("Player Respawn Delay", f"scr_{gametype}_playerrespawndelay"),
-                ("Number of Lives", f"scr_{gametype}_numlives"),
-                ("Round Limit", f"scr_{gametype}_roundlimit"),
-                ("Win Limit", f"scr_{gametype}_winlimit"),
-            ]
-
-            for i, (setting_label, key) in enumerate(settings):
-                ttk.Label(frame, text=setting_label).grid(row=i, column=0, sticky="e", padx=5, pady=5)
-                entry = ttk.Entry(frame, width=40)
-                entry.insert(0, self.config.get(key, ""))
-                entry.grid(row=i, column=1, padx=5, pady=5)
-                self.config[key] = entry
-
-    def create_custom_dvar_tab(self):
-        custom_frame = ttk.Frame(self.notebook)
-        self.notebook.add(custom_frame, text="Custom DVars")
+
+        for i, (setting_label, key) in enumerate(settings):
+            ttk.Label(frame, text=setting_label).grid(row=i, column=0, sticky="e", padx=5, pady=5)
+            entry = ttk.Entry(frame, width=40)
+            entry.grid(row=i, column=1, padx=5, pady=5)
+            self.bind_entry(entry, key)
+
+    def create_custom_dvar_tab(self, custom_frame):
+        # Search and filters above the list
+        search_frame = ttk.Frame(custom_frame)
+        search_frame.pack(fill=X, padx=10, pady=(10, 0))
+
+        ttk.Label(search_frame, text="Search:").pack(side=LEFT, padx=5)
+        self.dvar_search_var = ttk.StringVar()
+        search_entry = ttk.Entry(search_frame, textvariable=self.dvar_search_var, width=30)
+        search_entry.pack(side=LEFT, padx=5)
+        search_entry.bind("<KeyRelease>", lambda event: self.schedule_dvar_filter())
+
+        self.dvar_category_var = ttk.StringVar(value="All categories")
+        category_dropdown = ttk.Combobox(search_frame, textvariable=self.dvar_category_var, width=16, state="readonly",
+                                         postcommand=lambda: category_dropdown.configure(
+                                             values=["All categories"] + self.dvar_index.categories()))
+        category_dropdown.pack(side=LEFT, padx=5)
+        category_dropdown.bind("<<ComboboxSelected>>", lambda event: self.schedule_dvar_filter())
+
+        self.dvar_changed_var = ttk.BooleanVar(value=False)
+        ttk.Checkbutton(search_frame, text="Differs from default", variable=self.dvar_changed_var,
+                        command=self.schedule_dvar_filter).pack(side=LEFT, padx=5)
+
+        self.dvar_match_label = ttk.Label(search_frame, text="")
+        self.dvar_match_label.pack(side=RIGHT, padx=5)
 
         # Create a frame for the list of custom DVars
         list_frame = ttk.Frame(custom_frame)
         list_frame.pack(fill=BOTH, expand=True, padx=10, pady=10)
 
         # Create a scrollable list of custom DVars
-        self.dvar_listbox = ttk.Treeview(list_frame, columns=("Name", "Value"), show="headings")
+        self.dvar_listbox = ttk.Treeview(list_frame, columns=("Name", "Value"), show="headings", selectmode="extended")
         self.dvar_listbox.heading("Name", text="Name")
         self.dvar_listbox.heading("Value", text="Value")
         self.dvar_listbox.pack(side=LEFT, fill=BOTH, expand=True)
@@ -195,9 +467,15 @@ class ConfigEditor:
         scrollbar.pack(side=RIGHT, fill=Y)
         self.dvar_listbox.configure(yscrollcommand=scrollbar.set)
 
-        # Load existing custom DVars
-        for key, value in self.custom_dvars.items():
-            self.dvar_listbox.insert("", END, values=(key, value))
+        # Load existing custom DVars and keep the list in sync with the model
+        self.dvar_binding = TreeviewDictBinding(self.dvar_listbox, self.custom_dvars, chunk_size=500)
+        self.dvar_listbox.bind("<<TreeviewSelect>>", self.on_dvar_select)
+
+        # Searches go through an index that is filled in while the window is idle
+        self.dvar_index = DvarIndex(self.custom_dvars, self.schema.category_for, self.schema.default_for)
+        self.dvar_filter_job = None
+        self.custom_dvars.subscribe(self.on_custom_dvars_change)
+        self.index_dvars()
 
         # Create input fields for new DVars
         input_frame = ttk.Frame(custom_frame)
@@ -224,31 +502,22 @@ class ConfigEditor:
         remove_button = ttk.Button(button_frame, text="Remove DVar", command=self.remove_dvar)
         remove_button.pack(side=LEFT, padx=5)
 
-    def create_map_rotation_tab(self):
-        rotation_frame = ttk.Frame(self.notebook)
-        self.notebook.add(rotation_frame, text="Map Rotation")
-
+    def create_map_rotation_tab(self, rotation_frame):
         # Create a frame for the list of maps in rotation
         list_frame = ttk.Frame(rotation_frame)
         list_frame.pack(fill=BOTH, expand=True, padx=10, pady=10)
 
-        self.rotation_listbox = ttk.Treeview(list_frame, columns=("Gametype", "Map"), show="headings")
-        self.rotation_listbox.heading("Gametype", text="Gametype")
-        self.rotation_listbox.heading("Map", text="Map")
-        self.rotation_listbox.pack(side=LEFT, fill=BOTH, expand=True)
-
-        scrollbar = ttk.Scrollbar(list_frame, orient=VERTICAL, command=self.rotation_listbox.yview)
-        scrollbar.pack(side=RIGHT, fill=Y)
-        self.rotation_listbox.configure(yscrollcommand=scrollbar.set)
-
-        # Load existing map rotation
-        for gametype, map_code in self.map_rotation:
-            map_name = next((name for category in self.maps.values() for name, code in category if code == map_code), map_code)
-            self.rotation_listbox.insert("", END, values=(gametype, map_name))
+        # Only the visible rows are materialized, so long rotations stay responsive
+        self.rotation_listbox = VirtualTreeview(list_frame, ("Gametype", "Map"), self.rotation_row, lambda: len(self.map_rotation))
+        self.rotation_listbox.pack(fill=BOTH, expand=True)
+        self.rotation_listbox.bind_list(self.map_rotation)
+        self.rotation_listbox.refresh()
+        self.map_rotation.subscribe(lambda *change: self.update_map_count())
 
         # Add a label to show the number of maps in rotation
         self.map_count_label = ttk.Label(rotation_frame, text="Maps in rotation: 0")
         self.map_count_label.pack(pady=5)
+        self.update_map_count()
 
         # Create input fields for adding maps to rotation
         input_frame = ttk.Frame(rotation_frame)
@@ -256,7 +525,7 @@ class ConfigEditor:
 
         ttk.Label(input_frame, text="Gametype:").grid(row=0, column=0, padx=5, pady=5)
         self.gametype_var = ttk.StringVar()
-        self.gametype_dropdown = ttk.Combobox(input_frame, textvariable=self.gametype_var, values=["dm", "war", "conf", "dom", "sd", "sab"])
+        self.gametype_dropdown = ttk.Combobox(input_frame, textvariable=self.gametype_var, values=[gametype for gametype, _ in GAMETYPES])
         self.gametype_dropdown.grid(row=0, column=1, padx=5, pady=5)
 
         ttk.Label(input_frame, text="Map Category:").grid(row=0, column=2, padx=5, pady=5)
@@ -290,276 +559,573 @@ class ConfigEditor:
         randomize_button = ttk.Button(button_frame, text="Randomize Maps", command=self.randomize_maps)
         randomize_button.pack(side=LEFT, padx=5)
 
+        # How each map actually played, from the server log, to tune the rotation from data
+        stats_frame = ttk.Labelframe(rotation_frame, text="Match Stats (games_mp.log)")
+        stats_frame.pack(fill=X, padx=10, pady=10)
+
+        columns = ("matches", "duration", "players", "quits")
+        self.stats_tree = ttk.Treeview(stats_frame, columns=columns, height=6)
+        self.stats_tree.heading("#0", text="Map")
+        for column, heading in zip(columns, ("Matches", "Avg Duration", "Players at Start", "Quit Early")):
+            self.stats_tree.heading(column, text=heading)
+            self.stats_tree.column(column, width=110, anchor="e")
+        self.stats_tree.pack(fill=X, padx=5, pady=5)
+
+        stats_buttons = ttk.Frame(stats_frame)
+        stats_buttons.pack(fill=X, padx=5, pady=5)
+        ttk.Button(stats_buttons, text="Analyze Log...", command=self.analyze_log).pack(side=LEFT, padx=5)
+        ttk.Label(stats_buttons, text="Group by:").pack(side=LEFT, padx=5)
+        self.stats_by_var = ttk.StringVar(value="map")
+        stats_by = ttk.Combobox(stats_buttons, textvariable=self.stats_by_var, values=("map", "gametype", "both"),
+                                state="readonly", width=10)
+        stats_by.pack(side=LEFT, padx=5)
+        stats_by.bind("<<ComboboxSelected>>", lambda event: self.refresh_log_stats())
+        self.refresh_log_stats()
+
+    def rotation_row(self, index):
+        gametype, map_code = self.map_rotation[index]
+        return gametype, self.maps.name_for(map_code)
+
+    def create_fleet_status_tab(self, status_frame):
+        import rcon
+        import status
+
+        list_frame = ttk.Frame(status_frame)
+        list_frame.pack(fill=BOTH, expand=True, padx=10, pady=10)
+
+        columns = ("Server", "Address", "Map", "Gametype", "Players", "Ping", "Drift")
+        self.status_listbox = ttk.Treeview(list_frame, columns=columns, show="headings")
+        for column in columns:
+            self.status_listbox.heading(column, text=column)
+            self.status_listbox.column(column, width=90, stretch=column == "Drift")
+        self.status_listbox.pack(side=LEFT, fill=BOTH, expand=True)
+
+        scrollbar = ttk.Scrollbar(list_frame, orient=VERTICAL, command=self.status_listbox.yview)
+        scrollbar.pack(side=RIGHT, fill=Y)
+        self.status_listbox.configure(yscrollcommand=scrollbar.set)
+
+        self.status_label = ttk.Label(status_frame, text="Waiting for the first poll...")
+        self.status_label.pack(pady=5)
+
+        # Polling runs on its own thread and event loop; the UI only reads the cache
+        targets = rcon.targets_from_manifest(self.fleet_manifest)
+        self.fleet_local_dvars = status.local_dvars_from_manifest(self.fleet_manifest)
+        self.status_rows = {}
+        for target in targets:
+            self.status_rows[target.name] = self.status_listbox.insert(
+                "", END, values=(target.name, f"{target.host}:{target.port}", "", "", "", "", ""))
+            profiling.count("rows inserted")
+        self.status_poller = status.StatusPoller(targets, interval=3.0)
+        self.status_poller.start()
+        self.master.after(1000, self.refresh_fleet_status)
+
+    def refresh_fleet_status(self):
+        import status
+
+        states = self.status_poller.cache.snapshot()
+        online = 0
+        for name, state in states.items():
+            target = state.target
+            if state.error or not self.status_poller.cache.is_fresh(state):
+                values = (name, f"{target.host}:{target.port}", "-", "-", "-", "-", state.error or "stale")
+            else:
+                online += 1
+                changes = status.drift(state, self.fleet_local_dvars.get(name, {}))
+                drift_text = ", ".join(f"{key}={running}" for key, (local, running) in changes.items())
+                values = (name, f"{target.host}:{target.port}", state.mapname or "-", state.gametype or "-",
+                          f"{state.clients}/{state.maxclients}", f"{state.ping * 1000:.0f} ms", drift_text or "-")
+            self.status_listbox.item(self.status_rows[name], values=values)
+        self.status_label.config(text=f"{online}/{len(self.status_rows)} servers online")
+        self.master.after(1000, self.refresh_fleet_status)
+
     def update_map_dropdown(self, event):
         category = self.map_category_var.get()
-        self.map_dropdown['values'] = [name for name, _ in self.maps.get(category, [])]
+        self.map_dropdown['values'] = self.maps.names(category)
+
+    def on_custom_dvars_change(self, op, *args):
+        if op == "reset":
+            self.index_dvars()
+        if self.dvar_binding.visible is not None:
+            self.schedule_dvar_filter()
+
+    def index_dvars(self):
+        if self.dvar_index.index_some():
+            self.master.after_idle(self.index_dvars)
+
+    def schedule_dvar_filter(self):
+        # Coalesce keystrokes and bursts of model changes into one search
+        if self.dvar_filter_job is not None:
+            self.master.after_cancel(self.dvar_filter_job)
+        self.dvar_filter_job = self.master.after(80, self.apply_dvar_filter)
+
+    def apply_dvar_filter(self):
+        self.dvar_filter_job = None
+        query = self.dvar_search_var.get()
+        category = self.dvar_category_var.get()
+        category = None if category == "All categories" else category
+        changed_only = self.dvar_changed_var.get()
+        if not query.strip() and category is None and not changed_only:
+            self.dvar_binding.filter(None)
+            self.dvar_match_label.config(text="")
+            return
+        keys = self.dvar_index.search(query, category, changed_only)
+        self.dvar_binding.filter(keys)
+        self.dvar_match_label.config(text=f"{len(keys)} of {len(self.custom_dvars)}")
 
+    @profiling.traced(category="handler")
     def add_to_rotation(self):
         gametype = self.gametype_var.get()
         map_category = self.map_category_var.get()
         map_name = self.map_var.get()
         if gametype and map_category and map_name:
-            map_code = next((code for name, code in self.maps[map_category] if name == map_name), "")
-            self.rotation_listbox.insert("", END, values=(gametype, map_name))
+            map_code = self.maps.code_for(map_name, map_category) or ""
             self.map_rotation.append((gametype, map_code))
+            self.rotation_listbox.see(len(self.map_rotation) - 1)
             # Clear map selection
             self.map_category_var.set('')
             self.map_var.set('')
-            self.update_map_count()
         else:
             messagebox.showwarning("Invalid Input", "Please select a gametype, map category, and map.")
 
+    @profiling.traced(category="handler")
     def remove_from_rotation(self):
-        selected_item = self.rotation_listbox.selection()
-        if selected_item:
-            index = self.rotation_listbox.index(selected_item)
-            self.rotation_listbox.delete(selected_item)
-            del self.map_rotation[index]
-            self.update_map_count()
+        selected_items = self.rotation_listbox.selection()
+        if selected_items:
+            self.map_rotation.delete_many(selected_items)
         else:
             messagebox.showwarning("No Selection", "Please select an item to remove from the rotation.")
 
+    @profiling.traced(category="handler")
     def move_up_in_rotation(self):
-        selected_item = self.rotation_listbox.selection()
-        if selected_item:
-            index = self.rotation_listbox.index(selected_item)
-            if index > 0:
-                self.map_rotation[index], self.map_rotation[index-1] = self.map_rotation[index-1], self.map_rotation[index]
-                self.refresh_rotation_list()
-                self.rotation_listbox.selection_set(index-1)
+        selected_items = self.rotation_listbox.selection()
+        if selected_items:
+            moved = self.map_rotation.shift(selected_items, -1)
+            self.rotation_listbox.see(moved[0])
         else:
             messagebox.showwarning("No Selection", "Please select an item to move up in the rotation.")
 
+    @profiling.traced(category="handler")
     def move_down_in_rotation(self):
-        selected_item = self.rotation_listbox.selection()
-        if selected_item:
-            index = self.rotation_listbox.index(selected_item)
-            if index < len(self.map_rotation) - 1:
-                self.map_rotation[index], self.map_rotation[index+1] = self.map_rotation[index+1], self.map_rotation[index]
-                self.refresh_rotation_list()
-                self.rotation_listbox.selection_set(index+1)
+        selected_items = self.rotation_listbox.selection()
+        if selected_items:
+            moved = self.map_rotation.shift(selected_items, 1)
+            self.rotation_listbox.see(moved[-1])
         else:
             messagebox.showwarning("No Selection", "Please select an item to move down in the rotation.")
 
+    @profiling.traced()
     def refresh_rotation_list(self):
-        self.rotation_listbox.delete(*self.rotation_listbox.get_children())
-        for gametype, map_code in self.map_rotation:
-            map_name = next((name for category in self.maps.values() for name, code in category if code == map_code), map_code)
-            self.rotation_listbox.insert("", END, values=(gametype, map_name))
+        if self.rotation_listbox is not None:
+            self.rotation_listbox.refresh()
 
     def update_map_count(self):
-        count = len(self.map_rotation)
-        self.map_count_label.config(text=f"Maps in rotation: {count}")
-
-    def randomize_maps(self):
-        gametype = self.gametype_var.get()
-        if not gametype:
-            messagebox.showwarning("Invalid Input", "Please select a gametype first.")
+        if self.map_count_label is not None:
+            count = len(self.map_rotation)
+            # Re-encoding is cheap enough to redo on every edit, even for thousands of maps
+            size = rotationcodec.encoded_size(self.generate_map_rotation_string())
+            budget = rotationcodec.ROTATION_BYTE_BUDGET
+            self.map_count_label.config(text=f"Maps in rotation: {count} ({size}/{budget} bytes)",
+                                        bootstyle="danger" if size > budget else "default")
+
+    @profiling.traced(category="handler")
+    def analyze_log(self):
+        import gamelog
+
+        path = gamelog.default_log_path(self.collect_config(), os.path.dirname(self.includes.root))
+        if not os.path.isfile(path):
+            path = filedialog.askopenfilename(title="Open games_mp.log",
+                                              filetypes=[("Log files", "*.log"), ("All files", "*.*")])
+            if not path:
+                return
+
+        def analyze(context, path):
+            # Only what was appended since the last analysis is read
+            analyzer = gamelog.LogAnalyzer(path)
+            return analyzer.update(progress=lambda fraction: context.progress(fraction, f"Reading {os.path.basename(path)}"))
+
+        def analyzed(totals):
+            self.log_totals = totals
+            self.refresh_log_stats()
+
+        self.tasks.submit(analyze, path, label="Analyzing log", with_context=True, on_done=analyzed,
+                          on_error=lambda error: messagebox.showerror("Error", f"Could not read {path}: {error}"))
+
+    def refresh_log_stats(self):
+        if self.stats_tree is None:
             return
-
-        # Prompt user for number of maps
-        num_maps = simpledialog.askinteger("Randomize Maps", "How many maps do you want to add?", 
-                                           minvalue=1, maxvalue=54)
-        if num_maps is None:  # 
+        self.stats_tree.delete(*self.stats_tree.get_children())
+        if not self.log_totals:
             return
+        import gamelog
 
-        # Get all available maps
-        all_maps = [(name, code) for category in self.maps.values() for name, code in category]
-        
-        # Randomly select the specified number of maps
-        selected_maps = random.sample(all_maps, min(num_maps, len(all_maps)))
-
-        # Clear current rotation
-        self.map_rotation.clear()
-        self.rotation_listbox.delete(*self.rotation_listbox.get_children())
-
-        # Add selected maps to rotation
-        for map_name, map_code in selected_maps:
-            self.rotation_listbox.insert("", END, values=(gametype, map_name))
-            self.map_rotation.append((gametype, map_code))
-
-        self.update_map_count()
-        messagebox.showinfo("Success", f"Added {len(selected_maps)} random maps to the rotation.")
+        self.stats_tree.heading("#0", text={"map": "Map", "gametype": "Gametype"}.get(self.stats_by_var.get(),
+                                                                                       "Gametype / Map"))
+        for row in gamelog.summarize(self.log_totals, self.stats_by_var.get()):
+            self.stats_tree.insert("", END, text=row.name,
+                                   values=(row.matches, gamelog.format_duration(row.avg_duration),
+                                           f"{row.avg_players:.1f}", f"{row.early_quit_rate:.0%}"))
+            profiling.count("rows inserted")
 
+    @profiling.traced(category="handler")
+    def randomize_maps(self):
+        import rotationgen
+
+        dialog = ttk.Toplevel(self.master)
+        dialog.title("Randomize Maps")
+        dialog.transient(self.master)
+
+        fields = [
+            ("Number of maps", "count", "20"),
+            ("Gametypes (e.g. war=3, dom=1)", "gametypes", self.gametype_var.get()),
+            ("No repeat within (maps)", "no_repeat", "10"),
+            ("Category quotas (e.g. MWR=2, MW2=1)", "quotas", ""),
+            ("Seed (optional)", "seed", ""),
+        ]
+        entries = {}
+        for i, (label, key, default) in enumerate(fields):
+            ttk.Label(dialog, text=label).grid(row=i, column=0, sticky="e", padx=5, pady=5)
+            entry = ttk.Entry(dialog, width=30)
+            entry.insert(0, default)
+            entry.grid(row=i, column=1, padx=5, pady=5)
+            entries[key] = entry
+
+        match_size_var = ttk.BooleanVar(value=True)
+        ttk.Checkbutton(dialog, text="Match map size to Max Clients", variable=match_size_var).grid(
+            row=len(fields), column=0, columnspan=2, sticky="w", padx=5, pady=5)
+        keep_selected_var = ttk.BooleanVar(value=False)
+        ttk.Checkbutton(dialog, text="Keep selected entries in place", variable=keep_selected_var).grid(
+            row=len(fields) + 1, column=0, columnspan=2, sticky="w", padx=5, pady=5)
+        weight_by_stats_var = ttk.BooleanVar(value=bool(self.log_totals))
+        ttk.Checkbutton(dialog, text="Favor maps players stay on (from Match Stats)", variable=weight_by_stats_var,
+                        state="normal" if self.log_totals else "disabled").grid(
+            row=len(fields) + 2, column=0, columnspan=2, sticky="w", padx=5, pady=5)
+
+        @profiling.traced("ConfigEditor.randomize_maps: Generate", "handler")
+        def generate():
+            try:
+                count = int(entries["count"].get())
+                gametypes = rotationgen.parse_weights(entries["gametypes"].get())
+                no_repeat = int(entries["no_repeat"].get() or 0)
+                quotas = rotationgen.parse_weights(entries["quotas"].get()) or None
+                if count < 1 or not gametypes:
+                    raise ValueError
+            except ValueError:
+                messagebox.showwarning("Invalid Input", "Please enter a number of maps and at least one gametype.", parent=dialog)
+                return
+
+            maxclients = None
+            if match_size_var.get():
+                value = self.config.get("sv_maxclients", "")
+                maxclients = int(value) if str(value).isdigit() else None
+            pinned = {}
+            if keep_selected_var.get():
+                pinned = {index: self.map_rotation[index] for index in self.rotation_listbox.selection()}
+            map_weights = None
+            if weight_by_stats_var.get() and self.log_totals:
+                import gamelog
+                map_weights = gamelog.map_weights(self.log_totals) or None
+
+            def generated(rotation):
+                # Replace the current rotation with the generated one
+                self.map_rotation[:] = rotation
+                messagebox.showinfo("Success", f"Added {len(rotation)} random maps to the rotation.")
+
+            generate_rotation = partial(rotationgen.generate_rotation, self.maps, count, gametypes,
+                                        no_repeat=no_repeat, quotas=quotas, maxclients=maxclients,
+                                        pinned=pinned, seed=entries["seed"].get() or None, map_weights=map_weights)
+            self.tasks.submit(generate_rotation, label="Generating rotation", on_done=generated,
+                              on_error=lambda error: messagebox.showwarning("Invalid Input", str(error)))
+            dialog.destroy()
+
+        button_frame = ttk.Frame(dialog)
+        button_frame.grid(row=len(fields) + 3, column=0, columnspan=2, pady=10)
+        ttk.Button(button_frame, text="Generate", command=generate, style='success.TButton').pack(side=LEFT, padx=5)
+        ttk.Button(button_frame, text="Cancel", command=dialog.destroy).pack(side=LEFT, padx=5)
+        dialog.grab_set()
+
+    def dvar_input_error(self, name, value):
+        error = dvarschema.validate_name(name)
+        if error is None:
+            issue = self.schema.check(name, value)
+            error = issue.message if issue else None
+        if error is not None:
+            messagebox.showwarning("Invalid Input", error)
+        return error
+
+    @profiling.traced(category="handler")
     def add_dvar(self):
         name = self.dvar_name_entry.get().strip()
         value = self.dvar_value_entry.get().strip()
         if name and value:
-            self.dvar_listbox.insert("", END, values=(name, value))
+            if self.dvar_input_error(name, value):
+                return
             self.custom_dvars[name] = value
+            self.dvar_binding.select(name)
             self.dvar_name_entry.delete(0, END)
             self.dvar_value_entry.delete(0, END)
         else:
             messagebox.showwarning("Invalid Input", "Please enter both a name and a value for the DVar.")
 
-    def edit_dvar(self):
-        selected_item = self.dvar_listbox.selection()
-        if selected_item:
-            name, value = self.dvar_listbox.item(selected_item)['values']
+    def on_dvar_select(self, event):
+        selected_keys = self.dvar_binding.selected_keys()
+        if len(selected_keys) == 1:
+            name = selected_keys[0]
             self.dvar_name_entry.delete(0, END)
             self.dvar_name_entry.insert(0, name)
             self.dvar_value_entry.delete(0, END)
-            self.dvar_value_entry.insert(0, value)
-            self.dvar_listbox.delete(selected_item)
-            del self.custom_dvars[name]
+            self.dvar_value_entry.insert(0, self.custom_dvars[name])
+
+    @profiling.traced(category="handler")
+    def edit_dvar(self):
+        selected_keys = self.dvar_binding.selected_keys()
+        if len(selected_keys) == 1:
+            name = self.dvar_name_entry.get().strip()
+            value = self.dvar_value_entry.get().strip()
+            if name and value:
+                if self.dvar_input_error(name, value):
+                    return
+                # Update the selected DVar in place, keeping its position
+                self.custom_dvars.rename(selected_keys[0], name, value)
+                self.dvar_binding.select(name)
+            else:
+                messagebox.showwarning("Invalid Input", "Please enter both a name and a value for the DVar.")
         else:
-            messagebox.showwarning("No Selection", "Please select a DVar to edit.")
+            messagebox.showwarning("No Selection", "Please select a single DVar to edit.")
 
+    @profiling.traced(category="handler")
     def remove_dvar(self):
-        selected_item = self.dvar_listbox.selection()
-        if selected_item:
-            name, _ = self.dvar_listbox.item(selected_item)['values']
-            self.dvar_listbox.delete(selected_item)
-            del self.custom_dvars[name]
+        selected_keys = self.dvar_binding.selected_keys()
+        if selected_keys:
+            for name in selected_keys:
+                del self.custom_dvars[name]
         else:
             messagebox.showwarning("No Selection", "Please select a DVar to remove.")
 
     def generate_default_config(self):
-        default_config = """
-/////////////////////////////////////////////////////////////////////////
-//  Call of duty: Modern Warfare Remastered MP Dedicated Server Config //
-//                              H1-MOD                                 //
-/////////////////////////////////////////////////////////////////////////
-
-set sv_hostname "CHANGE ME - COLORS --->"
-set g_password ""
-set sv_maxclients "18"
-set sv_timeout "20"
-set sv_reconnectlimit "3"
-set g_inactivity "420"
-set sv_kickBanTime "3600"
-seta g_allowVote "1"
-seta g_deadChat "0"
-
-seta sv_privateClients 0
-seta sv_privatePassword ""
-
-set logfile "2"
-set g_logSync "1"
-set g_log "logs\\games_mp.log"
-set rcon_password "CHANGEME"
-set sv_sayName "^7Server^7"
-
-set scr_dm_scorelimit "1500"
-set scr_dm_timelimit "10"
-set scr_dm_playerrespawndelay "0"
-set scr_dm_numlives "0"
-set scr_dm_roundlimit "1"
-set scr_dm_winlimit "1"
-
-set scr_war_scorelimit "7500"
-set scr_war_timelimit "10"
-set scr_war_playerrespawndelay "0"
-set scr_war_waverespawndelay "0"
-set scr_war_numlives "0"
-set scr_war_roundlimit "1"
-set scr_war_winlimit "1"
-
-set scr_conf_scorelimit "7500"
-set scr_conf_timelimit "10"
-set scr_conf_playerrespawndelay "0"
-set scr_conf_waverespawndelay "0"
-set scr_conf_numlives "0"
-set scr_conf_roundlimit "1"
-set scr_conf_winlimit "1"
-
-set scr_dom_scorelimit "200"
-set scr_dom_timelimit "0"
-set scr_dom_playerrespawndelay "0"
-set scr_dom_waverespawndelay "0"
-set scr_dom_numlives "0"
-set scr_dom_roundlimit "1"
-set scr_dom_winlimit "1"
-
-set scr_sd_scorelimit "1"
-set scr_sd_timelimit "2.5"
-set scr_sd_playerrespawndelay "0"
-set scr_sd_waverespawndelay "0"
-set scr_sd_numlives "1"
-set scr_sd_roundlimit "0"
-set scr_sd_winlimit "4"
-set scr_sd_roundswitch "3"
-set scr_sd_bombtimer "45"
-set scr_sd_defusetime "5"
-set scr_sd_multibomb "0"
-set scr_sd_planttime "5"
-
-set scr_sab_scorelimit "0"
-set scr_sab_timelimit "20"
-set scr_sab_bombtimer "30"
-set scr_sab_defusetime "5"
-set scr_sab_hotpotato "0"
-set scr_sab_numlives "0"
-set scr_sab_planttime "2.5"
-set scr_sab_playerrespawndelay "7.5"
-set scr_sab_roundlimit "1"
-set scr_sab_roundswitch "1"
-set scr_sab_waverespawndelay "0"
-
-set g_gametype "dom"
-set sv_maprotation "gametype dom map mp_farm map mp_bog map mp_crash map mp_vacant"
-
-// CUSTOM DVARS H2M CFG EDITOR //
-"""
-        return default_config
+        return cfgcore.DEFAULT_CONFIG
+
+    def collect_config(self):
+        return self.config.to_dict()
 
+    def effective_dvars(self, config):
+        dvars = dict(config)
+        dvars["sv_maprotation"] = cfgcore.generate_map_rotation_string(self.map_rotation)
+        dvars.update(self.custom_dvars)
+        return dvars
+
+    @profiling.traced(category="handler")
     def save_config(self):
-        # Start with the default configuration
-        config_lines = self.generate_default_config().split('\n')
-
-        # Update the configuration with the current settings
-        for i, line in enumerate(config_lines):
-            if line.strip().startswith('set '):
-                parts = line.split(None, 2)
-                if len(parts) >= 2:
-                    key = parts[1]
-                    if key in self.config:
-                        value = self.config[key]
-                        if isinstance(value, ttk.Entry):
-                            value = value.get()
-                        config_lines[i] = f'set {key} "{value}"'
-
-        # Update map rotation
-        rotation_string = self.generate_map_rotation_string()
-        for i, line in enumerate(config_lines):
-            if line.strip().startswith('set sv_maprotation'):
-                config_lines[i] = f'set sv_maprotation "{rotation_string}"'
-                break
-
-        # Add custom DVars
-        custom_dvar_section = ["// CUSTOM DVARS H2M CFG EDITOR //"]
-        for key, value in self.custom_dvars.items():
-            custom_dvar_section.append(f'set {key} "{value}"')
-
-        # Find the custom DVars section and replace it
-        custom_start = -1
-        for i, line in enumerate(config_lines):
-            if line.strip() == "// CUSTOM DVARS H2M CFG EDITOR //":
-                custom_start = i
-                break
-
-        if custom_start != -1:
-            config_lines = config_lines[:custom_start] + custom_dvar_section
-        else:
-            config_lines.extend(custom_dvar_section)
+        config = self.collect_config()
+        dvars = self.effective_dvars(config)
+        saved = self.snapshot()
+        map_rotation = list(self.map_rotation)
+        rotation_size = rotationcodec.encoded_size(dvars["sv_maprotation"])
+        rotation_too_long = rotation_size > rotationcodec.ROTATION_BYTE_BUDGET
+        if rotation_too_long:
+            # The server would play only the start of it; keep the rotation on disk and save everything else
+            map_rotation = list(self.disk_state[2])
+            saved = saved[:2] + (map_rotation,)
+
+        @profiling.traced("save_config")
+        def save():
+            # Validating every custom DVar takes a while on big configs, so it runs here too;
+            # nothing is written when anything is invalid
+            issues = self.schema.validate(dvars)
+            if issues:
+                return issues, None
+            return None, self.includes.save(config, custom_dvars, map_rotation)
+
+        def done(result):
+            issues, result = result
+            if issues:
+                self.show_validation_issues(issues)
+                return
+            result, includes_written = result
+            self.disk_state = saved
+            self.watch_includes()
+            message = cfgsave.describe(result)
+            if includes_written:
+                files = ", ".join(os.path.relpath(path) for path in includes_written)
+                if result.written:
+                    message += f" Also updated: {files}."
+                else:
+                    message = f"Configuration saved successfully! Updated: {files}."
+            if rotation_too_long:
+                messagebox.showwarning(
+                    "Rotation not saved",
+                    f"{message}\n\nThe map rotation was not saved: it takes {rotation_size} bytes, but the server "
+                    f"only reads the first {rotationcodec.ROTATION_BYTE_BUDGET} bytes of sv_maprotation and would "
+                    f"silently drop the rest. Remove some maps and save again.")
+            else:
+                messagebox.showinfo("Success", message)
+
+        # Only the lines that changed are rewritten, each in the file that sets the DVar,
+        # and nothing is written if nothing changed
+        custom_dvars = dict(self.custom_dvars)
+        self.tasks.submit(save, label="Saving server.cfg", on_done=done,
+                          on_error=lambda error: messagebox.showerror("Error", f"Could not save server.cfg: {error}"))
+
+    @profiling.traced(category="handler")
+    def apply_live(self):
+        import rcon
 
-        # Write the new configuration to file
-        with open("server.cfg", "w") as f:
-            f.write('\n'.join(config_lines))
+        dvars = self.effective_dvars(self.collect_config())
+        applied_dvars = dict(self.applied_dvars)
 
-        messagebox.showinfo("Success", "Configuration saved successfully!")
+        def diff():
+            issues = self.schema.validate(dvars)
+            if issues:
+                return issues, None
+            # Sent in this order, so a new rcon_password only takes effect after everything else
+            return None, rcon.password_last(rcon.diff_dvars(applied_dvars, dvars))
+
+        self.tasks.submit(diff, label="Checking DVars", on_done=self.confirm_apply_live)
+
+    def confirm_apply_live(self, result):
+        import rcon
+
+        issues, changes = result
+        if issues:
+            self.show_validation_issues(issues)
+            return
+        if not changes:
+            messagebox.showinfo("Apply Live", "No DVar changes to apply.")
+            return
+
+        address = simpledialog.askstring("Apply Live", f"Push {len(changes)} changed DVar(s) over RCON to (host:port):",
+                                         initialvalue=self.live_address)
+        if not address:
+            return
+        host, _, port = address.strip().rpartition(":")
+        if not host or not port.isdigit():
+            messagebox.showwarning("Invalid Input", "Please enter the server address as host:port.")
+            return
+        self.live_address = address.strip()
+        # The server still expects the password it was last given, not one typed since
+        target = rcon.Target(self.live_address, host, int(port), self.applied_dvars.get("rcon_password", ""))
+
+        def applied(reports):
+            report = reports[0]
+            for key, result in zip(changes, report.results):
+                if result.ok:
+                    self.applied_dvars[key] = changes[key]
+            show = messagebox.showinfo if all(result.ok for result in report.results) else messagebox.showwarning
+            show("Apply Live", rcon.format_report(reports))
+
+        self.tasks.submit(rcon.apply_changes_sync, [target], changes, label=f"Applying to {target.name}",
+                          on_done=applied, on_error=lambda error: messagebox.showerror("Apply Live", str(error)))
+
+    @profiling.traced(category="handler")
+    def show_history(self):
+        import history
+
+        dialog = ttk.Toplevel(self.master)
+        dialog.title("server.cfg History")
+        dialog.transient(self.master)
+        dialog.geometry("700x400")
+
+        list_frame = ttk.Frame(dialog)
+        list_frame.pack(fill=BOTH, expand=True, padx=10, pady=10)
+        columns = ("Version", "Saved", "Size", "Changes")
+        history_listbox = ttk.Treeview(list_frame, columns=columns, show="headings", selectmode="browse")
+        for column in columns:
+            history_listbox.heading(column, text=column)
+            history_listbox.column(column, width=80, stretch=column == "Changes")
+        history_listbox.pack(side=LEFT, fill=BOTH, expand=True)
+        scrollbar = ttk.Scrollbar(list_frame, orient=VERTICAL, command=history_listbox.yview)
+        scrollbar.pack(side=RIGHT, fill=Y)
+        history_listbox.configure(yscrollcommand=scrollbar.set)
+
+        def list_snapshots():
+            with history.HistoryStore.for_path("server.cfg") as store:
+                return store.snapshots("server.cfg", limit=500)
+
+        def show_snapshots(snapshots):
+            if not dialog.winfo_exists():
+                return
+            for snapshot in snapshots:
+                saved = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(snapshot.created))
+                history_listbox.insert("", END, iid=str(snapshot.id), values=(
+                    f"#{snapshot.id}", saved, f"{snapshot.size} B", history.describe_changes(snapshot.changes)))
+                profiling.count("rows inserted")
+            if not snapshots:
+                history_listbox.insert("", END, values=("", "", "", "No saved versions yet"))
+
+        def selected_id():
+            selection = history_listbox.selection()
+            if not selection or not selection[0].isdigit():
+                messagebox.showwarning("No Selection", "Please select a version.", parent=dialog)
+                return None
+            return int(selection[0])
+
+        @profiling.traced("ConfigEditor.show_history: Compare", "handler")
+        def show_diff():
+            snapshot_id = selected_id()
+            if snapshot_id is None:
+                return
+
+            def diff():
+                with history.HistoryStore.for_path("server.cfg") as store:
+                    return store.diff(snapshot_id)
+
+            def show(text):
+                window = ttk.Toplevel(dialog)
+                window.title(f"Changes since version #{snapshot_id}")
+                text_widget = ttk.Text(window, wrap="none", width=100, height=30)
+                text_widget.insert("1.0", text or "The current server.cfg is identical to this version.")
+                text_widget.configure(state="disabled")
+                text_widget.pack(fill=BOTH, expand=True)
+
+            self.tasks.submit(diff, label="Comparing versions", on_done=show,
+                              on_error=lambda error: messagebox.showerror("History", str(error), parent=dialog))
+
+        @profiling.traced("ConfigEditor.show_history: Restore", "handler")
+        def restore():
+            snapshot_id = selected_id()
+            if snapshot_id is None:
+                return
+            if not messagebox.askyesno("Restore", f"Replace server.cfg with version #{snapshot_id}?", parent=dialog):
+                return
+
+            def restore_snapshot():
+                with history.HistoryStore.for_path("server.cfg") as store:
+                    return store.restore(snapshot_id)
+
+            # The file watcher merges the restored file into the editor like any other external edit
+            self.tasks.submit(restore_snapshot, label=f"Restoring version #{snapshot_id}",
+                              on_done=lambda path: dialog.destroy(),
+                              on_error=lambda error: messagebox.showerror("History", str(error), parent=dialog))
+
+        button_frame = ttk.Frame(dialog)
+        button_frame.pack(fill=X, padx=10, pady=(0, 10))
+        ttk.Button(button_frame, text="Compare with Current", command=show_diff).pack(side=LEFT, padx=5)
+        ttk.Button(button_frame, text="Restore", command=restore, style='warning.TButton').pack(side=LEFT, padx=5)
+        ttk.Button(button_frame, text="Close", command=dialog.destroy).pack(side=RIGHT, padx=5)
+
+        self.tasks.submit(list_snapshots, label="Loading history", on_done=show_snapshots,
+                          on_error=lambda error: messagebox.showerror("History", str(error), parent=dialog))
 
     def generate_map_rotation_string(self):
-        rotation_parts = []
-        current_gametype = None
-        for gametype, map_code in self.map_rotation:
-            if gametype != current_gametype:
-                rotation_parts.extend(["gametype", gametype])
-                current_gametype = gametype
-            rotation_parts.extend(["map", map_code])
-        return " ".join(rotation_parts)
+        return cfgcore.generate_map_rotation_string(self.map_rotation)
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="COD:MWR Server Config Editor")
+    parser.add_argument("--fleet", metavar="MANIFEST", help="fleet manifest (JSON) to monitor in a Fleet Status tab")
+    parser.add_argument("--profile", nargs="?", const=profiling.DEFAULT_TRACE_PATH, metavar="TRACE",
+                        help=f"time editor operations and write a Chrome trace on exit (default: {profiling.DEFAULT_TRACE_PATH}); "
+                             f"same as setting {profiling.ENV_VAR}")
+    args = parser.parse_args()
+
+    if args.profile:
+        profiling.enable(args.profile)
+    else:
+        profiling.enable_from_env()
+
+    fleet_manifest = None
+    if args.fleet:
+        import fleet
+        fleet_manifest = fleet.load_manifest(args.fleet)
+
     root = ttk.Window(themename="darkly")
-    app = ConfigEditor(root)
+    app = ConfigEditor(root, fleet_manifest)
     root.mainloop()
\ No newline at end of file
@@ -0,0 +1,212 @@
+"""Asynchronous getstatus/getinfo poller with a TTL cache of server state."""
+import argparse
+import asyncio
+import sys
+import threading
+import time
+from collections import namedtuple
+
+import cfgmodel
+import fleet
+import rcon
+
+ServerState = namedtuple("ServerState", "target dvars players mapname gametype clients maxclients ping polled_at error")
+
+# Dvars that only describe the query itself, never compared for drift
+QUERY_ONLY = frozenset(("challenge", "clients", "protocol", "mapname", "gamename", "shortversion", "hc", "pswrd"))
+
+
+def parse_infostring(text):
+    parts = text.split("\\")
+    if parts and parts[0] == "":
+        parts = parts[1:]
+    return dict(zip(parts[0::2], parts[1::2]))
+
+
+def parse_status(data):
+    """Parse a statusResponse/infoResponse packet into (kind, dvars, players)."""
+    kind, body = rcon.parse_response(data)
+    lines = body.split("\n")
+    dvars = parse_infostring(lines[0]) if lines else {}
+    players = []
+    for line in lines[1:]:
+        fields = line.split(" ", 2)
+        if len(fields) == 3 and fields[0].lstrip("-").isdigit():
+            name = fields[2]
+            if len(name) >= 2 and name[0] == name[-1] == '"':
+                name = name[1:-1]
+            players.append((int(fields[0]), int(fields[1]) if fields[1].lstrip("-").isdigit() else 0, name))
+    return kind, dvars, players
+
+
+def parse_count(value, default=0):
+    """An integer dvar such as clients or sv_maxclients, or default if the server sent something else."""
+    if value is not None and value.strip().lstrip("-").isdigit():
+        return int(value)
+    return default
+
+
+def error_state(target, error):
+    return ServerState(target, {}, [], None, None, 0, 0, None, time.time(), str(error))
+
+
+def drift(state, local_dvars):
+    """Return {dvar: (local value, running value)} for dvars the server reports differently."""
+    if state is None or state.error:
+        return {}
+    return {key: (local_dvars[key], value) for key, value in state.dvars.items()
+            if key not in QUERY_ONLY and key in local_dvars and local_dvars[key] != value}
+
+
+async def query_server(target, timeout=1.0, retries=1):
+    start = time.perf_counter()
+    try:
+        async with rcon.UdpClient(target.host, target.port, timeout=timeout, retries=retries, interval=0) as client:
+            data, _ = await client.request(rcon.OOB + b"getstatus\n")
+            ping = time.perf_counter() - start
+            kind, dvars, players = parse_status(data)
+            if kind != "statusResponse":
+                raise rcon.RconError(f"Unexpected response: {kind}")
+            if "clients" not in dvars:
+                # getinfo carries the client count some servers leave out of getstatus
+                try:
+                    info_data, _ = await client.request(rcon.OOB + b"getinfo xxx\n")
+                    _, info, _ = parse_status(info_data)
+                    dvars = {**info, **dvars}
+                except rcon.RconError:
+                    pass
+    except (OSError, rcon.RconError) as e:
+        return error_state(target, e)
+
+    # Whatever a misbehaving server puts here must not stop the poll
+    clients = parse_count(dvars.get("clients"), len(players))
+    maxclients = parse_count(dvars.get("sv_maxclients"))
+    return ServerState(target, dvars, players, dvars.get("mapname"), dvars.get("g_gametype"),
+                       clients, maxclients, ping, time.time(), None)
+
+
+class StatusCache:
+    """Latest ServerState per server name; entries older than ttl seconds count as stale."""
+
+    def __init__(self, ttl=10.0):
+        self.ttl = ttl
+        self.states = {}
+        self.lock = threading.Lock()
+
+    def put(self, state):
+        with self.lock:
+            self.states[state.target.name] = state
+
+    def get(self, name, allow_stale=False):
+        with self.lock:
+            state = self.states.get(name)
+        if state is None or (not allow_stale and time.time() - state.polled_at > self.ttl):
+            return None
+        return state
+
+    def snapshot(self):
+        with self.lock:
+            return dict(self.states)
+
+    def is_fresh(self, state):
+        return time.time() - state.polled_at <= self.ttl
+
+
+class StatusPoller:
+    def __init__(self, targets, interval=5.0, ttl=None, timeout=1.0, retries=1, concurrency=256):
+        self.targets = list(targets)
+        self.interval = interval
+        self.cache = StatusCache(ttl if ttl is not None else interval * 3)
+        self.timeout = timeout
+        self.retries = retries
+        self.concurrency = concurrency
+        self._thread = None
+        self._loop = None
+        self._stop = None
+
+    async def poll_once(self):
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def run(target):
+            async with semaphore:
+                try:
+                    state = await query_server(target, self.timeout, self.retries)
+                except Exception as e:
+                    # One broken server must not end the polling of every other one
+                    state = error_state(target, e)
+            self.cache.put(state)
+            return state
+
+        return await asyncio.gather(*(run(target) for target in self.targets))
+
+    async def run(self):
+        self._stop = asyncio.Event()
+        while not self._stop.is_set():
+            await self.poll_once()
+            try:
+                await asyncio.wait_for(self._stop.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self):
+        """Poll in a background thread with its own event loop, leaving the caller's thread free."""
+        if self._thread is not None:
+            return
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_until_complete, args=(self.run(),), daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        if self._stop is not None:
+            self._loop.call_soon_threadsafe(self._stop.set)
+        self._thread.join(self.timeout * (self.retries + 1) + 1)
+        if not self._thread.is_alive():
+            self._loop.close()
+            self._loop = None
+        self._thread = None
+
+
+def format_table(states, local_dvars=None):
+    lines = [f"{'Server':20} {'Map':16} {'Gametype':8} {'Players':>7} {'Ping':>6}  Drift"]
+    for state in states:
+        if state.error:
+            lines.append(f"{state.target.name:20} {'-':16} {'-':8} {'-':>7} {'-':>6}  {state.error}")
+            continue
+        changes = drift(state, local_dvars.get(state.target.name, {})) if local_dvars else {}
+        drift_text = ", ".join(f"{key}={running!r} (cfg {local!r})" for key, (local, running) in changes.items())
+        lines.append(f"{state.target.name:20} {state.mapname or '-':16} {state.gametype or '-':8} "
+                     f"{state.clients:>3}/{state.maxclients:<3} {state.ping * 1000:>4.0f}ms  {drift_text or '-'}")
+    return "\n".join(lines)
+
+
+def local_dvars_from_manifest(manifest):
+    local = {}
+    for server, config, custom_dvars, map_rotation in fleet.server_configs(manifest):
+        # One compact record per server, so large fleets stay cheap to keep resident
+        local[server["name"]] = cfgmodel.ServerConfig({**config, **custom_dvars})
+    return local
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Show the live status of every server in a fleet.")
+    parser.add_argument("manifest", help="fleet manifest (JSON) listing the servers")
+    parser.add_argument("--watch", type=float, default=0, metavar="SECONDS", help="keep polling at this interval")
+    parser.add_argument("--timeout", type=float, default=1.0)
+    args = parser.parse_args(argv)
+
+    manifest = fleet.load_manifest(args.manifest)
+    targets = rcon.targets_from_manifest(manifest)
+    local = local_dvars_from_manifest(manifest)
+    poller = StatusPoller(targets, interval=args.watch or 5.0, timeout=args.timeout)
+    while True:
+        states = asyncio.run(poller.poll_once())
+        print(format_table(states, local))
+        if not args.watch:
+            return 0 if all(state.error is None for state in states) else 1
+        time.sleep(args.watch)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
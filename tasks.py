@@ -0,0 +1,164 @@
+"""Run slow work off the Tk mainloop and hand the results back through after()."""
+import queue
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import profiling
+
+
+class Cancelled(Exception):
+    pass
+
+
+class TaskContext:
+    """Passed to thread tasks so they can report progress and notice cancellation."""
+
+    def __init__(self, runner, task):
+        self._runner = runner
+        self._task = task
+
+    @property
+    def cancelled(self):
+        return self._task.cancel_event.is_set()
+
+    def check(self):
+        if self.cancelled:
+            raise Cancelled()
+
+    def progress(self, fraction=None, message=None):
+        self.check()
+        self._runner._post(self._runner._on_progress, self._task, fraction, message)
+
+
+class Task:
+    def __init__(self, label, on_done, on_error, on_progress):
+        self.label = label
+        self.on_done = on_done
+        self.on_error = on_error
+        self.on_progress = on_progress
+        self.cancel_event = threading.Event()
+        self.future = None
+        self.fraction = None
+        self.message = None
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def cancel(self):
+        self.cancel_event.set()
+        if self.future is not None:
+            self.future.cancel()
+
+
+class TaskRunner:
+    """Submits callables to a thread (or process) pool and calls back on the Tk thread.
+
+    With with_context=True a thread task receives a TaskContext as its first
+    argument, for progress and cooperative cancellation; other tasks only
+    get their own arguments and cancelling them discards the result. Callbacks
+    (on_done(result), on_error(exception), on_progress(fraction, message)) and
+    on_change(tasks) always run on the Tk thread.
+    """
+
+    def __init__(self, master, max_workers=4, poll_ms=25, on_change=None):
+        self.master = master
+        self.poll_ms = poll_ms
+        self.on_change = on_change
+        self.threads = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="servcfg")
+        self.processes = None
+        self.tasks = []
+        self._messages = queue.SimpleQueue()
+        self._polling = False
+
+    def submit(self, fn, *args, label="", on_done=None, on_error=None, on_progress=None, process=False,
+               with_context=False):
+        task = Task(label, on_done, on_error, on_progress)
+        if process:
+            if self.processes is None:
+                # Imported on first use; multiprocessing is slow to import and most sessions never need it
+                from concurrent.futures import ProcessPoolExecutor
+                self.processes = ProcessPoolExecutor()
+            task.future = self.processes.submit(fn, *args)
+        else:
+            task.future = self.threads.submit(self._run, fn, task, args, with_context)
+        task.future.add_done_callback(lambda future: self._post(self._finish, task))
+        self.tasks.append(task)
+        self._changed()
+        self._schedule()
+        return task
+
+    def _run(self, fn, task, args, with_context):
+        if task.cancelled:
+            raise Cancelled()
+        with profiling.span(task.label or getattr(fn, "__name__", "task"), "task"):
+            if with_context:
+                return fn(TaskContext(self, task), *args)
+            return fn(*args)
+
+    def cancel_all(self):
+        for task in list(self.tasks):
+            task.cancel()
+
+    def shutdown(self):
+        self.cancel_all()
+        self.threads.shutdown(wait=False, cancel_futures=True)
+        if self.processes is not None:
+            self.processes.shutdown(wait=False, cancel_futures=True)
+
+    def _post(self, callback, *args):
+        self._messages.put((callback, args))
+
+    def _schedule(self):
+        if not self._polling:
+            self._polling = True
+            self.master.after(self.poll_ms, self._pump)
+
+    def _pump(self):
+        while True:
+            try:
+                callback, args = self._messages.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                callback(*args)
+            except Exception:
+                # Keep pumping; one failing callback must not stall every other task
+                self.master.report_callback_exception(*sys.exc_info())
+        if self.tasks:
+            self.master.after(self.poll_ms, self._pump)
+        else:
+            self._polling = False
+
+    def _on_progress(self, task, fraction, message):
+        if task.cancelled or task not in self.tasks:
+            return
+        task.fraction = fraction
+        task.message = message
+        if task.on_progress:
+            task.on_progress(fraction, message)
+        self._changed()
+
+    def _finish(self, task):
+        self.tasks.remove(task)
+        self._changed()
+        future = task.future
+        if task.cancelled or future.cancelled():
+            return
+        error = future.exception()
+        if isinstance(error, Cancelled):
+            return
+        if error is not None:
+            if task.on_error:
+                with profiling.span(f"{task.label}: error", "callback"):
+                    task.on_error(error)
+            else:
+                raise error
+        elif task.on_done:
+            with profiling.span(f"{task.label}: done", "callback"):
+                task.on_done(future.result())
+
+    def _changed(self):
+        if self.on_change:
+            self.on_change(list(self.tasks))
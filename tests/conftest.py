@@ -0,0 +1,13 @@
+import os
+import sys
+
+import pytest
+
+# The modules live at the top of the repository rather than in a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(autouse=True)
+def no_parse_cache(monkeypatch):
+    # Never read or fill the user's parse cache from a test
+    monkeypatch.setenv("SERVCFG_CACHE_DIR", "")
@@ -0,0 +1,55 @@
+import os
+
+import cfgcache
+import cfgcore
+import cfginclude
+
+CONFIG = cfgcore.render_config(cfgcore.default_config(), {"my_dvar": "1"}, [("war", "mp_crash"), ("dom", "mp_bog")])
+MAPS = "MWR MAP SHORT NAMES ROTATION LIST\n\nCrash - mp_crash\nBog - mp_bog\n"
+
+
+def old_mtime(path):
+    # Files modified just now are always hashed again, see RACY_NS
+    os.utime(path, ns=(1_000_000_000, 1_000_000_000))
+
+
+def test_cached_models_equal_fresh_parses(tmp_path):
+    cache = cfgcache.ParseCache(str(tmp_path / "cache"))
+    cfg = tmp_path / "server.cfg"
+    cfg.write_text(CONFIG)
+    maps = tmp_path / "maps.txt"
+    maps.write_text(MAPS)
+    old_mtime(cfg)
+    old_mtime(maps)
+
+    for _ in range(2):
+        assert cfgcache.load_config(str(cfg), cache=cache) == cfgcore.parse_config(CONFIG)
+        catalog = cfgcache.load_maps(str(maps), cache=cache)
+        assert catalog.to_dict() == {"MWR": [("Crash", "mp_crash"), ("Bog", "mp_bog")]}
+        statements = cache.load(str(cfg), "statements", cfginclude.parse_statements,
+                                from_data=cfginclude._statements_from_data)
+        assert statements == cfginclude.parse_statements(CONFIG.encode())
+    assert (cache.hits, cache.misses) == (3, 3)
+
+
+def test_entries_are_plain_json(tmp_path):
+    cache = cfgcache.ParseCache(str(tmp_path / "cache"))
+    maps = tmp_path / "maps.txt"
+    maps.write_text(MAPS)
+    cfgcache.load_maps(str(maps), cache=cache)
+    entry, = (tmp_path / "cache").iterdir()
+    assert entry.name.endswith(".json")
+    assert b"mp_crash" in entry.read_bytes()
+
+
+def test_corrupt_entries_are_parsed_again(tmp_path):
+    cache = cfgcache.ParseCache(str(tmp_path / "cache"))
+    maps = tmp_path / "maps.txt"
+    maps.write_text(MAPS)
+    old_mtime(maps)
+    cfgcache.load_maps(str(maps), cache=cache)
+    entry, = (tmp_path / "cache").iterdir()
+    header = entry.read_text().split("\n")[0]
+    for junk in ("", "not json", header + "\n{\"x\": 1}", header + "\n[1, 2"):
+        entry.write_text(junk)
+        assert cfgcache.load_maps(str(maps), cache=cache).name_for("mp_crash") == "Crash"
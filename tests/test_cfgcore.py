@@ -0,0 +1,55 @@
+import cfgcore
+
+
+def test_rotation_string_round_trip():
+    rotation = [("war", "mp_crash"), ("war", "mp_bog"), ("dom", "mp_farm")]
+    string = cfgcore.generate_map_rotation_string(rotation)
+    assert string == "gametype war map mp_crash map mp_bog gametype dom map mp_farm"
+    assert cfgcore.parse_map_rotation(string) == rotation
+
+
+def test_parse_config_splits_custom_dvars():
+    text = cfgcore.render_config(cfgcore.default_config(), {"my_dvar": "x"}, [("war", "mp_crash")])
+    config, custom_dvars, rotation = cfgcore.parse_config(text)
+    assert custom_dvars == {"my_dvar": "x"}
+    assert rotation == [("war", "mp_crash")]
+    assert "my_dvar" not in config
+
+
+def test_render_quotes_values_with_quotes():
+    config = dict(cfgcore.default_config(), sv_motd='hi "there"')
+    text = cfgcore.render_config(config, {"my_dvar": 'a "b"'}, [("war", "mp_crash")])
+    assert 'set sv_motd "hi \\"there\\""' in text.split("\n")
+    parsed, custom_dvars, _ = cfgcore.parse_config(text)
+    assert parsed["sv_motd"] == 'hi "there"'
+    assert custom_dvars == {"my_dvar": 'a "b"'}
+
+
+
+def test_merge_takes_changes_made_only_on_disk():
+    base = {"a": "1", "b": "1", "c": "1"}
+    mine = {"a": "2", "b": "1", "c": "1"}
+    theirs = {"a": "1", "b": "3", "d": "4"}
+    merged, applied, conflicts = cfgcore.merge_dvars(base, mine, theirs)
+    assert merged == {"a": "2", "b": "3", "d": "4"}
+    assert sorted(applied) == ["b", "c", "d"]
+    assert conflicts == {}
+
+
+def test_merge_keeps_mine_on_conflict():
+    base = {"a": "1"}
+    merged, applied, conflicts = cfgcore.merge_dvars(base, {"a": "2"}, {"a": "3"})
+    assert merged == {"a": "2"}
+    assert applied == []
+    assert conflicts == {"a": ("2", "3")}
+
+
+def test_merge_same_change_on_both_sides_is_no_conflict():
+    merged, applied, conflicts = cfgcore.merge_dvars({"a": "1"}, {"a": "2"}, {"a": "2"})
+    assert (merged, applied, conflicts) == ({"a": "2"}, [], {})
+
+
+def test_merge_deleted_here_and_changed_there_conflicts():
+    merged, applied, conflicts = cfgcore.merge_dvars({"a": "1"}, {}, {"a": "2"})
+    assert conflicts == {"a": (None, "2")}
+    assert merged == {}
@@ -0,0 +1,53 @@
+import random
+
+import cfgparse
+
+
+def test_simple_assignments():
+    text = 'set sv_hostname "My Server" // name\nseta g_gametype war\n'
+    dvars = [record for record in cfgparse.parse_text(text) if record.kind == "dvar"]
+    assert [(record.command, record.key, record.value, record.lineno) for record in dvars] == [
+        ("set", "sv_hostname", "My Server", 1), ("seta", "g_gametype", "war", 2)]
+    assert dvars[0].comment == " name"
+
+
+def test_statements_exec_and_comments():
+    line = 'set a "1"; exec other.cfg; set b "x;y" // trailing'
+    records = list(cfgparse.tokenize([line]))
+    assert [record.kind for record in records] == ["dvar", "exec", "dvar"]
+    assert records[1].key == "other.cfg"
+    assert records[2].value == "x;y"
+    comment, = cfgparse.tokenize(["  // just a comment"])
+    assert comment.kind == "comment"
+
+
+def test_escaped_quotes_round_trip():
+    value = 'say "hi" there'
+    record, = cfgparse.tokenize([f"set msg {cfgparse.quote(value)}"])
+    assert record.value == value
+
+
+def test_every_line_is_kept():
+    lines = ["// header", "", "set a 1", "unknowncommand foo", "seta b \"2\"; set c 3", "set", "exec x"]
+    records = list(cfgparse.tokenize(lines))
+    assert {record.lineno for record in records} == set(range(1, len(lines) + 1))
+    for record in records:
+        assert record.raw == lines[record.lineno - 1]
+
+
+def test_value_span_replacement_round_trip():
+    rng = random.Random(1)
+    alphabet = "abcXYZ019 _-^;/\""
+    for _ in range(500):
+        key = "dvar_" + "".join(rng.choice("abc") for _ in range(3))
+        value = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 12)))
+        new_value = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 12)))
+        line = f"set {key} {cfgparse.quote(value)} // keep"
+        record, = [record for record in cfgparse.tokenize([line]) if record.kind == "dvar"]
+        assert (record.key, record.value) == (key, value)
+        # Replacing the value span is how saves edit a line in place
+        start, end = record.value_span
+        edited = line[:start] + cfgparse.quote(new_value) + line[end:]
+        edited_record, = [record for record in cfgparse.tokenize([edited]) if record.kind == "dvar"]
+        assert (edited_record.key, edited_record.value) == (key, new_value)
+        assert edited.endswith(" // keep")
@@ -0,0 +1,68 @@
+import difflib
+import os
+
+import cfgcore
+import cfgsave
+
+ORIGINAL = cfgcore.DEFAULT_CONFIG.replace(
+    'set sv_hostname', '// edited by hand\nset sv_hostname') + 'set mod_setting "1" // ours\n'
+
+
+def changed_lines(before, after):
+    return [line for line in difflib.ndiff(before.split("\n"), after.split("\n")) if line[:1] in "+-"]
+
+
+def test_unchanged_model_plans_no_edits():
+    config, custom_dvars, rotation = cfgcore.parse_config(ORIGINAL)
+    text, changed, added, removed = cfgsave.plan_save(ORIGINAL, config, custom_dvars, rotation)
+    assert text == ORIGINAL
+    assert (changed, added, removed) == ([], [], [])
+
+
+def test_one_change_edits_one_line():
+    config, custom_dvars, rotation = cfgcore.parse_config(ORIGINAL)
+    config["sv_hostname"] = "Renamed"
+    text, changed, added, removed = cfgsave.plan_save(ORIGINAL, config, custom_dvars, rotation)
+    assert [key for key, _, _ in changed] == ["sv_hostname"]
+    assert len(changed_lines(ORIGINAL, text)) == 2
+    assert "// edited by hand" in text
+    assert cfgcore.parse_config(text)[0]["sv_hostname"] == "Renamed"
+
+
+def test_new_and_removed_custom_dvars():
+    config, custom_dvars, rotation = cfgcore.parse_config(ORIGINAL)
+    custom_dvars = dict(custom_dvars, new_dvar="5")
+    text, changed, added, removed = cfgsave.plan_save(ORIGINAL, config, custom_dvars, rotation)
+    assert added == ["new_dvar"]
+    assert cfgcore.parse_config(text)[1]["new_dvar"] == "5"
+    custom_dvars.pop("new_dvar")
+    assert cfgsave.plan_save(text, config, custom_dvars, rotation)[0] == ORIGINAL
+
+
+def test_crlf_is_kept():
+    original = ORIGINAL.replace("\n", "\r\n")
+    config, custom_dvars, rotation = cfgcore.parse_config(original)
+    config["g_password"] = "pw"
+    text = cfgsave.plan_save(original, config, custom_dvars, rotation)[0]
+    assert "\n" not in text.replace("\r\n", "")
+
+
+def test_noop_save_writes_nothing(tmp_path):
+    path = tmp_path / "server.cfg"
+    path.write_bytes(ORIGINAL.encode())
+    mtime = path.stat().st_mtime_ns
+    config, custom_dvars, rotation = cfgcore.parse_config(ORIGINAL)
+    result = cfgsave.save_config(str(path), config, custom_dvars, rotation, record_history=False)
+    assert not result.written
+    assert path.stat().st_mtime_ns == mtime
+    assert path.read_bytes() == ORIGINAL.encode()
+
+
+def test_new_files_follow_the_umask_without_changing_it(tmp_path, monkeypatch):
+    def no_umask(mask):
+        raise AssertionError("atomic_write must not change the process umask")
+
+    monkeypatch.setattr(os, "umask", no_umask)
+    path = tmp_path / "new.cfg"
+    cfgsave.atomic_write(str(path), b"set a 1\n")
+    assert path.stat().st_mode & 0o777 == 0o666 & ~cfgsave._UMASK
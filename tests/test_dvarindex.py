@@ -0,0 +1,66 @@
+import random
+
+from dvarindex import DvarIndex
+from observable import ObservableDict
+
+WORDS = ("scr", "war", "dom", "score", "limit", "time", "sv", "host", "name", "g", "speed", "Bot", "x")
+
+
+def brute_force(model, query, category=None, changed_only=False, category_for=None, default_for=None):
+    query = query.strip().lower()
+    prefixed, others = [], []
+    for key, value in model.items():
+        text = f"{key}\0{value}".lower()
+        if query and query not in text:
+            continue
+        if category is not None and category_for(key) != category:
+            continue
+        if changed_only and default_for(key) is not None and value == default_for(key):
+            continue
+        (prefixed if query and text.startswith(query) else others).append(key)
+    return prefixed + others
+
+
+def random_key(rng):
+    return "_".join(rng.choice(WORDS) for _ in range(rng.randint(1, 3))) + str(rng.randint(0, 50))
+
+
+def test_search_matches_brute_force_while_model_changes():
+    rng = random.Random(4)
+    category_for = lambda key: key.split("_")[0]
+    default_for = lambda key: "1" if key.startswith("scr") else None
+    model = ObservableDict({random_key(rng): str(rng.randint(0, 3)) for _ in range(300)})
+    index = DvarIndex(model, category_for, default_for)
+    queries = ["", "s", "sc", "scr", "scr_w", "score", "limit1", "ar", "_", "bot", "zzz", "0", "war_dom"]
+    for step in range(300):
+        op = rng.random()
+        if op < 0.3:
+            model[random_key(rng)] = str(rng.randint(0, 3))
+        elif op < 0.45 and model:
+            del model[rng.choice(list(model))]
+        elif op < 0.55 and model:
+            old = rng.choice(list(model))
+            new = random_key(rng)
+            if new not in model:
+                model.rename(old, new, "9")
+        elif op < 0.58:
+            model.reset({random_key(rng): "1" for _ in range(50)})
+        elif op < 0.8:
+            # Partly indexed, like while idle callbacks are still filling it in
+            index.index_some(limit=rng.randint(1, 100))
+        query = rng.choice(queries)
+        category = rng.choice((None, "scr", "sv"))
+        changed_only = rng.random() < 0.3
+        assert index.search(query, category, changed_only) == brute_force(
+            model, query, category, changed_only, category_for, default_for), (step, query)
+
+
+def test_typing_a_query_narrows_hits():
+    model = ObservableDict({"scr_war_scorelimit": "100", "scr_dom_scorelimit": "200", "sv_hostname": "war"})
+    index = DvarIndex(model)
+    while index.index_some():
+        pass
+    assert index.search("w") == ["scr_war_scorelimit", "sv_hostname"]
+    assert index.search("wa") == ["scr_war_scorelimit", "sv_hostname"]
+    assert index.search("war_") == ["scr_war_scorelimit"]
+    assert index.search("SCR_") == ["scr_war_scorelimit", "scr_dom_scorelimit"]
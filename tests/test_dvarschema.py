@@ -0,0 +1,20 @@
+import dvarschema
+
+
+def test_stock_dvars_are_checked():
+    registry = dvarschema.default_registry()
+    assert registry.check("sv_maxclients", "18") is None
+    assert registry.check("sv_maxclients", "eighteen") is not None
+    assert registry.check("sv_maxclients", "100") is not None
+    assert registry.check("scr_war_scorelimit", "-1") is not None
+    assert registry.check("g_allowVote", "2") is not None
+
+
+def test_mod_gametypes_are_valid():
+    registry = dvarschema.default_registry()
+    assert registry.validate({"g_gametype": "gungame"}) == []
+    assert registry.check("g_gametype", "war\nmap mp_crash") is not None
+
+
+def test_default_template_is_valid():
+    assert dvarschema.default_registry().validate(dvarschema.cfgcore.default_config()) == []
@@ -0,0 +1,15 @@
+import history
+
+
+def test_record_save_keeps_the_replaced_version(tmp_path):
+    path = str(tmp_path / "server.cfg")
+    snapshot = history.record_save(path, b"set a 1\n", b"set a 2\n")
+    with history.HistoryStore.for_path(path) as store:
+        assert len(store.snapshots(path)) == 2
+    assert snapshot.size == len(b"set a 2\n")
+
+
+def test_record_save_quietly_ignores_a_broken_history(tmp_path):
+    # A directory where the database should be cannot be opened as one
+    (tmp_path / history.HISTORY_FILE).mkdir()
+    assert history.record_save_quietly(str(tmp_path / "server.cfg"), None, b"set a 1\n") is None
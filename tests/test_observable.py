@@ -0,0 +1,68 @@
+import random
+
+from observable import ObservableList
+
+
+def reference_move(items, indices, dest):
+    selected = sorted(set(indices))
+    block = [items[i] for i in selected]
+    rest = [item for i, item in enumerate(items) if i not in selected]
+    dest = max(0, min(len(rest), dest - sum(1 for i in selected if i < dest)))
+    return rest[:dest] + block + rest[dest:]
+
+
+def reference_shift(items, indices, delta):
+    items = list(items)
+    order = sorted(set(indices), reverse=delta > 0)
+    blocked = -1 if delta < 0 else len(items)
+    for i in order:
+        if i + delta == blocked:
+            blocked = i
+            continue
+        items[i], items[i + delta] = items[i + delta], items[i]
+    return items
+
+
+def recorded(items):
+    model = ObservableList(items)
+    events = []
+    model.subscribe(lambda *event: events.append(event))
+    return model, events
+
+
+def test_move_matches_reference():
+    rng = random.Random(2)
+    for _ in range(500):
+        items = list(range(rng.randint(1, 12)))
+        indices = rng.sample(range(len(items)), rng.randint(1, len(items)))
+        dest = rng.randint(0, len(items))
+        model, events = recorded(items)
+        new_indices = model.move(indices, dest)
+        assert list(model) == reference_move(items, indices, dest)
+        assert [model[i] for i in new_indices] == sorted(indices)
+        if list(model) == items:
+            assert events == []
+        else:
+            assert events == [("move", sorted(indices), new_indices)]
+
+
+def test_shift_matches_reference():
+    rng = random.Random(3)
+    for _ in range(500):
+        items = list(range(rng.randint(1, 12)))
+        indices = rng.sample(range(len(items)), rng.randint(1, len(items)))
+        delta = rng.choice((-1, 1))
+        model, events = recorded(items)
+        new_indices = model.shift(indices, delta)
+        assert list(model) == reference_shift(items, indices, delta)
+        assert sorted(model[i] for i in new_indices) == sorted(indices)
+        assert len(events) == (0 if list(model) == items else 1)
+
+
+def test_shift_against_the_edge_does_nothing():
+    model, events = recorded("abcd")
+    assert model.shift([0, 1], -1) == [0, 1]
+    assert list(model) == list("abcd")
+    assert events == []
+    assert model.shift([0, 2], 1) == [1, 3]
+    assert list(model) == list("badc")
@@ -0,0 +1,59 @@
+import asyncio
+
+import rcon
+
+
+def apply(changes, password="secret", **server_options):
+    async def run():
+        server = await rcon.start_fake_server(password="secret", **server_options)
+        host, port = server.address
+        target = rcon.Target("test", host, port, password)
+        try:
+            reports = await rcon.apply_changes([target], changes, timeout=0.2, retries=2, interval=0)
+        finally:
+            server.transport.close()
+        return reports[0], server
+    return asyncio.run(run())
+
+
+def test_apply_changes_sets_dvars():
+    report, server = apply({"sv_hostname": "My Server", "g_gametype": "war"})
+    assert all(result.ok for result in report.results)
+    assert server.dvars == {"sv_hostname": "My Server", "g_gametype": "war"}
+    assert server.commands == ['set sv_hostname "My Server"', 'set g_gametype "war"']
+
+
+def test_dropped_packets_are_retried():
+    report, server = apply({"sv_hostname": "x"}, drop_first=2)
+    result, = report.results
+    assert result.ok
+    assert result.attempts == 3
+    assert server.dvars == {"sv_hostname": "x"}
+
+
+def test_too_many_dropped_packets_fail():
+    report, server = apply({"sv_hostname": "x"}, drop_first=3)
+    result, = report.results
+    assert not result.ok
+    assert "No response" in result.error
+    assert server.dvars == {}
+
+
+def test_bad_password_stops_remaining_commands():
+    report, server = apply({"sv_hostname": "x", "g_gametype": "war", "sv_maxclients": "18"}, password="wrong")
+    assert len(report.results) == 1
+    assert not report.results[0].ok
+    assert "bad rcon" in report.results[0].error.lower()
+    assert server.commands == []
+
+
+def test_diff_dvars_only_returns_changes():
+    running = {"sv_hostname": "a", "g_gametype": "war"}
+    saved = {"sv_hostname": "a", "g_gametype": "dom", "sv_maxclients": "18"}
+    assert rcon.diff_dvars(running, saved) == {"g_gametype": "dom", "sv_maxclients": "18"}
+
+
+def test_changed_password_is_sent_last():
+    report, server = apply({"rcon_password": "new", "sv_hostname": "x", "g_gametype": "war"})
+    assert all(result.ok for result in report.results)
+    assert server.commands == ['set sv_hostname "x"', 'set g_gametype "war"', 'set rcon_password "new"']
@@ -0,0 +1,27 @@
+import random
+
+import pytest
+
+import rotationcodec
+
+GAMETYPES = ("war", "dom", "sd", "dm")
+
+
+def random_rotation(rng, length):
+    return [(rng.choice(GAMETYPES), f"mp_map{rng.randint(0, 40)}") for _ in range(length)]
+
+
+def test_encode_decodes_back():
+    rng = random.Random(5)
+    for _ in range(200):
+        rotation = random_rotation(rng, rng.randint(0, 50))
+        assert rotationcodec.decode_rotation(rotationcodec.encode_rotation(rotation)) == rotation
+        string = rotationcodec.encode_rotation(rotation, "war", compact=True)
+        assert rotationcodec.decode_rotation(string, "war") == rotation
+
+
+def test_check_budget():
+    rotationcodec.check_budget("map mp_crash", budget=12)
+    with pytest.raises(rotationcodec.RotationBudgetError):
+        rotationcodec.check_budget("map mp_crash", budget=11)
+
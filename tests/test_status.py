@@ -0,0 +1,89 @@
+import asyncio
+import threading
+import time
+
+import rcon
+import status
+
+
+def query(**server_options):
+    async def run():
+        server = await rcon.start_fake_server(**server_options)
+        host, port = server.address
+        try:
+            return await status.query_server(rcon.Target("test", host, port, ""), timeout=0.2, retries=1)
+        finally:
+            server.transport.close()
+    return asyncio.run(run())
+
+
+DVARS = {"sv_hostname": "^1Test", "mapname": "mp_crash", "g_gametype": "war", "sv_maxclients": "18",
+         "scr_war_scorelimit": "100"}
+
+
+def test_query_parses_getstatus_and_getinfo():
+    state = query(dvars=DVARS, players=[(10, 50, "alice"), (3, 999, "bob the builder")])
+    assert state.error is None
+    assert state.mapname == "mp_crash"
+    assert state.gametype == "war"
+    assert state.maxclients == 18
+    # getstatus has no client count, so it comes from getinfo
+    assert state.clients == 2
+    assert state.players == [(10, 50, "alice"), (3, 999, "bob the builder")]
+
+
+def test_unreachable_server_reports_error():
+    state = query(drop_first=10)
+    assert state.error
+    assert status.drift(state, DVARS) == {}
+
+
+def test_drift_lists_differing_dvars_only():
+    state = query(dvars=DVARS)
+    local = dict(DVARS, scr_war_scorelimit="75", sv_hostname="^1Test", mapname="mp_bog", not_running="1")
+    # mapname describes the current match, not the config
+    assert status.drift(state, local) == {"scr_war_scorelimit": ("75", "100")}
+
+
+def test_parse_status_reads_quoted_names():
+    data = rcon.OOB + b'statusResponse\n\\sv_hostname\\x\\g_gametype\\dm\n5 20 "a b"\n-1 0 "c"\n'
+    kind, dvars, players = status.parse_status(data)
+    assert kind == "statusResponse"
+    assert dvars == {"sv_hostname": "x", "g_gametype": "dm"}
+    assert players == [(5, 20, "a b"), (-1, 0, "c")]
+
+
+def test_malformed_counts_do_not_fail_the_query():
+    state = query(dvars=dict(DVARS, sv_maxclients="abc"), players=[(1, 20, "alice")])
+    assert state.error is None
+    assert state.maxclients == 0
+    assert state.clients == 1
+
+
+def test_poller_keeps_running_and_closes_its_loop():
+    async def start():
+        return await rcon.start_fake_server(dvars=dict(DVARS, sv_maxclients="abc"))
+
+    loop = asyncio.new_event_loop()
+    server = loop.run_until_complete(start())
+    host, port = server.address
+    server_thread = threading.Thread(target=loop.run_forever, daemon=True)
+    server_thread.start()
+    poller = status.StatusPoller([rcon.Target("test", host, port, "")], interval=0.05, timeout=0.2)
+    try:
+        poller.start()
+        deadline = time.time() + 5
+        while len(poller.cache.snapshot()) < 1 and time.time() < deadline:
+            time.sleep(0.01)
+        first = poller.cache.get("test")
+        time.sleep(0.2)
+        assert poller._thread.is_alive()
+        assert poller.cache.get("test").polled_at > first.polled_at
+        loop_used = poller._loop
+        poller.stop()
+        assert loop_used.is_closed()
+    finally:
+        loop.call_soon_threadsafe(server.transport.close)
+        loop.call_soon_threadsafe(loop.stop)
+        server_thread.join(1)
+        loop.close()
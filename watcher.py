@@ -0,0 +1,276 @@
+"""Watch config files and directories for external edits, with debouncing.
+
+On Linux the watcher uses inotify, so a whole directory of fleet configs costs
+one kernel watch and no polling; elsewhere it falls back to comparing mtimes
+and sizes every poll_interval seconds. Directories are watched rather than the
+files themselves, so editors and deploy scripts that replace a file by
+renaming a new one over it are still noticed.
+"""
+import argparse
+import fnmatch
+import os
+import queue
+import select
+import struct
+import sys
+import threading
+import time
+
+DEFAULT_PATTERNS = ("*.cfg", "*.txt", "*.json")
+
+# inotify(7) constants
+IN_ATTRIB = 0x004
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_FROM = 0x040
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_MOVED_FROM | IN_CREATE | IN_DELETE | IN_ATTRIB
+_EVENT = struct.Struct("iIII")
+
+
+class _InotifyBackend:
+    name = "inotify"
+
+    def __init__(self, directories):
+        import ctypes
+
+        # The interpreter is already linked against libc, so no library lookup is needed
+        self._libc = ctypes.CDLL(None, use_errno=True)
+        self.fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.directories = {}
+        try:
+            for directory in directories:
+                self.add(directory)
+        except OSError:
+            os.close(self.fd)
+            raise
+        self._wakeup = os.pipe()
+
+    def add(self, directory):
+        import ctypes
+
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"Cannot watch {directory}")
+        self.directories[wd] = directory
+
+    def wait(self, timeout):
+        """Return the paths touched within timeout seconds (empty when woken up or timed out)."""
+        ready, _, _ = select.select([self.fd, self._wakeup[0]], [], [], timeout)
+        if self.fd not in ready:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        paths = []
+        offset = 0
+        while offset + _EVENT.size <= len(data):
+            wd, mask, _, length = _EVENT.unpack_from(data, offset)
+            offset += _EVENT.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+            directory = self.directories.get(wd)
+            if directory is not None and name:
+                paths.append(os.path.join(directory, os.fsdecode(name)))
+        return paths
+
+    def wakeup(self):
+        os.write(self._wakeup[1], b"x")
+
+    def close(self):
+        for fd in (self.fd, *self._wakeup):
+            os.close(fd)
+
+
+class _PollingBackend:
+    name = "polling"
+
+    def __init__(self, directories, interval=1.0):
+        self.directories = list(directories)
+        self.interval = interval
+        self.state = self._scan(self.directories)
+        self._woken = threading.Event()
+        self._lock = threading.Lock()
+
+    def add(self, directory):
+        # Files already there are the starting state, not changes
+        state = self._scan([directory])
+        with self._lock:
+            self.directories.append(directory)
+            self.state.update(state)
+
+    def _scan(self, directories):
+        state = {}
+        for directory in directories:
+            try:
+                with os.scandir(directory) as it:
+                    for entry in it:
+                        try:
+                            st = entry.stat()
+                        except OSError:
+                            continue
+                        state[entry.path] = (st.st_mtime_ns, st.st_size)
+            except OSError:
+                continue
+        return state
+
+    def wait(self, timeout):
+        if self._woken.wait(min(timeout, self.interval)):
+            return []
+        with self._lock:
+            state = self._scan(self.directories)
+            previous, self.state = self.state, state
+        return [path for path in state.keys() | previous.keys() if state.get(path) != previous.get(path)]
+
+    def wakeup(self):
+        self._woken.set()
+
+    def close(self):
+        pass
+
+
+class Watcher:
+    """Reports files under the watched paths that changed, once writes to them have settled.
+
+    paths are files or directories. A file is matched by its own name; in a
+    watched directory every file matching one of patterns counts. A burst of
+    writes to a file is reported once, after debounce seconds without another
+    write. Changed paths are queued for changes() and, if given, passed to
+    on_change(paths) on the watcher thread.
+    """
+
+    def __init__(self, paths, patterns=DEFAULT_PATTERNS, debounce=0.3, poll_interval=1.0, on_change=None,
+                 backend=None):
+        self.patterns = tuple(patterns)
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.on_change = on_change
+        self.backend_name = backend
+        self.files = set()
+        self.directories = set()
+        self.backend = None
+        self.add(paths)
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._stop = threading.Event()
+
+    def matches(self, path):
+        if path in self.files:
+            return True
+        return (os.path.dirname(path) in self.directories
+                and any(fnmatch.fnmatch(os.path.basename(path), pattern) for pattern in self.patterns))
+
+    def _watched_directories(self):
+        directories = self.directories | {os.path.dirname(path) for path in self.files}
+        return {directory for directory in directories if os.path.isdir(directory)}
+
+    def add(self, paths):
+        """Watch more files or directories, also while running; paths already watched are ignored."""
+        before = self._watched_directories() if self.backend is not None else set()
+        for path in paths:
+            path = os.path.abspath(path)
+            if os.path.isdir(path):
+                self.directories.add(path)
+            else:
+                self.files.add(path)
+        if self.backend is not None and self._thread is not None:
+            for directory in self._watched_directories() - before:
+                try:
+                    self.backend.add(directory)
+                except OSError:
+                    # e.g. out of inotify watches; that directory's changes go unnoticed
+                    pass
+
+    def _make_backend(self):
+        directories = list(self._watched_directories())
+        if self.backend_name != "polling" and sys.platform.startswith("linux"):
+            try:
+                return _InotifyBackend(directories)
+            except (OSError, AttributeError):
+                if self.backend_name == "inotify":
+                    raise
+        return _PollingBackend(directories, self.poll_interval)
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self.backend = self._make_backend()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="servcfg-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self.backend.wakeup()
+        self._thread.join()
+        self._thread = None
+        self.backend.close()
+
+    def _run(self):
+        pending = {}
+        while True:
+            if pending:
+                timeout = max(0.0, min(pending.values()) + self.debounce - time.monotonic())
+            else:
+                timeout = self.poll_interval
+            paths = self.backend.wait(timeout)
+            if self._stop.is_set():
+                return
+            now = time.monotonic()
+            for path in paths:
+                if self.matches(path):
+                    pending[path] = now
+            settled = sorted(path for path, last in pending.items() if now - last >= self.debounce)
+            if settled:
+                for path in settled:
+                    del pending[path]
+                self._queue.put(settled)
+                if self.on_change:
+                    self.on_change(settled)
+
+    def changes(self):
+        """Return (and forget) every path reported since the last call, without blocking."""
+        changed = set()
+        while True:
+            try:
+                changed.update(self._queue.get_nowait())
+            except queue.Empty:
+                return changed
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Print config files as they change on disk.")
+    parser.add_argument("paths", nargs="+", help="files or directories to watch")
+    parser.add_argument("--debounce", type=float, default=0.3)
+    parser.add_argument("--polling", action="store_true", help="poll mtimes instead of using inotify")
+    args = parser.parse_args(argv)
+
+    watcher = Watcher(args.paths, debounce=args.debounce, backend="polling" if args.polling else None,
+                      on_change=lambda paths: print("\n".join(paths), flush=True))
+    watcher.start()
+    print(f"Watching with {watcher.backend.name}; Ctrl+C to stop", file=sys.stderr)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        watcher.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,336 @@
+"""Reusable ttkbootstrap widgets for the editor."""
+import ttkbootstrap as ttk
+from ttkbootstrap.constants import *
+
+import profiling
+
+
+class VirtualTreeview(ttk.Frame):
+    """A Treeview that only materializes the rows currently on screen.
+
+    Rows are pulled from the model on demand through row_values(index) and
+    count(), so lists with thousands of entries scroll and refresh in time
+    proportional to the visible rows. Selection is tracked by model index and
+    supports Ctrl/Shift multi-selection. When bound to an ObservableList with
+    bind_list(), the view follows model changes and rows can be reordered by
+    dragging the selection.
+    """
+
+    def __init__(self, master, columns, row_values, count, **kwargs):
+        super().__init__(master, **kwargs)
+        self.row_values = row_values
+        self.count = count
+        self.model = None
+        self.top = 0
+        self.rows = 20
+        self.selected = set()
+        self.anchor = None
+        self._shown = []
+        self._drag_start = None
+
+        self.tree = ttk.Treeview(self, columns=columns, show="headings", selectmode="none")
+        for column in columns:
+            self.tree.heading(column, text=column)
+        self.tree.pack(side=LEFT, fill=BOTH, expand=True)
+
+        self.scrollbar = ttk.Scrollbar(self, orient=VERTICAL, command=self.yview)
+        self.scrollbar.pack(side=RIGHT, fill=Y)
+
+        self.tree.bind("<Configure>", self._on_resize)
+        self.tree.bind("<Button-1>", self._on_click)
+        self.tree.bind("<Control-Button-1>", lambda event: self._on_click(event, toggle=True))
+        self.tree.bind("<Shift-Button-1>", lambda event: self._on_click(event, extend=True))
+        self.tree.bind("<B1-Motion>", self._on_drag)
+        self.tree.bind("<ButtonRelease-1>", self._on_drop)
+        self.tree.bind("<Control-a>", lambda event: self.selection_set(range(self.count())))
+        self.tree.bind("<MouseWheel>", self._on_mousewheel)
+        self.tree.bind("<Button-4>", lambda event: self.yview("scroll", -3, "units"))
+        self.tree.bind("<Button-5>", lambda event: self.yview("scroll", 3, "units"))
+        self.tree.bind("<Up>", lambda event: self._step(-1))
+        self.tree.bind("<Down>", lambda event: self._step(1))
+
+    def heading(self, column, **kwargs):
+        self.tree.heading(column, **kwargs)
+
+    def _row_height(self):
+        try:
+            return int(ttk.Style().lookup("Treeview", "rowheight")) or 20
+        except (TypeError, ValueError):
+            return 20
+
+    def _on_resize(self, event):
+        # The heading is about one row tall, which leaves a spare row for a partially visible last line
+        rows = max(1, event.height // self._row_height())
+        if rows != self.rows:
+            self.rows = rows
+            self.refresh()
+
+    def bind_list(self, model):
+        self.model = model
+        model.subscribe(self._on_model_change)
+
+    def _on_model_change(self, op, *args):
+        if op == "move":
+            old_indices, new_indices = args
+            self.selected = set(new_indices)
+        elif op == "insert":
+            index, count = args
+            self.selected = {i + count if i >= index else i for i in self.selected}
+        elif op == "delete" or op == "reset":
+            self.selected.clear()
+            self.anchor = None
+        self.refresh()
+
+    def _index_at(self, y):
+        row = self.tree.identify_row(y)
+        return self.top + int(row[3:]) if row else None
+
+    def _on_click(self, event, toggle=False, extend=False):
+        self._drag_start = None
+        if self.tree.identify_region(event.x, event.y) == "heading":
+            return
+        index = self._index_at(event.y)
+        self.tree.focus_set()
+        if index is None:
+            return "break"
+        if extend and self.anchor is not None:
+            low, high = sorted((self.anchor, index))
+            self.selected = set(range(low, high + 1))
+        elif toggle:
+            self.selected ^= {index}
+            self.anchor = index
+        elif index in self.selected and self.model is not None:
+            # Clicking inside the selection may start a drag, keep it intact
+            self._drag_start = index
+        else:
+            self.selected = {index}
+            self.anchor = index
+        self.refresh()
+        self.event_generate("<<VirtualSelect>>")
+        return "break"
+
+    def _on_drag(self, event):
+        if self._drag_start is None:
+            return
+        # Scroll while dragging past the top or bottom edge
+        if event.y < 0:
+            self.yview("scroll", -1, "units")
+        elif event.y > self.tree.winfo_height():
+            self.yview("scroll", 1, "units")
+        self.tree.configure(cursor="fleur")
+
+    def _on_drop(self, event):
+        if self._drag_start is None:
+            return
+        start, self._drag_start = self._drag_start, None
+        self.tree.configure(cursor="")
+        target = self._index_at(min(max(event.y, 1), self.tree.winfo_height() - 1))
+        if target is None:
+            target = self.count()
+        if target == start:
+            # A plain click inside a multi-selection selects just that row
+            self.selected = {start}
+            self.anchor = start
+            self.refresh()
+            self.event_generate("<<VirtualSelect>>")
+            return
+        if target > start:
+            target += 1
+        self.model.move(self.selection(), target)
+        self.see(min(self.selected))
+
+    def _on_mousewheel(self, event):
+        self.yview("scroll", -1 if event.delta > 0 else 1, "units")
+
+    def _step(self, delta):
+        total = self.count()
+        if not total:
+            return "break"
+        current = min(self.selected) if self.selected else self.top - delta
+        index = max(0, min(total - 1, current + delta))
+        self.selection_set(index)
+        self.see(index)
+        self.event_generate("<<VirtualSelect>>")
+        return "break"
+
+    def yview(self, *args):
+        total = self.count()
+        if not args:
+            return self._fractions(total)
+        if args[0] == "moveto":
+            self.top = int(float(args[1]) * total)
+        elif args[0] == "scroll":
+            amount = int(args[1])
+            self.top += amount * self.rows if args[2] == "pages" else amount
+        self.refresh()
+
+    def _fractions(self, total):
+        if total <= 0:
+            return 0.0, 1.0
+        return self.top / total, min(1.0, (self.top + self.rows) / total)
+
+    def see(self, index):
+        if index < self.top:
+            self.top = index
+        elif index >= self.top + self.rows - 1:
+            self.top = index - self.rows + 2
+        self.refresh()
+
+    def selection(self):
+        return sorted(self.selected)
+
+    def selection_set(self, indices):
+        if isinstance(indices, int):
+            indices = (indices,)
+        self.selected = set(indices)
+        self.refresh()
+
+    def selection_clear(self):
+        self.selected.clear()
+        self.refresh()
+
+    def refresh(self):
+        total = self.count()
+        self.top = max(0, min(self.top, total - self.rows + 1))
+        self.selected = {index for index in self.selected if index < total}
+        visible = max(0, min(self.rows, total - self.top))
+
+        # Grow or shrink the pool of materialized rows
+        for i in range(len(self._shown), visible):
+            self.tree.insert("", END, iid=f"row{i}")
+            profiling.count("rows inserted")
+            self._shown.append(None)
+        for i in range(visible, len(self._shown)):
+            self.tree.delete(f"row{i}")
+        del self._shown[visible:]
+
+        selection = []
+        for i in range(visible):
+            index = self.top + i
+            values = tuple(self.row_values(index))
+            if self._shown[i] != values:
+                self.tree.item(f"row{i}", values=values)
+                self._shown[i] = values
+            if index in self.selected:
+                selection.append(f"row{i}")
+        self.tree.selection_set(selection)
+        self.scrollbar.set(*self._fractions(total))
+
+
+class TreeviewDictBinding:
+    """Keeps a regular Treeview in sync with an ObservableDict.
+
+    Each model change maps to a single Treeview operation (insert, item update
+    or delete) instead of rebuilding every row. With chunk_size set, a reload
+    inserts that many rows per idle callback so large models never block the
+    mainloop; rows for keys that are not inserted yet are picked up in model
+    order by the remaining chunks.
+
+    filter(keys) limits the view to the given keys in the given order; while
+    a filter is set, keys added to the model stay hidden until the next
+    filter() call.
+    """
+
+    def __init__(self, tree, model, row_values=None, chunk_size=None):
+        self.tree = tree
+        self.model = model
+        self.row_values = row_values or (lambda key, value: (key, value))
+        self.chunk_size = chunk_size
+        self.visible = None
+        self.iids = {}
+        self.keys = {}
+        self._job = None
+        model.subscribe(self._on_change)
+        self.reload()
+
+    @property
+    def loading(self):
+        return self._job is not None
+
+    def reload(self):
+        if self._job is not None:
+            self.tree.after_cancel(self._job)
+            self._job = None
+        self.tree.delete(*self.tree.get_children())
+        self.iids.clear()
+        self.keys.clear()
+        if self.chunk_size is None:
+            for key, value in self._rows():
+                self._insert(key, value)
+        else:
+            self._load_chunk()
+
+    def filter(self, keys):
+        """Show only keys, in that order (None shows the whole model)."""
+        if keys is None and self.visible is None:
+            return
+        if keys is not None and self.visible is not None and not self.loading:
+            shown = set(keys)
+            if shown.issubset(self.iids) and [key for key in self.visible if key in shown] == list(keys):
+                # Narrowing the current result: drop rows instead of rebuilding the list
+                removed = [self.iids.pop(key) for key in self.visible if key not in shown and key in self.iids]
+                for iid in removed:
+                    del self.keys[iid]
+                self.tree.delete(*removed)
+                self.visible = list(keys)
+                return
+        self.visible = None if keys is None else list(keys)
+        self.reload()
+
+    def _rows(self):
+        if self.visible is None:
+            return self.model.items()
+        return ((key, self.model[key]) for key in self.visible if key in self.model)
+
+    def _load_chunk(self):
+        self._job = None
+        inserted = 0
+        for key, value in self._rows():
+            if key in self.iids:
+                continue
+            if inserted == self.chunk_size:
+                self._job = self.tree.after_idle(self._load_chunk)
+                return
+            self._insert(key, value)
+            inserted += 1
+
+    def _insert(self, key, value):
+        iid = self.tree.insert("", END, values=self.row_values(key, value))
+        profiling.count("rows inserted")
+        self.iids[key] = iid
+        self.keys[iid] = key
+
+    def _on_change(self, op, *args):
+        if op == "set":
+            key, is_new = args
+            if key in self.iids:
+                self.tree.item(self.iids[key], values=self.row_values(key, self.model[key]))
+            elif not self.loading and self.visible is None:
+                self._insert(key, self.model[key])
+        elif op == "delete":
+            iid = self.iids.pop(args[0], None)
+            if iid is not None:
+                del self.keys[iid]
+                self.tree.delete(iid)
+        elif op == "rename":
+            old_key, new_key = args
+            if self.visible is not None and old_key in self.visible:
+                self.visible[self.visible.index(old_key)] = new_key
+            iid = self.iids.pop(old_key, None)
+            if iid is None:
+                # Not inserted yet; a pending chunk inserts it under its new name
+                return
+            self.iids[new_key] = iid
+            self.keys[iid] = new_key
+            self.tree.item(iid, values=self.row_values(new_key, self.model[new_key]))
+        elif op == "reset":
+            self.reload()
+
+    def selected_keys(self):
+        return [self.keys[iid] for iid in self.tree.selection() if iid in self.keys]
+
+    def select(self, key):
+        iid = self.iids.get(key)
+        if iid is not None:
+            self.tree.selection_set(iid)
+            self.tree.see(iid)